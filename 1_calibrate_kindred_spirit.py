@@ -11,10 +11,16 @@ A therapeutic exploration to discover your actual values through:
 
 Total: ~75 questions. Progress clearly displayed throughout.
 
-Outputs: {username}_kindred_spirit.json
+Outputs: {username}_kindred_spirit.json (or .jsonl with --format jsonl)
+
+Every answer is appended to a journal and fsynced; --resume continues an
+interrupted session from the last answer.
+
+With --bank, phases 1-3 draw their dilemmas from an indexed question bank
+(kindred2/question_bank.py) by phase instead of the built-in dilemma set.
 """
 
-import json
+import argparse
 import sys
 from datetime import datetime
 from pathlib import Path
@@ -26,6 +32,29 @@ from Engine.kindred_spirit_calibration import (
     DilemmaCategory,
     UserResponse
 )
+sys.path.insert(0, str(Path(__file__).parent / "kindred2"))
+from jsonl_store import write_document, write_records
+from question_bank import open_question_bank
+from session_journal import SessionJournal
+
+# Per-phase response lists in the results document, in phase order
+PHASE_KEYS = [
+    "phase1_contemporary",
+    "phase2_timeless",
+    "phase3_existential",
+    "phase4_resonant_figures",
+    "phase5_ethical_frameworks",
+]
+
+RESULTS_DIR = Path("pepper_settings/calibration_results")
+JOURNAL_PATH = RESULTS_DIR / "calibration_session.journal.jsonl"
+
+# Question-bank phase feeding each dilemma phase when --bank is given
+BANK_PHASES = {
+    1: "contemporary",
+    2: "timeless",
+    3: "personal_existential",
+}
 
 
 class Colors:
@@ -229,6 +258,70 @@ RESONANT_FIGURES = [
 ]
 
 
+class BankDilemma:
+    """A question-bank entry presented like a built-in dilemma"""
+    def __init__(self, data):
+        self.id = data['id']
+        self.scenario = data['question']
+        self.option_a = data['option_a']
+        self.option_b = data['option_b']
+        self.option_other = data.get('option_other', False)
+
+
+def response_to_dict(r):
+    """Convert UserResponse dataclass instances to dicts"""
+    if hasattr(r, '__dict__'):
+        return dict(r.__dict__)
+    return r
+
+
+class PhaseProgress:
+    """Responses per phase, journaled as they are given and restored on resume"""
+    def __init__(self, journal=None, records=()):
+        self.journal = journal
+        self.responses = {key: [] for key in PHASE_KEYS}
+        self.last_item = {key: 0 for key in PHASE_KEYS}
+        self.completed = set()
+        for record in records:
+            self._apply(record)
+    
+    def _apply(self, record):
+        phase = record["phase"]
+        if record.get("complete"):
+            self.completed.add(phase)
+            return
+        self.last_item[phase] = record["item"]
+        if record.get("response") is not None:
+            self.responses[phase].append(record["response"])
+    
+    def _write(self, record):
+        if self.journal is not None:
+            self.journal.append(record)
+        self._apply(record)
+    
+    def answered(self, phase, item):
+        """True if item (1-based) was already answered or skipped before a resume"""
+        return item <= self.last_item[phase]
+    
+    def record(self, phase, item, response):
+        """Journal one answer (None for a skipped item) before moving on"""
+        self._write({"phase": phase, "item": item,
+                     "response": response_to_dict(response) if response is not None else None})
+    
+    def complete(self, phase):
+        self._write({"phase": phase, "complete": True})
+    
+    def is_complete(self, phase):
+        return phase in self.completed
+
+
+def phase_dilemmas(session, phase, bank=None, predicate=None):
+    """Dilemmas for a phase: lazily from the bank if given, else filtered from the session"""
+    if bank is not None:
+        return bank.sequence(BANK_PHASES[phase], factory=BankDilemma)
+    return [d for d in session.dilemmas if predicate(d)]
+
+
 def print_progress(phase, current, total, phase_name):
     """Print progress bar and status"""
     percentage = int((current / total) * 100)
@@ -240,8 +333,11 @@ def print_progress(phase, current, total, phase_name):
     print(f"{Colors.GREEN}[{bar}] {current}/{total} ({percentage}%){Colors.RESET}")
 
 
-def phase1_contemporary_dilemmas(session: CalibrationSession):
+def phase1_contemporary_dilemmas(session: CalibrationSession, bank=None, progress=None):
     """Phase 1: Contemporary political issues (15 dilemmas)"""
+    progress = progress or PhaseProgress()
+    if progress.is_complete(PHASE_KEYS[0]):
+        return progress.responses[PHASE_KEYS[0]]
     
     print_section("═══════════════════════════════════════════════════════════════")
     print_section("PHASE 1: CONTEMPORARY ISSUES", Colors.CYAN)
@@ -258,12 +354,16 @@ YOU think about these questions when the stakes feel real.
     input(f"\n{Colors.GREEN}Press Enter to begin Phase 1...{Colors.RESET}")
     
     # Filter contemporary dilemmas
-    contemporary = [d for d in session.dilemmas 
-                   if d.category == DilemmaCategory.POLITICAL_CONTEMPORARY]
+    contemporary = phase_dilemmas(
+        session, 1, bank,
+        lambda d: d.category == DilemmaCategory.POLITICAL_CONTEMPORARY
+    )
     
-    responses = []
+    responses = progress.responses[PHASE_KEYS[0]]
     
     for i, dilemma in enumerate(contemporary, 1):
+        if progress.answered(PHASE_KEYS[0], i):
+            continue
         print_progress(1, i, len(contemporary), "Contemporary Issues")
         
         print_question(f"\n{dilemma.scenario}")
@@ -278,7 +378,7 @@ YOU think about these questions when the stakes feel real.
         certainty = get_rating("How certain are you?", 10)
         emotional = get_rating("How emotionally charged was this?", 10)
         
-        responses.append(UserResponse(
+        progress.record(PHASE_KEYS[0], i, UserResponse(
             dilemma_id=dilemma.id,
             choice=choice,
             reasoning=reasoning,
@@ -288,11 +388,15 @@ YOU think about these questions when the stakes feel real.
         
         print(f"\n{Colors.GREEN}Thank you.{Colors.RESET}")
     
+    progress.complete(PHASE_KEYS[0])
     return responses
 
 
-def phase2_timeless_dilemmas(session: CalibrationSession):
+def phase2_timeless_dilemmas(session: CalibrationSession, bank=None, progress=None):
     """Phase 2: Timeless ethical questions (22 dilemmas)"""
+    progress = progress or PhaseProgress()
+    if progress.is_complete(PHASE_KEYS[1]):
+        return progress.responses[PHASE_KEYS[1]]
     
     print_section("\n═══════════════════════════════════════════════════════════════")
     print_section("PHASE 2: TIMELESS ETHICS", Colors.CYAN)
@@ -310,13 +414,17 @@ These are about abstract principles: honesty, justice, loyalty, the greater good
     input(f"\n{Colors.GREEN}Press Enter to begin Phase 2...{Colors.RESET}")
     
     # Filter timeless dilemmas (exclude contemporary and existential)
-    timeless = [d for d in session.dilemmas 
-               if d.category not in [DilemmaCategory.POLITICAL_CONTEMPORARY,
-                                    DilemmaCategory.PERSONAL_EXISTENTIAL]]
+    timeless = phase_dilemmas(
+        session, 2, bank,
+        lambda d: d.category not in [DilemmaCategory.POLITICAL_CONTEMPORARY,
+                                     DilemmaCategory.PERSONAL_EXISTENTIAL]
+    )
     
-    responses = []
+    responses = progress.responses[PHASE_KEYS[1]]
     
     for i, dilemma in enumerate(timeless, 1):
+        if progress.answered(PHASE_KEYS[1], i):
+            continue
         print_progress(2, i, len(timeless), "Timeless Ethics")
         
         print_question(f"\n{dilemma.scenario}")
@@ -331,7 +439,7 @@ These are about abstract principles: honesty, justice, loyalty, the greater good
         certainty = get_rating("How certain are you?", 10)
         emotional = get_rating("How emotionally charged was this?", 10)
         
-        responses.append(UserResponse(
+        progress.record(PHASE_KEYS[1], i, UserResponse(
             dilemma_id=dilemma.id,
             choice=choice,
             reasoning=reasoning,
@@ -341,11 +449,15 @@ These are about abstract principles: honesty, justice, loyalty, the greater good
         
         print(f"\n{Colors.GREEN}Thank you.{Colors.RESET}")
     
+    progress.complete(PHASE_KEYS[1])
     return responses
 
 
-def phase3_existential_dilemmas(session: CalibrationSession):
+def phase3_existential_dilemmas(session: CalibrationSession, bank=None, progress=None):
     """Phase 3: Personal/existential questions (2+ dilemmas)"""
+    progress = progress or PhaseProgress()
+    if progress.is_complete(PHASE_KEYS[2]):
+        return progress.responses[PHASE_KEYS[2]]
     
     print_section("\n═══════════════════════════════════════════════════════════════")
     print_section("PHASE 3: PERSONAL & EXISTENTIAL", Colors.CYAN)
@@ -362,12 +474,16 @@ to you when everything else falls away.
     input(f"\n{Colors.GREEN}Press Enter to begin Phase 3...{Colors.RESET}")
     
     # Filter existential dilemmas
-    existential = [d for d in session.dilemmas 
-                  if d.category == DilemmaCategory.PERSONAL_EXISTENTIAL]
+    existential = phase_dilemmas(
+        session, 3, bank,
+        lambda d: d.category == DilemmaCategory.PERSONAL_EXISTENTIAL
+    )
     
-    responses = []
+    responses = progress.responses[PHASE_KEYS[2]]
     
     for i, dilemma in enumerate(existential, 1):
+        if progress.answered(PHASE_KEYS[2], i):
+            continue
         print_progress(3, i, len(existential), "Personal & Existential")
         
         print_question(f"\n{dilemma.scenario}")
@@ -382,7 +498,7 @@ to you when everything else falls away.
         certainty = get_rating("How certain are you?", 10)
         emotional = get_rating("How emotionally charged was this?", 10)
         
-        responses.append(UserResponse(
+        progress.record(PHASE_KEYS[2], i, UserResponse(
             dilemma_id=dilemma.id,
             choice=choice,
             reasoning=reasoning,
@@ -392,11 +508,15 @@ to you when everything else falls away.
         
         print(f"\n{Colors.GREEN}Thank you.{Colors.RESET}")
     
+    progress.complete(PHASE_KEYS[2])
     return responses
 
 
-def phase4_resonant_figures():
+def phase4_resonant_figures(progress=None):
     """Phase 4: Explore heroes with graceful honesty about their flaws"""
+    progress = progress or PhaseProgress()
+    if progress.is_complete(PHASE_KEYS[3]):
+        return progress.responses[PHASE_KEYS[3]]
     
     print_section("\n═══════════════════════════════════════════════════════════════")
     print_section("PHASE 4: RESONANT FIGURES - Show Me Your Heroes", Colors.CYAN)
@@ -419,10 +539,12 @@ Your answer reveals a lot about how you handle moral complexity.
     
     input(f"\n{Colors.GREEN}Press Enter to begin Phase 4...{Colors.RESET}")
     
-    responses = []
+    responses = progress.responses[PHASE_KEYS[3]]
     
     # Show all 20 figures
     for i, figure in enumerate(RESONANT_FIGURES, 1):
+        if progress.answered(PHASE_KEYS[3], i):
+            continue
         print_progress(4, i, len(RESONANT_FIGURES), "Resonant Figures")
         
         print_question(f"\n{Colors.BOLD}{figure['name']}{Colors.RESET}")
@@ -455,7 +577,7 @@ Your answer reveals a lot about how you handle moral complexity.
             # Certainty
             certainty = get_rating("\nHow certain are you about this position?", 10)
             
-            responses.append({
+            progress.record(PHASE_KEYS[3], i, {
                 "figure": figure['name'],
                 "resonates": True,
                 "what_resonates": what_resonates,
@@ -468,12 +590,14 @@ Your answer reveals a lot about how you handle moral complexity.
         
         elif resonates in ['n', 'no']:
             why_not = get_input(f"\nWhat doesn't work for you about {figure['name']}? (optional):")
-            responses.append({
+            progress.record(PHASE_KEYS[3], i, {
                 "figure": figure['name'],
                 "resonates": False,
                 "why_not": why_not if why_not else None,
                 "timestamp": datetime.now().isoformat()
             })
+        else:
+            progress.record(PHASE_KEYS[3], i, None)
         
         # Continue?
         if i < len(RESONANT_FIGURES):
@@ -482,6 +606,7 @@ Your answer reveals a lot about how you handle moral complexity.
                 print_note("\nThat's fine. Moving to summary...")
                 break
     
+    progress.complete(PHASE_KEYS[3])
     return responses
 
 
@@ -605,8 +730,11 @@ ETHICAL_FRAMEWORKS = [
 ]
 
 
-def phase5_ethical_frameworks():
+def phase5_ethical_frameworks(progress=None):
     """Phase 5: Established ethical frameworks with extreme examples"""
+    progress = progress or PhaseProgress()
+    if progress.is_complete(PHASE_KEYS[4]):
+        return progress.responses[PHASE_KEYS[4]]
     
     print_section("\n═══════════════════════════════════════════════════════════════")
     print_section("PHASE 5: ETHICAL FRAMEWORKS - How Do You Actually Decide?", Colors.CYAN)
@@ -627,9 +755,11 @@ event to test whether it really fits your intuitions.
     
     input(f"\n{Colors.GREEN}Press Enter to begin Phase 5...{Colors.RESET}")
     
-    responses = []
+    responses = progress.responses[PHASE_KEYS[4]]
     
     for i, framework in enumerate(ETHICAL_FRAMEWORKS, 1):
+        if progress.answered(PHASE_KEYS[4], i):
+            continue
         print_progress(5, i, len(ETHICAL_FRAMEWORKS), "Ethical Frameworks")
         
         print_question(f"\n{Colors.BOLD}{framework['name']}{Colors.RESET}")
@@ -669,7 +799,7 @@ event to test whether it really fits your intuitions.
         else:
             objection = None
         
-        responses.append({
+        progress.record(PHASE_KEYS[4], i, {
             "framework": framework['name'],
             "response": response,
             "elaboration": elaboration,
@@ -681,21 +811,15 @@ event to test whether it really fits your intuitions.
         if i < len(ETHICAL_FRAMEWORKS):
             print()  # Blank line before next
     
+    progress.complete(PHASE_KEYS[4])
     return responses
 
 
-def save_results(username, phase1_data, phase2_data, phase3_data, phase4_data, phase5_data):
-    """Save calibration results to JSON file"""
-    output_dir = Path("pepper_settings/calibration_results")
-    output_dir.mkdir(parents=True, exist_ok=True)
-    
-    filename = output_dir / f"{username}_kindred_spirit.json"
+def save_results(username, phase1_data, phase2_data, phase3_data, phase4_data, phase5_data, fmt="json"):
+    """Save calibration results to a JSON document or a JSONL file (one response per line)"""
+    RESULTS_DIR.mkdir(parents=True, exist_ok=True)
     
-    # Convert UserResponse dataclass instances to dicts
-    def response_to_dict(r):
-        if hasattr(r, '__dict__'):
-            return r.__dict__
-        return r
+    filename = RESULTS_DIR / f"{username}_kindred_spirit.{fmt}"
     
     output = {
         "username": username,
@@ -716,14 +840,45 @@ def save_results(username, phase1_data, phase2_data, phase3_data, phase4_data, p
         }
     }
     
-    with open(filename, 'w', encoding='utf-8') as f:
-        json.dump(output, f, indent=2, ensure_ascii=False)
+    if fmt == "jsonl":
+        meta = {k: v for k, v in output.items() if k not in PHASE_KEYS}
+        records = ({"phase": phase, **r} for phase in PHASE_KEYS for r in output[phase])
+        write_records(filename, records, meta=meta)
+    else:
+        # Temp file + rename: an interrupted save never truncates earlier results
+        write_document(filename, output)
     
     return filename
 
 
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="Kindred Spirit Calibration - Interactive CLI")
+    parser.add_argument("--format", choices=["json", "jsonl"], default="json",
+                        help="Results file format (default: json)")
+    parser.add_argument("--resume", action="store_true",
+                        help="Continue the interrupted session recorded in the autosave journal")
+    parser.add_argument("--bank", default=None,
+                        help="Question bank (.sqlite) or questions JSON/JSONL for phases 1-3")
+    return parser.parse_args(argv)
+
+
 def main():
     """Main calibration flow"""
+    args = parse_args(sys.argv[1:])
+    journal = SessionJournal(JOURNAL_PATH)
+    try:
+        journal_meta, journal_records = journal.recover()
+    except ValueError as e:
+        print(f"{Colors.YELLOW}{e}{Colors.RESET}")
+        sys.exit(1)
+    resume = args.resume
+    if journal_records and not resume:
+        print_note(f"Found an unfinished session with {len(journal_records)} saved answers.")
+        resume = get_input("Resume it? (yes/no):").lower() in ['y', 'yes']
+    resume = resume and bool(journal_meta)
+    bank_path = args.bank or (journal_meta.get("bank") if resume else None)
+    bank = open_question_bank(Path(bank_path)) if bank_path else None
+    
     print_section("═══════════════════════════════════════════════════════════════")
     print_section("    KINDRED SPIRIT CALIBRATION", Colors.CYAN)
     print_section("═══════════════════════════════════════════════════════════════")
@@ -745,12 +900,24 @@ you should have, but the ones you actually live by.
 You can exit anytime with Ctrl+C. Your progress will be saved.
 """)
     
-    username = get_input("\nWhat should I call you?")
-    if not username:
-        username = "anonymous"
-    
-    print(f"\n{Colors.GREEN}Hello, {username}.{Colors.RESET}")
-    print("\nLet's begin.\n")
+    if resume:
+        username = journal_meta.get("username", "anonymous")
+        progress = PhaseProgress(journal, journal_records)
+        print(f"\n{Colors.GREEN}Welcome back, {username}.{Colors.RESET}")
+        print("\nPicking up where you left off.\n")
+    else:
+        username = get_input("\nWhat should I call you?")
+        if not username:
+            username = "anonymous"
+        journal.start({
+            "username": username,
+            "bank": bank_path,
+            "started": datetime.now().isoformat(),
+        })
+        progress = PhaseProgress(journal)
+        
+        print(f"\n{Colors.GREEN}Hello, {username}.{Colors.RESET}")
+        print("\nLet's begin.\n")
     
     input(f"{Colors.GREEN}Press Enter to start...{Colors.RESET}")
     
@@ -758,26 +925,28 @@ You can exit anytime with Ctrl+C. Your progress will be saved.
     session = CalibrationSession()
     
     # Phase 1: Contemporary dilemmas
-    phase1_data = phase1_contemporary_dilemmas(session)
+    phase1_data = phase1_contemporary_dilemmas(session, bank, progress)
     
     # Phase 2: Timeless dilemmas
-    phase2_data = phase2_timeless_dilemmas(session)
+    phase2_data = phase2_timeless_dilemmas(session, bank, progress)
     
     # Phase 3: Existential dilemmas
-    phase3_data = phase3_existential_dilemmas(session)
+    phase3_data = phase3_existential_dilemmas(session, bank, progress)
     
     # Phase 4: Resonant figures
-    phase4_data = phase4_resonant_figures()
+    phase4_data = phase4_resonant_figures(progress)
     
     # Phase 5: Ethical frameworks
-    phase5_data = phase5_ethical_frameworks()
+    phase5_data = phase5_ethical_frameworks(progress)
     
     # Save results
     print_section("\n═══════════════════════════════════════════════════════════════")
     print_section("Saving your responses...", Colors.CYAN)
     
-    output_file = save_results(username, phase1_data, phase2_data, phase3_data, phase4_data, phase5_data)
+    output_file = save_results(username, phase1_data, phase2_data, phase3_data, phase4_data, phase5_data,
+                               fmt=args.format)
     
+    journal.discard()
     print(f"\n{Colors.GREEN}✓ Saved to: {output_file}{Colors.RESET}")
     
     # Summary
@@ -819,5 +988,6 @@ if __name__ == "__main__":
     try:
         main()
     except KeyboardInterrupt:
-        print(f"\n\n{Colors.YELLOW}Calibration interrupted. Partial results may be saved.{Colors.RESET}\n")
+        print(f"\n\n{Colors.YELLOW}Calibration interrupted. Your answers so far are saved; "
+              f"run with --resume to continue.{Colors.RESET}\n")
         sys.exit(0)
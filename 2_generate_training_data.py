@@ -1,18 +1,27 @@
 """
 Generate training dataset from Nigel's calibration + synthetic examples
 Formats for LoRA fine-tuning with instruction-response pairs
+
+Importable builder: examples are streamed once through every output format,
+and files whose content hash is unchanged are left untouched.
+
+Usage: python 2_generate_training_data.py [--calibration PATH] [--output-dir DIR]
 """
+import argparse
+import hashlib
 import json
-import random
+import os
+import sys
+import tempfile
+from collections import Counter
 from pathlib import Path
-from typing import List, Dict
+from typing import Callable, Dict, Iterable, Iterator, List, Optional
 
-# Load Nigel's calibration
-calibration_path = Path("pepper_settings/calibration_results/Nigel_kindred_spirit.json")
-with open(calibration_path) as f:
-    calibration = json.load(f)
+DEFAULT_CALIBRATION_PATH = Path("pepper_settings/calibration_results/Nigel_kindred_spirit.json")
+DEFAULT_OUTPUT_DIR = Path("training_data")
 
-training_examples = []
+sys.path.insert(0, str(Path(__file__).parent / "kindred2"))
+from jsonl_store import iter_records, read_meta, replacement_mode
 
 # ============================================================================
 # PART 1: Convert calibration responses to training examples
@@ -37,16 +46,6 @@ CONTEMPORARY_PROMPTS = {
     "wealth_inequality": "Should wealth be redistributed to address inequality?",
 }
 
-for item in calibration["phase1_contemporary"]:
-    did = item["dilemma_id"]
-    if did in CONTEMPORARY_PROMPTS:
-        training_examples.append({
-            "instruction": CONTEMPORARY_PROMPTS[did],
-            "response": item["reasoning"],
-            "category": "political_values",
-            "emotional_weight": item["emotional_weight"]
-        })
-
 # Phase 2: Timeless dilemmas  
 TIMELESS_PROMPTS = {
     "trolley_classic": "A runaway trolley will kill 5 people. You can pull a lever to divert it to kill 1 person instead. Do you pull the lever?",
@@ -63,25 +62,6 @@ TIMELESS_PROMPTS = {
     "corporate_whistleblow": "Would you whistleblow on corporate fraud if it meant 500 people lose their jobs?",
 }
 
-for item in calibration["phase2_timeless"]:
-    did = item["dilemma_id"]
-    if did in TIMELESS_PROMPTS:
-        training_examples.append({
-            "instruction": TIMELESS_PROMPTS[did],
-            "response": item["reasoning"],
-            "category": "ethical_dilemmas",
-            "emotional_weight": item["emotional_weight"]
-        })
-
-# Phase 4: Resonant figures
-for item in calibration.get("phase4_resonant_figures", []):
-    if item.get("resonates") == "yes":
-        training_examples.append({
-            "instruction": f"What do you think of {item['figure']}?",
-            "response": item["reasoning"],
-            "category": "resonant_figures"
-        })
-
 # ============================================================================
 # PART 2: Generate synthetic examples based on value patterns
 # ============================================================================
@@ -224,8 +204,6 @@ SYNTHETIC_EXAMPLES = [
     },
 ]
 
-training_examples.extend(SYNTHETIC_EXAMPLES)
-
 # ============================================================================
 # PART 3: Add variations with different phrasings
 # ============================================================================
@@ -479,53 +457,240 @@ VARIATIONS = [
     ("Is gentrification good for neighborhoods?",
      "It benefits new arrivals at the cost of displacing longtime residents. That's not 'improvement'—it's replacement."),
 ]
+# ============================================================================
+# PART 4: Stream examples
+# ============================================================================
+
+def load_calibration(path: Path) -> Dict:
+    """Load a calibration results file written by 1_calibrate_kindred_spirit.py
+
+    JSONL results (one response per line, tagged with its phase) are regrouped
+    into the same phase-keyed layout as the JSON document.
+    """
+    path = Path(path)
+    if path.suffix.lower() != ".jsonl":
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    calibration = dict(read_meta(path))
+    for record in iter_records(path):
+        phase = record.pop("phase", None)
+        if phase:
+            calibration.setdefault(phase, []).append(record)
+    return calibration
+
+
+def iter_calibration_examples(calibration: Dict) -> Iterator[Dict]:
+    """Yield training examples derived from the user's calibration answers"""
+    # Phase 1: Contemporary dilemmas
+    for item in calibration.get("phase1_contemporary", []):
+        did = item["dilemma_id"]
+        if did in CONTEMPORARY_PROMPTS:
+            yield {
+                "instruction": CONTEMPORARY_PROMPTS[did],
+                "response": item["reasoning"],
+                "category": "political_values",
+                "emotional_weight": item["emotional_weight"]
+            }
 
-for instruction, response in VARIATIONS:
-    training_examples.append({
-        "instruction": instruction,
-        "response": response,
-        "category": "synthetic_variation"
-    })
+    # Phase 2: Timeless dilemmas
+    for item in calibration.get("phase2_timeless", []):
+        did = item["dilemma_id"]
+        if did in TIMELESS_PROMPTS:
+            yield {
+                "instruction": TIMELESS_PROMPTS[did],
+                "response": item["reasoning"],
+                "category": "ethical_dilemmas",
+                "emotional_weight": item["emotional_weight"]
+            }
+
+    # Phase 4: Resonant figures
+    for item in calibration.get("phase4_resonant_figures", []):
+        if item.get("resonates") == "yes":
+            yield {
+                "instruction": f"What do you think of {item['figure']}?",
+                "response": item["reasoning"],
+                "category": "resonant_figures"
+            }
+
+
+def iter_training_examples(calibration: Dict) -> Iterator[Dict]:
+    """Yield every training example in output order, without materialising a list"""
+    yield from iter_calibration_examples(calibration)
+    yield from SYNTHETIC_EXAMPLES
+    for instruction, response in VARIATIONS:
+        yield {
+            "instruction": instruction,
+            "response": response,
+            "category": "synthetic_variation"
+        }
 
 # ============================================================================
-# PART 4: Export in multiple formats
+# PART 5: Export in multiple formats (single pass)
 # ============================================================================
 
-# Format 1: Simple instruction-response JSON
-output_simple = []
-for ex in training_examples:
-    output_simple.append({
+def to_simple(ex: Dict) -> Dict:
+    """Simple instruction-response record (Alpaca format)"""
+    return {
         "instruction": ex["instruction"],
         "input": "",
         "output": ex["response"]
-    })
+    }
 
-with open("training_data/nigel_values_simple.json", "w") as f:
-    json.dump(output_simple, f, indent=2)
 
-# Format 2: Conversational format for chat models
-output_chat = []
-for ex in training_examples:
-    output_chat.append({
+def to_chat(ex: Dict) -> Dict:
+    """Conversational record for chat models"""
+    return {
         "messages": [
             {"role": "user", "content": ex["instruction"]},
             {"role": "assistant", "content": ex["response"]}
         ]
-    })
-
-with open("training_data/nigel_values_chat.json", "w") as f:
-    json.dump(output_chat, f, indent=2)
-
-# Format 3: With metadata for analysis
-with open("training_data/nigel_values_full.json", "w") as f:
-    json.dump(training_examples, f, indent=2)
-
-print(f"✅ Generated {len(training_examples)} training examples")
-print(f"   - {len([e for e in training_examples if e.get('category') == 'political_values'])} from political responses")
-print(f"   - {len([e for e in training_examples if e.get('category') == 'ethical_dilemmas'])} from ethical dilemmas")
-print(f"   - {len([e for e in training_examples if e.get('category') in ['family_loyalty', 'anti_bullying', 'israel_palestine']])} synthetic core values")
-print(f"   - {len([e for e in training_examples if e.get('category') == 'synthetic_variation'])} variations")
-print("\nFiles created:")
-print("  - training_data/nigel_values_simple.json (Alpaca format)")
-print("  - training_data/nigel_values_chat.json (Chat format)")
-print("  - training_data/nigel_values_full.json (With metadata)")
+    }
+
+
+def to_full(ex: Dict) -> Dict:
+    """Record with metadata for analysis"""
+    return ex
+
+
+# name -> (filename, record transform, line-delimited)
+OUTPUT_FORMATS: Dict[str, tuple] = {
+    "simple": ("nigel_values_simple.json", to_simple, False),
+    "chat": ("nigel_values_chat.json", to_chat, False),
+    "full": ("nigel_values_full.json", to_full, False),
+    "chat_jsonl": ("nigel_values_chat.jsonl", to_chat, True),
+}
+
+
+def file_sha256(path: Path) -> Optional[str]:
+    """Hash an existing file in chunks, or None if it does not exist"""
+    if not path.exists():
+        return None
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class StreamingWriter:
+    """Writes records to a temp file while hashing, then replaces the target only if it changed.
+
+    JSON arrays are written byte-for-byte as json.dump(records, f, indent=2) would.
+    """
+
+    def __init__(self, path: Path, transform: Callable[[Dict], Dict], jsonl: bool):
+        self.path = path
+        self.transform = transform
+        self.jsonl = jsonl
+        self.count = 0
+        self.digest = hashlib.sha256()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_name = tempfile.mkstemp(prefix=f".{path.name}.", suffix=".tmp", dir=path.parent)
+        self.tmp_path = Path(tmp_name)
+        self.handle = os.fdopen(fd, "w", encoding="utf-8", newline="\n")
+
+    def _emit(self, text: str) -> None:
+        self.handle.write(text)
+        self.digest.update(text.encode("utf-8"))
+
+    def write(self, example: Dict) -> None:
+        record = self.transform(example)
+        if self.jsonl:
+            self._emit(json.dumps(record, ensure_ascii=False) + "\n")
+        else:
+            body = json.dumps(record, indent=2).replace("\n", "\n  ")
+            self._emit(("[\n  " if self.count == 0 else ",\n  ") + body)
+        self.count += 1
+
+    def close(self) -> bool:
+        """Finish the file; returns True if the target was (re)written"""
+        if not self.jsonl:
+            self._emit("\n]" if self.count else "[]")
+        self.handle.close()
+        if self.digest.hexdigest() == file_sha256(self.path):
+            self.tmp_path.unlink()
+            return False
+        # mkstemp's 0600 would otherwise replace the target's permissions
+        os.chmod(self.tmp_path, replacement_mode(self.path))
+        os.replace(self.tmp_path, self.path)
+        return True
+
+    def abort(self) -> None:
+        self.handle.close()
+        self.tmp_path.unlink(missing_ok=True)
+
+
+def write_outputs(examples: Iterable[Dict], output_dir: Path,
+                  formats: Optional[List[str]] = None) -> Dict:
+    """Stream examples once through every requested format.
+
+    Returns per-file write status and per-category counts.
+    """
+    formats = formats or list(OUTPUT_FORMATS)
+    writers = {}
+    for name in formats:
+        filename, transform, jsonl = OUTPUT_FORMATS[name]
+        writers[name] = StreamingWriter(output_dir / filename, transform, jsonl)
+
+    categories: Counter = Counter()
+    try:
+        for ex in examples:
+            categories[ex.get("category")] += 1
+            for writer in writers.values():
+                writer.write(ex)
+    except BaseException:
+        for writer in writers.values():
+            writer.abort()
+        raise
+
+    files = {}
+    for name, writer in writers.items():
+        files[str(writer.path)] = "written" if writer.close() else "unchanged"
+    return {"total": sum(categories.values()), "categories": categories, "files": files}
+
+
+def build(calibration_path: Path = DEFAULT_CALIBRATION_PATH,
+          output_dir: Path = DEFAULT_OUTPUT_DIR,
+          formats: Optional[List[str]] = None) -> Dict:
+    """Build all training data files from a calibration results file"""
+    calibration = load_calibration(calibration_path)
+    return write_outputs(iter_training_examples(calibration), output_dir, formats)
+
+
+def print_report(result: Dict) -> None:
+    categories = result["categories"]
+    print(f"✅ Generated {result['total']} training examples")
+    print(f"   - {categories['political_values']} from political responses")
+    print(f"   - {categories['ethical_dilemmas']} from ethical dilemmas")
+    print(f"   - {sum(categories[c] for c in ['family_loyalty', 'anti_bullying', 'israel_palestine'])} synthetic core values")
+    print(f"   - {categories['synthetic_variation']} variations")
+    print("\nFiles:")
+    for path, status in result["files"].items():
+        print(f"  - {path} ({status})")
+
+
+def parse_args(argv: List[str]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Generate Kindred training data from calibration results")
+    parser.add_argument("--calibration", default=str(DEFAULT_CALIBRATION_PATH), help="Calibration results .json or .jsonl")
+    parser.add_argument("--output-dir", default=str(DEFAULT_OUTPUT_DIR), help="Directory for training data files")
+    parser.add_argument(
+        "--formats",
+        nargs="+",
+        choices=list(OUTPUT_FORMATS),
+        default=None,
+        help="Output formats to write (default: all)"
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    args = parse_args(sys.argv[1:] if argv is None else argv)
+    calibration_path = Path(args.calibration)
+    if not calibration_path.exists():
+        raise SystemExit(f"Calibration file not found: {calibration_path}")
+    result = build(calibration_path, Path(args.output_dir), args.formats)
+    print_report(result)
+
+
+if __name__ == "__main__":
+    main()
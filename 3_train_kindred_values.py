@@ -3,10 +3,15 @@ Train Nigel-aligned LoRA adapter on Qwen2-VL-7B-Instruct-abliterated
 Optimized for single RTX 6000 Ada (48GB VRAM)
 """
 import os
+import re
+import sys
 import json
+import time
+import shutil
+import hashlib
 import torch
 from pathlib import Path
-from datasets import Dataset, load_dataset, concatenate_datasets
+from datasets import Dataset, load_dataset, load_from_disk, concatenate_datasets
 from transformers import (
     AutoModelForCausalLM,
     AutoTokenizer,
@@ -17,6 +22,11 @@ from transformers import (
 from peft import LoraConfig, get_peft_model, TaskType, PeftModel
 import logging
 
+sys.path.insert(0, str(Path(__file__).parent / "kindred2"))
+from jsonl_store import iter_records
+from loss_pruning import INDEX_COLUMN, RUNS_FILENAME as PRUNING_RUNS_FILENAME, LossPruning, report_pruning
+from training_callbacks import AgreementEarlyStoppingCallback, LossPruningTrainer, MetricsCallback
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
@@ -31,9 +41,12 @@ CONFIG = {
     # Note: For multimodal later, can use Qwen2-VL or LLaVA
     
     # Training data
-    "nigel_data_path": "training_data/nigel_values_chat.json",
+    "nigel_data_path": "training_data/nigel_values_chat.jsonl",  # .jsonl streamed; legacy .json also accepted
     "use_general_data": True,  # Mix with general examples to prevent forgetting
     "general_data_samples": 400,  # Number of general examples (3:1 ratio with Nigel's 132)
+    "general_data_source": "yahma/alpaca-cleaned",  # HF dataset name, or local .json/.jsonl file or saved dataset dir
+    "general_data_cache_dir": "./data_cache/general",  # Versioned, pre-tokenized local cache (no network once built)
+    "general_data_seed": 42,  # Deterministic sampling of the general mix
     
     # LoRA hyperparameters
     "lora_r": 64,  # Rank (higher = more capacity but slower)
@@ -50,10 +63,18 @@ CONFIG = {
     "warmup_steps": 50,
     "max_seq_length": 2048,
     
+    # Loss-based data pruning (see kindred2/loss_pruning.py)
+    "prune_mode": "off",  # "skip": later epochs train only the hardest examples; "weight": down-weight easy ones
+    "prune_keep": 0.5,  # Share of hardest examples kept at full weight after the first epoch
+    "user_answers_path": None,  # Kindred2 user_answers.json(l): enables agreement early stopping and reporting
+    "questions_path": "questions_with_perspectives.json",
+    "agreement_patience": 3,  # Agreement checks (every save_steps) without improvement before stopping
+    
     # Output
     "output_dir": "./nigel_lora_adapter",
     "save_steps": 50,
     "logging_steps": 10,
+    "metrics_file": "./nigel_lora_adapter/training_metrics.jsonl",  # Structured per-log-step metrics
     
     # Hardware
     "use_flash_attention": False,  # Disable for compatibility
@@ -67,12 +88,9 @@ CONFIG = {
 
 def load_nigel_data():
     """Load Nigel's value training data"""
-    with open(CONFIG["nigel_data_path"]) as f:
-        data = json.load(f)
-    
     # Convert to HF dataset format
     formatted = []
-    for item in data:
+    for item in iter_records(CONFIG["nigel_data_path"]):
         messages = item["messages"]
         # Format as conversation
         text = f"<|im_start|>user\n{messages[0]['content']}<|im_end|>\n<|im_start|>assistant\n{messages[1]['content']}<|im_end|>"
@@ -80,46 +98,137 @@ def load_nigel_data():
     
     return Dataset.from_list(formatted)
 
-def load_general_data(n_samples=400):
-    """Load general instruction data to prevent catastrophic forgetting"""
-    logger.info(f"Loading {n_samples} general instruction examples...")
-    
-    # Load from HuggingFace datasets
+# Bump when the cached text format changes so stale caches are rebuilt
+GENERAL_CACHE_VERSION = 1
+
+def _slug(value):
+    """Filesystem-safe name for a model or dataset identifier"""
+    return re.sub(r"[^A-Za-z0-9._-]+", "_", str(value)).strip("_")
+
+def format_general_example(item):
+    """Format an Alpaca-style record to match our chat style"""
+    if item.get("input"):
+        prompt = f"{item['instruction']}\n{item['input']}"
+    else:
+        prompt = item["instruction"]
+    return {"text": f"<|im_start|>user\n{prompt}<|im_end|>\n<|im_start|>assistant\n{item['output']}<|im_end|>"}
+
+def load_general_source(source):
+    """Load the full general-instruction source from a local path or the HF hub"""
+    path = Path(source).expanduser()
+    if path.is_dir():
+        return load_from_disk(str(path))
+    if path.suffix in (".json", ".jsonl") and path.exists():
+        return load_dataset("json", data_files=str(path), split="train")
+    return load_dataset(source, split="train")
+
+def source_signature(source):
+    """Size and mtime of a local source file or saved dataset dir; None for a hub name"""
+    path = Path(source).expanduser()
+    if path.is_file():
+        stat = path.stat()
+        return f"{stat.st_size}:{stat.st_mtime_ns}"
+    if path.is_dir():
+        stats = [f.stat() for f in path.rglob("*") if f.is_file()]
+        return f"{sum(s.st_size for s in stats)}:{max((s.st_mtime_ns for s in stats), default=0)}"
+    return None
+
+def general_cache_dir(n_samples):
+    """Cache folder for one (version, source, sample count, seed) combination
+
+    A local source is also keyed on its size and mtime, so editing it rebuilds the cache.
+    """
+    key = f"{_slug(CONFIG['general_data_source'])}-n{n_samples}-seed{CONFIG['general_data_seed']}"
+    signature = source_signature(CONFIG["general_data_source"])
+    if signature:
+        key += "-" + hashlib.sha1(signature.encode("utf-8")).hexdigest()[:12]
+    return Path(CONFIG["general_data_cache_dir"]) / f"v{GENERAL_CACHE_VERSION}" / key
+
+def save_to_disk_atomic(dataset, target):
+    """save_to_disk into a temp dir renamed into place, so an interrupted save never looks like a cache"""
+    target = Path(target)
+    tmp = target.with_name(target.name + ".tmp")
+    if tmp.exists():
+        shutil.rmtree(tmp)
+    dataset.save_to_disk(str(tmp))
+    os.replace(tmp, target)
+
+def build_general_text_cache(n_samples, cache_dir):
+    """Sample the general mix deterministically and store it on disk"""
+    source = CONFIG["general_data_source"]
+    logger.info(f"Building general data cache from {source}...")
     try:
-        # Option 1: Alpaca cleaned
-        dataset = load_dataset("yahma/alpaca-cleaned", split=f"train[:{n_samples}]")
-        
-        # Format to match our style
-        formatted = []
-        for item in dataset:
-            if item.get("input"):
-                prompt = f"{item['instruction']}\n{item['input']}"
-            else:
-                prompt = item["instruction"]
-            
-            text = f"<|im_start|>user\n{prompt}<|im_end|>\n<|im_start|>assistant\n{item['output']}<|im_end|>"
-            formatted.append({"text": text})
-        
-        return Dataset.from_list(formatted)
-    
+        dataset = load_general_source(source)
     except Exception as e:
-        logger.warning(f"Could not load general data: {e}")
-        logger.warning("Training without general examples (higher risk of catastrophic forgetting)")
-        return None
+        raise RuntimeError(
+            f"Could not load general data from '{source}' and no cache exists at {cache_dir}. "
+            "Run once with network access, point general_data_source at a local copy, "
+            "or set use_general_data to False."
+        ) from e
+
+    # Shuffle the whole source with a fixed seed rather than taking the first rows
+    sampled = dataset.shuffle(seed=CONFIG["general_data_seed"]).select(range(min(n_samples, len(dataset))))
+    formatted = sampled.map(format_general_example, remove_columns=sampled.column_names)
+
+    save_to_disk_atomic(formatted, cache_dir / "text")
+    manifest = {
+        "version": GENERAL_CACHE_VERSION,
+        "source": source,
+        "source_signature": source_signature(source),
+        "n_samples": n_samples,
+        "seed": CONFIG["general_data_seed"],
+        "num_rows": len(formatted),
+        "created": time.strftime("%Y-%m-%d %H:%M:%S"),
+    }
+    (cache_dir / "manifest.json").write_text(json.dumps(manifest, indent=2), encoding="utf-8")
+    return formatted
 
-def prepare_dataset():
-    """Combine Nigel's data with general examples"""
+def load_general_data(tokenizer, n_samples=400):
+    """Load general instruction data to prevent catastrophic forgetting
+
+    Served from a local, versioned cache of the sampled text and its tokenization,
+    so only the very first run needs network access.
+    """
+    logger.info(f"Loading {n_samples} general instruction examples...")
+    cache_dir = general_cache_dir(n_samples)
+    tokens_dir = cache_dir / f"tokens-{_slug(tokenizer.name_or_path)}-{CONFIG['max_seq_length']}"
+
+    if tokens_dir.exists():
+        logger.info(f"Using pre-tokenized general data cache: {tokens_dir}")
+        return load_from_disk(str(tokens_dir))
+
+    text_dir = cache_dir / "text"
+    if text_dir.exists():
+        formatted = load_from_disk(str(text_dir))
+    else:
+        formatted = build_general_text_cache(n_samples, cache_dir)
+
+    tokenized = formatted.map(
+        lambda x: tokenize_function(x, tokenizer),
+        batched=True,
+        remove_columns=formatted.column_names
+    )
+    save_to_disk_atomic(tokenized, tokens_dir)
+    logger.info(f"Cached tokenized general data: {tokens_dir}")
+    return load_from_disk(str(tokens_dir))
+
+def prepare_dataset(tokenizer):
+    """Combine Nigel's data with general examples, tokenized"""
     nigel_data = load_nigel_data()
     logger.info(f"Loaded {len(nigel_data)} Nigel value examples")
+    nigel_tokenized = nigel_data.map(
+        lambda x: tokenize_function(x, tokenizer),
+        batched=True,
+        remove_columns=nigel_data.column_names
+    )
     
     if CONFIG["use_general_data"]:
-        general_data = load_general_data(CONFIG["general_data_samples"])
-        if general_data:
-            combined = concatenate_datasets([nigel_data, general_data])
-            logger.info(f"Combined dataset: {len(combined)} total examples ({len(nigel_data)} values + {len(general_data)} general)")
-            return combined.shuffle(seed=42)
+        general_data = load_general_data(tokenizer, CONFIG["general_data_samples"])
+        combined = concatenate_datasets([nigel_tokenized, general_data])
+        logger.info(f"Combined dataset: {len(combined)} total examples ({len(nigel_data)} values + {len(general_data)} general)")
+        return combined.shuffle(seed=42)
     
-    return nigel_data.shuffle(seed=42)
+    return nigel_tokenized.shuffle(seed=42)
 
 # ============================================================================
 # Model setup
@@ -200,12 +309,7 @@ def train():
     model = setup_lora(model)
     
     # Prepare data
-    dataset = prepare_dataset()
-    tokenized_dataset = dataset.map(
-        lambda x: tokenize_function(x, tokenizer),
-        batched=True,
-        remove_columns=dataset.column_names
-    )
+    tokenized_dataset = prepare_dataset(tokenizer)
     
     # Split train/val
     split = tokenized_dataset.train_test_split(test_size=0.1, seed=42)
@@ -214,10 +318,29 @@ def train():
     
     logger.info(f"Training on {len(train_dataset)} examples, validating on {len(eval_dataset)}")
     
+    pruning = None
+    if CONFIG["prune_mode"] != "off":
+        train_dataset = train_dataset.add_column(INDEX_COLUMN, list(range(len(train_dataset))))
+        pruning = LossPruning(len(train_dataset), CONFIG["num_epochs"], CONFIG["prune_mode"], CONFIG["prune_keep"])
+        logger.info(f"Loss pruning ({CONFIG['prune_mode']}): {len(pruning)} example passes instead of {len(train_dataset) * CONFIG['num_epochs']}")
+    
+    # Agreement with the user's A/B answers, scored at every evaluation
+    scorer = None
+    user_answers = CONFIG["user_answers_path"]
+    if user_answers and Path(user_answers).is_file() and Path(CONFIG["questions_path"]).is_file():
+        from agreement import AgreementScorer
+        scorer = AgreementScorer(tokenizer, Path(user_answers), Path(CONFIG["questions_path"]), batch_size=CONFIG["batch_size"])
+        if len(scorer):
+            logger.info(f"Early stopping on agreement with {len(scorer)} answers")
+        else:
+            logger.warning(f"No answers in {user_answers} match {CONFIG['questions_path']}; agreement not used")
+            scorer = None
+    
     # Training arguments
     training_args = TrainingArguments(
         output_dir=CONFIG["output_dir"],
-        num_train_epochs=CONFIG["num_epochs"],
+        # The pruning sampler runs every epoch's pass inside one Trainer epoch
+        num_train_epochs=1 if pruning else CONFIG["num_epochs"],
         per_device_train_batch_size=CONFIG["batch_size"],
         per_device_eval_batch_size=CONFIG["batch_size"],
         gradient_accumulation_steps=CONFIG["gradient_accumulation_steps"],
@@ -230,7 +353,9 @@ def train():
         eval_strategy="steps",
         save_total_limit=3,
         load_best_model_at_end=True,
-        metric_for_best_model="eval_loss",
+        # AgreementEarlyStoppingCallback adds eval_weighted_agreement to each evaluation
+        metric_for_best_model="eval_weighted_agreement" if scorer else "eval_loss",
+        greater_is_better=bool(scorer),
         fp16=CONFIG["fp16"],
         dataloader_pin_memory=True,
         remove_unused_columns=False,
@@ -243,20 +368,34 @@ def train():
     )
     
     # Trainer
-    trainer = Trainer(
+    callbacks = [MetricsCallback(CONFIG["metrics_file"], padded_tokens_per_sample=CONFIG["max_seq_length"])]
+    if scorer:
+        callbacks.append(AgreementEarlyStoppingCallback(
+            scorer,
+            every_steps=CONFIG["save_steps"],
+            patience=CONFIG["agreement_patience"],
+            metrics_path=CONFIG["metrics_file"],
+        ))
+    trainer_kwargs = dict(
         model=model,
         args=training_args,
         train_dataset=train_dataset,
         eval_dataset=eval_dataset,
         data_collator=data_collator,
+        callbacks=callbacks,
     )
+    trainer = LossPruningTrainer(**trainer_kwargs, pruning=pruning) if pruning else Trainer(**trainer_kwargs)
     
     # Train
     logger.info("Starting training...")
-    logger.info(f"Estimated time: {len(train_dataset) * CONFIG['num_epochs'] / (CONFIG['batch_size'] * CONFIG['gradient_accumulation_steps']) / 60:.1f} minutes")
+    example_passes = len(pruning) if pruning else len(train_dataset) * CONFIG["num_epochs"]
+    logger.info(f"Estimated time: {example_passes / (CONFIG['batch_size'] * CONFIG['gradient_accumulation_steps']) / 60:.1f} minutes")
     
     trainer.train()
     
+    if pruning:
+        report_pruning(trainer, Path(CONFIG["output_dir"]) / PRUNING_RUNS_FILENAME, scorer, base_model=CONFIG["model_name"])
+    
     # Save final adapter
     logger.info(f"Saving final adapter to {CONFIG['output_dir']}")
     trainer.save_model()
@@ -264,6 +403,7 @@ def train():
     
     logger.info("✅ Training complete!")
     logger.info(f"Adapter saved to: {CONFIG['output_dir']}")
+    logger.info(f"Training metrics: {CONFIG['metrics_file']}")
     logger.info("\nTo use the adapter:")
     logger.info(f"  from peft import PeftModel")
     logger.info(f"  base_model = AutoModelForCausalLM.from_pretrained('{CONFIG['model_name']}')")
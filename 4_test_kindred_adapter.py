@@ -3,36 +3,51 @@ Test the Nigel values LoRA adapter with various scenarios.
 Usage: conda activate train_for_nigel && python test_nigel_adapter.py
 """
 
-import torch
-from transformers import AutoModelForCausalLM, AutoTokenizer
-from peft import PeftModel
+import argparse
 import os
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent / "kindred2"))
 
 # Configuration
 BASE_MODEL = "Qwen/Qwen2.5-7B-Instruct"
 ADAPTER_PATH = "./nigel_lora_adapter"
 
-def load_model():
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--base-model", default=BASE_MODEL, help="HF base model or local path")
+    parser.add_argument("--adapter", default=ADAPTER_PATH, help="LoRA adapter directory")
+    parser.add_argument("--draft-model", default=None,
+                        help="Small same-tokenizer model for assisted decoding, e.g. Qwen/Qwen2.5-0.5B-Instruct")
+    return parser.parse_args(argv)
+
+def load_model(base_model_name=BASE_MODEL, adapter_path=ADAPTER_PATH):
     """Load base model and apply LoRA adapter"""
+    # Heavy imports are deferred so --help and missing-adapter errors are instant
+    import torch
+    from transformers import AutoModelForCausalLM, AutoTokenizer
+    from peft import PeftModel
+    
     print("Loading base model...")
-    tokenizer = AutoTokenizer.from_pretrained(BASE_MODEL)
+    tokenizer = AutoTokenizer.from_pretrained(base_model_name)
     
     base_model = AutoModelForCausalLM.from_pretrained(
-        BASE_MODEL,
+        base_model_name,
         torch_dtype=torch.float16,
         device_map="auto",
         trust_remote_code=True
     )
     
     print("Loading LoRA adapter...")
-    model = PeftModel.from_pretrained(base_model, ADAPTER_PATH)
+    model = PeftModel.from_pretrained(base_model, adapter_path)
     model = model.merge_and_unload()  # Merge adapter weights for faster inference
     
     print("Model loaded successfully!\n")
     return model, tokenizer
 
-def generate_response(model, tokenizer, prompt, max_length=512):
-    """Generate response from the model"""
+def generate_response(generator, tokenizer, prompt, max_length=512):
+    """Generate response from the model (a speculative.SpeculativeGenerator)"""
     messages = [{"role": "user", "content": prompt}]
     text = tokenizer.apply_chat_template(
         messages,
@@ -40,16 +55,15 @@ def generate_response(model, tokenizer, prompt, max_length=512):
         add_generation_prompt=True
     )
     
-    inputs = tokenizer([text], return_tensors="pt").to(model.device)
+    inputs = tokenizer([text], return_tensors="pt").to(generator.model.device)
     
-    with torch.no_grad():
-        outputs = model.generate(
-            **inputs,
-            max_new_tokens=max_length,
-            temperature=0.7,
-            top_p=0.9,
-            do_sample=True
-        )
+    outputs = generator.generate(
+        inputs,
+        max_new_tokens=max_length,
+        temperature=0.7,
+        top_p=0.9,
+        do_sample=True
+    )
     
     response = tokenizer.decode(outputs[0], skip_special_tokens=True)
     # Extract just the assistant's response
@@ -58,7 +72,7 @@ def generate_response(model, tokenizer, prompt, max_length=512):
     
     return response
 
-def run_tests(model, tokenizer):
+def run_tests(generator, tokenizer):
     """Run test scenarios to validate values"""
     
     test_scenarios = [
@@ -105,13 +119,13 @@ def run_tests(model, tokenizer):
         print("Response:")
         print("-" * 80)
         
-        response = generate_response(model, tokenizer, scenario['prompt'])
+        response = generate_response(generator, tokenizer, scenario['prompt'])
         print(response)
         print()
         
         input("Press Enter to continue to next test...")
 
-def interactive_mode(model, tokenizer):
+def interactive_mode(generator, tokenizer):
     """Interactive chat mode"""
     print("\n" + "="*80)
     print("INTERACTIVE MODE - Chat with Nigel-tuned model")
@@ -127,18 +141,21 @@ def interactive_mode(model, tokenizer):
             continue
         
         print("\nNigel-tuned model:", end=" ")
-        response = generate_response(model, tokenizer, prompt)
+        response = generate_response(generator, tokenizer, prompt)
         print(response)
         print()
 
 if __name__ == "__main__":
-    if not os.path.exists(ADAPTER_PATH):
-        print(f"ERROR: Adapter not found at {ADAPTER_PATH}")
+    args = parse_args(sys.argv[1:])
+    if not os.path.exists(args.adapter):
+        print(f"ERROR: Adapter not found at {args.adapter}")
         print("Make sure training completed successfully.")
         exit(1)
     
     # Load model
-    model, tokenizer = load_model()
+    model, tokenizer = load_model(args.base_model, args.adapter)
+    from speculative import SpeculativeGenerator, maybe_load_draft_model
+    generator = SpeculativeGenerator(model, maybe_load_draft_model(args.draft_model, model, tokenizer))
     
     # Run tests
     print("\nChoose mode:")
@@ -149,9 +166,10 @@ if __name__ == "__main__":
     choice = input("\nEnter choice (1-3): ").strip()
     
     if choice in ['1', '3']:
-        run_tests(model, tokenizer)
+        run_tests(generator, tokenizer)
     
     if choice in ['2', '3']:
-        interactive_mode(model, tokenizer)
+        interactive_mode(generator, tokenizer)
     
+    print(f"\nDecoding: {generator.stats.summary()}")
     print("\nDone!")
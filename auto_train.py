@@ -8,6 +8,9 @@ import time
 import json
 from pathlib import Path
 
+sys.path.insert(0, str(Path(__file__).parent / "kindred2"))
+from training_metrics import read_metrics, summarize_metrics, format_summary
+
 # Fix Windows console encoding
 if sys.platform == "win32":
     sys.stdout.reconfigure(encoding='utf-8')
@@ -15,6 +18,7 @@ if sys.platform == "win32":
 MAX_RETRIES = 5
 LOG_FILE = "training_log_auto.txt"
 STATUS_FILE = "training_status_auto.json"
+METRICS_FILE = "nigel_lora_adapter/training_metrics.jsonl"
 
 def log(msg):
     print(f"[{time.strftime('%H:%M:%S')}] {msg}", flush=True)
@@ -101,10 +105,13 @@ def run_training():
                 f.write(full_log)
             
             # Save status
+            metrics_summary = summarize_metrics(read_metrics(Path(METRICS_FILE)))
             status = {
                 "attempt": attempt + 1,
                 "exit_code": result.returncode,
-                "timestamp": time.strftime("%Y-%m-%d %H:%M:%S")
+                "timestamp": time.strftime("%Y-%m-%d %H:%M:%S"),
+                "metrics_file": METRICS_FILE,
+                "metrics": metrics_summary
             }
             with open(STATUS_FILE, "w") as f:
                 json.dump(status, f, indent=2)
@@ -120,6 +127,10 @@ def run_training():
                     if any(kw in line.lower() for kw in ["loss", "epoch", "saved", "complete"]):
                         print(line)
                 
+                if metrics_summary["steps"]:
+                    log("\nTraining Metrics:")
+                    print(format_summary(metrics_summary))
+                
                 return True
             
             else:
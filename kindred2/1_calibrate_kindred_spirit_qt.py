@@ -10,25 +10,35 @@ Features:
 - Two-column view showing opposing perspectives with quotes
 - Yes/No selection with confidence levels (25%, 50%, 75%, 99%)
 - Summary view of all responses at completion
+- Questions are read through an indexed bank (question_bank.py), so large
+  banks open instantly and --phase filters without scanning the file
+- Every answer is autosaved to a journal (fsync per answer); --resume, or
+  answering Yes at startup, continues an interrupted session
+- Optional adaptive mode (--adaptive): asks the most informative question next
+  and stops once the value profile is stable (see adaptive_calibration.py)
 
 Outputs: {username}_kindred_spirit.json
 """
 
 import argparse
-import json
 import sys
 from datetime import datetime
 from pathlib import Path
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Sequence
 
 from PyQt6.QtWidgets import (
     QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
     QLabel, QPushButton, QProgressBar, QTextEdit, QListWidget,
     QListWidgetItem, QFrame, QScrollArea, QButtonGroup, QMessageBox
 )
-from PyQt6.QtCore import Qt, QSize
+from PyQt6.QtCore import Qt, QSize, QTimer
 from PyQt6.QtGui import QFont, QIcon
 
+from adaptive_calibration import AdaptiveCalibrator
+from jsonl_store import write_records
+from question_bank import QuestionBank, open_question_bank
+from session_journal import SessionJournal, journal_path_for
+
 
 class CalibrationQuestion:
     """Represents a single calibration question with perspectives"""
@@ -51,46 +61,76 @@ class UserResponse:
         self.choice = choice  # 'A' or 'B'
         self.confidence = confidence  # 25, 50, 75, or 99
         self.timestamp = datetime.now().isoformat()
+    
+    def to_dict(self) -> Dict:
+        return {
+            "question_id": self.question_id,
+            "question": self.question_text,
+            "choice": self.choice,
+            "confidence": self.confidence,
+            "timestamp": self.timestamp
+        }
+    
+    @classmethod
+    def from_dict(cls, data: Dict) -> "UserResponse":
+        response = cls(data["question_id"], data["question"], data["choice"], data["confidence"])
+        response.timestamp = data.get("timestamp", response.timestamp)
+        return response
 
 
-class PerspectiveCard(QFrame):
-    """A card displaying one perspective with person, quote, and source"""
+class CardContent:
+    """Display strings for one perspective card, formatted ahead of time"""
     def __init__(self, perspective: Dict, option_label: str, option_text: str):
+        self.header = f"<b>{option_label}: {option_text}</b>"
+        self.person = f"<b>{perspective['person']}</b> ({perspective['years']})"
+        self.role = perspective['role']
+        self.quote = f'"{perspective["quote"]}"'
+
+
+class PreparedQuestion:
+    """A question with both cards' content formatted, ready to display"""
+    def __init__(self, question: CalibrationQuestion):
+        self.question = question
+        self.left = CardContent(question.perspective_for, "Option A", question.option_a)
+        self.right = CardContent(question.perspective_against, "Option B", question.option_b)
+
+
+class PerspectiveCard(QFrame):
+    """A card displaying one perspective with person, quote, and source.
+
+    The widgets are built once; set_content() swaps the text in place.
+    """
+    def __init__(self):
         super().__init__()
         self.setFrameStyle(QFrame.Shape.Box | QFrame.Shadow.Raised)
         self.setLineWidth(2)
-        self.setup_ui(perspective, option_label, option_text)
+        self.setup_ui()
     
-    def setup_ui(self, perspective: Dict, option_label: str, option_text: str):
+    def setup_ui(self):
         layout = QVBoxLayout()
         layout.setSpacing(10)
         layout.setContentsMargins(15, 15, 15, 15)
         
         # Option label and text
-        option_header = QLabel(f"<b>{option_label}: {option_text}</b>")
-        option_header.setWordWrap(True)
-        option_header.setStyleSheet("color: #2C5AA0; font-size: 14pt;")
-        layout.addWidget(option_header)
+        self.option_header = QLabel()
+        self.option_header.setWordWrap(True)
+        self.option_header.setStyleSheet("color: #2C5AA0; font-size: 14pt;")
+        layout.addWidget(self.option_header)
         
         # Person name and details
-        person = perspective['person']
-        years = perspective['years']
-        role = perspective['role']
-        
-        person_label = QLabel(f"<b>{person}</b> ({years})")
-        person_label.setStyleSheet("font-size: 12pt; color: #e6e6e6;")
-        layout.addWidget(person_label)
+        self.person_label = QLabel()
+        self.person_label.setStyleSheet("font-size: 12pt; color: #e6e6e6;")
+        layout.addWidget(self.person_label)
         
-        role_label = QLabel(role)
-        role_label.setStyleSheet("font-size: 10pt; color: #555555; font-style: italic;")
-        role_label.setWordWrap(True)
-        layout.addWidget(role_label)
+        self.role_label = QLabel()
+        self.role_label.setStyleSheet("font-size: 10pt; color: #555555; font-style: italic;")
+        self.role_label.setWordWrap(True)
+        layout.addWidget(self.role_label)
         
         # Quote
-        quote_text = QTextEdit()
-        quote_text.setReadOnly(True)
-        quote_text.setPlainText(f'"{perspective["quote"]}"')
-        quote_text.setStyleSheet("""
+        self.quote_text = QTextEdit()
+        self.quote_text.setReadOnly(True)
+        self.quote_text.setStyleSheet("""
             QTextEdit {
                 background-color: #f5f5f5;
                 border: 1px solid #cccccc;
@@ -100,12 +140,19 @@ class PerspectiveCard(QFrame):
                 color: #333333;
             }
         """)
-        quote_text.setMinimumHeight(150)
-        quote_text.setMaximumHeight(300)
-        layout.addWidget(quote_text)
+        self.quote_text.setMinimumHeight(150)
+        self.quote_text.setMaximumHeight(300)
+        layout.addWidget(self.quote_text)
         
         layout.addStretch()
         self.setLayout(layout)
+    
+    def set_content(self, content: CardContent):
+        """Show a different perspective in the existing widgets"""
+        self.option_header.setText(content.header)
+        self.person_label.setText(content.person)
+        self.role_label.setText(content.role)
+        self.quote_text.setPlainText(content.quote)
 
 
 class QuestionView(QWidget):
@@ -169,13 +216,11 @@ class QuestionView(QWidget):
         perspectives_layout.setSpacing(15)
         
         # Left perspective (perspective_for / Option A)
-        self.left_card = QFrame()
-        self.left_card.setFrameStyle(QFrame.Shape.Box | QFrame.Shadow.Raised)
+        self.left_card = PerspectiveCard()
         perspectives_layout.addWidget(self.left_card)
         
         # Right perspective (perspective_against / Option B)
-        self.right_card = QFrame()
-        self.right_card.setFrameStyle(QFrame.Shape.Box | QFrame.Shadow.Raised)
+        self.right_card = PerspectiveCard()
         perspectives_layout.addWidget(self.right_card)
         
         perspectives_container.setLayout(perspectives_layout)
@@ -296,7 +341,8 @@ class QuestionView(QWidget):
         
         self.setLayout(layout)
     
-    def load_question(self, question: CalibrationQuestion, question_num: int, total: int):
+    def load_question(self, question: CalibrationQuestion, question_num: int, total: int,
+                      prepared: Optional[PreparedQuestion] = None):
         """Load and display a question"""
         self.current_question = question
         self.selected_choice = None
@@ -304,6 +350,7 @@ class QuestionView(QWidget):
         # Update toolbar
         self.question_number_label.setText(f"Question {question_num} of {total}")
         self.question_label.setText(question.question)
+        self.progress_bar.setMaximum(total)
         self.progress_bar.setValue(question_num - 1)
         
         # Update choice buttons text
@@ -317,34 +364,20 @@ class QuestionView(QWidget):
             btn.setEnabled(False)
         
         # Update perspective cards
-        self.update_perspective_cards()
+        self.update_perspective_cards(prepared)
     
-    def update_perspective_cards(self):
-        """Update the perspective cards with new data"""
+    def update_perspective_cards(self, prepared: Optional[PreparedQuestion] = None):
+        """Update the perspective cards in place with new data"""
         if not self.current_question:
             return
-        
-        # Clear old cards
-        left_card = PerspectiveCard(
-            self.current_question.perspective_for,
-            "Option A",
-            self.current_question.option_a
-        )
-        right_card = PerspectiveCard(
-            self.current_question.perspective_against,
-            "Option B",
-            self.current_question.option_b
-        )
-        
-        # Replace cards
-        parent_layout = self.left_card.parent().layout()
-        parent_layout.replaceWidget(self.left_card, left_card)
-        parent_layout.replaceWidget(self.right_card, right_card)
-        
-        self.left_card.deleteLater()
-        self.right_card.deleteLater()
-        self.left_card = left_card
-        self.right_card = right_card
+        if prepared is None or prepared.question is not self.current_question:
+            prepared = PreparedQuestion(self.current_question)
+        
+        # One layout pass for both cards instead of one per label
+        self.setUpdatesEnabled(False)
+        self.left_card.set_content(prepared.left)
+        self.right_card.set_content(prepared.right)
+        self.setUpdatesEnabled(True)
     
     def on_choice_selected(self, choice: str):
         """Handle choice selection"""
@@ -463,17 +496,59 @@ class CalibrationWindow(QMainWindow):
     """Main application window"""
     def __init__(self, questions_path: Optional[Path] = None,
                  output_path: Optional[Path] = None,
-                 window_title: Optional[str] = None):
+                 window_title: Optional[str] = None,
+                 adaptive: bool = False,
+                 phase: Optional[str] = None,
+                 resume: bool = False):
         super().__init__()
-        self.questions: List[CalibrationQuestion] = []
+        self.bank: Optional[QuestionBank] = None
+        self.questions: Sequence[CalibrationQuestion] = []
+        self.phase = phase
+        self.prefetched: Optional[PreparedQuestion] = None
+        self.prefetched_index: Optional[int] = None
+        self.adaptive: Optional[AdaptiveCalibrator] = None
         self.responses: List[UserResponse] = []
         self.current_question_index = 0
         self.questions_path = questions_path
         self.output_path = output_path
         self.window_title = window_title
+        self.journal = SessionJournal(journal_path_for(
+            output_path or (Path(__file__).parent / "calibration_session.json")
+        ))
         
         self.setup_ui()
+        try:
+            journal_meta, journal_records = self.journal.recover()
+        except ValueError as e:
+            QMessageBox.critical(self, "Damaged Session Journal", str(e))
+            sys.exit(1)
+        if journal_records and not resume:
+            resume = QMessageBox.question(
+                self,
+                "Resume Session",
+                f"An unfinished session with {len(journal_records)} answers was found.\n"
+                "Resume where you left off?"
+            ) == QMessageBox.StandardButton.Yes
+        resume = resume and bool(journal_meta)
+        if resume:
+            # Continue with the question set and mode the session started with
+            if journal_meta.get("questions"):
+                self.questions_path = Path(journal_meta["questions"])
+            self.phase = journal_meta.get("phase")
+            adaptive = journal_meta.get("adaptive", False)
+        
         self.load_questions()
+        if adaptive:
+            self.adaptive = AdaptiveCalibrator(list(self.bank.iter_questions(self.phase)))
+        if resume:
+            self.restore_responses(journal_records)
+        else:
+            self.journal.start({
+                "questions": str(self.questions_path) if self.questions_path else None,
+                "phase": self.phase,
+                "adaptive": adaptive,
+                "started": datetime.now().isoformat(),
+            })
         self.show_next_question()
     
     def setup_ui(self):
@@ -501,13 +576,13 @@ class CalibrationWindow(QMainWindow):
         self.summary_view.hide()
     
     def load_questions(self):
-        """Load questions from JSON file"""
+        """Open the question bank; questions are parsed only when shown"""
         json_path = self.questions_path or (Path(__file__).parent / "questions_with_perspectives.json")
         try:
-            with open(json_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                for q_data in data['calibration_questions']:
-                    self.questions.append(CalibrationQuestion(q_data))
+            self.bank = open_question_bank(json_path)
+            self.questions = self.bank.sequence(self.phase, factory=CalibrationQuestion)
+            if not self.questions:
+                raise ValueError(f"No questions in phase '{self.phase}'. Phases: {', '.join(self.bank.phases())}")
         except Exception as e:
             QMessageBox.critical(
                 self,
@@ -518,19 +593,67 @@ class CalibrationWindow(QMainWindow):
     
     def show_next_question(self):
         """Display the next question"""
+        if self.adaptive is not None:
+            q_data = self.adaptive.next_question()
+            if q_data is None:
+                self.show_summary()
+                return
+            self.question_view.load_question(
+                CalibrationQuestion(q_data),
+                len(self.responses) + 1,
+                self.adaptive.max_session_questions
+            )
+            self.question_view.question_number_label.setText(
+                f"Question {len(self.responses) + 1} (adaptive, at most {self.adaptive.max_session_questions})"
+            )
+            return
+
         if self.current_question_index < len(self.questions):
-            question = self.questions[self.current_question_index]
+            prepared = self.take_prefetched(self.current_question_index)
             self.question_view.load_question(
-                question,
+                prepared.question,
                 self.current_question_index + 1,
-                len(self.questions)
+                len(self.questions),
+                prepared
             )
+            # Read and format the next question once this one is on screen
+            QTimer.singleShot(0, self.prefetch_next_question)
         else:
             self.show_summary()
     
+    def take_prefetched(self, index: int) -> PreparedQuestion:
+        """The prepared question at index, from the prefetch slot if it holds it"""
+        if self.prefetched is not None and self.prefetched_index == index:
+            prepared = self.prefetched
+        else:
+            prepared = PreparedQuestion(self.questions[index])
+        self.prefetched = None
+        self.prefetched_index = None
+        return prepared
+    
+    def prefetch_next_question(self):
+        """Load and format the following question while the user reads this one"""
+        next_index = self.current_question_index + 1
+        if next_index < len(self.questions) and self.prefetched_index != next_index:
+            self.prefetched = PreparedQuestion(self.questions[next_index])
+            self.prefetched_index = next_index
+    
+    def restore_responses(self, records: List[Dict]):
+        """Replay journaled answers so the session continues after the last one"""
+        for record in records:
+            response = UserResponse.from_dict(record)
+            self.responses.append(response)
+            if self.adaptive is not None:
+                self.adaptive.record(response.question_id, response.choice, response.confidence)
+        self.current_question_index = len(self.responses)
+    
     def on_answer_submitted(self, response: UserResponse):
         """Handle answer submission"""
+        # Durable before the next question appears
+        self.journal.append(response.to_dict())
         self.responses.append(response)
+        if self.adaptive is not None:
+            self.adaptive.record(response.question_id, response.choice, response.confidence)
         self.current_question_index += 1
         self.show_next_question()
     
@@ -545,7 +668,7 @@ class CalibrationWindow(QMainWindow):
         self.summary_view.show()
         
         # Update progress bar to 100%
-        self.question_view.progress_bar.setValue(len(self.questions))
+        self.question_view.progress_bar.setValue(self.question_view.progress_bar.maximum())
     
     def save_results(self):
         """Save results to JSON file"""
@@ -561,27 +684,21 @@ class CalibrationWindow(QMainWindow):
             username = "anonymous"
         
         # Prepare output data
-        output_data = {
+        meta = {
             "username": username,
             "timestamp": datetime.now().isoformat(),
             "total_questions": len(self.questions),
-            "responses": [
-                {
-                    "question_id": r.question_id,
-                    "question": r.question_text,
-                    "choice": r.choice,
-                    "confidence": r.confidence,
-                    "timestamp": r.timestamp
-                }
-                for r in self.responses
-            ]
         }
+        if self.adaptive is not None:
+            meta["adaptive"] = self.adaptive.profile()
+        records = (r.to_dict() for r in self.responses)
         
-        # Save to file
+        # Save to file (.jsonl streams one response per line, .json keeps the legacy document).
+        # write_records renames a complete temp file into place, so a crash cannot truncate it.
         output_path = self.output_path or (Path(__file__).parent / f"{username}_kindred_spirit.json")
         try:
-            with open(output_path, 'w', encoding='utf-8') as f:
-                json.dump(output_data, f, indent=2, ensure_ascii=False)
+            write_records(output_path, records, meta=meta, key="responses")
+            self.journal.discard()
             
             QMessageBox.information(
                 self,
@@ -598,9 +715,16 @@ class CalibrationWindow(QMainWindow):
 
 def parse_args(argv: List[str]) -> argparse.Namespace:
     parser = argparse.ArgumentParser(description="Kindred Spirit Calibration - Qt GUI")
-    parser.add_argument("--questions", type=str, default=None, help="Path to questions JSON file")
-    parser.add_argument("--output", type=str, default=None, help="Path to output JSON file")
+    parser.add_argument("--questions", type=str, default=None,
+                        help="Path to questions JSON/JSONL file or a .sqlite question bank")
+    parser.add_argument("--output", type=str, default=None, help="Path to output .json or .jsonl file")
     parser.add_argument("--title", type=str, default=None, help="Window title override")
+    parser.add_argument("--phase", type=str, default=None,
+                        help="Only ask questions from this phase (e.g. contemporary, timeless)")
+    parser.add_argument("--resume", action="store_true",
+                        help="Continue the interrupted session recorded in the autosave journal")
+    parser.add_argument("--adaptive", action="store_true",
+                        help="Ask the most informative question next and stop once the profile is stable")
     return parser.parse_args(argv)
 
 
@@ -619,7 +743,10 @@ def main():
     window = CalibrationWindow(
         questions_path=questions_path,
         output_path=output_path,
-        window_title=args.title
+        window_title=args.title,
+        adaptive=args.adaptive,
+        phase=args.phase,
+        resume=args.resume
     )
     window.show()
     
@@ -0,0 +1,358 @@
+#!/usr/bin/env python3
+"""
+Adaptive question selection for the calibrators.
+
+The user's position on a few latent value dimensions (theta) is modelled with a
+logistic item-response model: P(choose A) = sigmoid(loading . theta). After
+every answer the posterior over theta is refit as a Gaussian (Laplace
+approximation), and the next question is the one whose answer has the largest
+expected information gain about theta. The adaptive part stops once the
+estimate has settled.
+
+Question loadings come from an optional "dimensions" field on each question,
+e.g. {"liberty": 1.0, "care": -0.5} (positive = option A leans that way), and
+otherwise from a keyword lexicon over the two option texts. A question that
+loads on no dimension cannot move the estimate, but its answer still matters
+downstream (synthetic generation, agreement scoring), so such questions are
+asked after the adaptive part stops and are listed in the profile as
+needing a "dimensions" annotation.
+
+The simulator draws its users from the same loadings the model uses, so it
+only checks the selection and stopping rules against the model's own
+assumptions. It says nothing about how well the lexicon captures real answers.
+
+Pure Python, so the Qt calibrator keeps PyQt6 as its only dependency.
+
+Usage: python adaptive_calibration.py --questions questions.json --simulate 200
+"""
+import argparse
+import json
+import math
+import random
+import re
+import sys
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+# (dimension, stems leaning towards it, stems leaning away from it)
+DIMENSIONS: List[Tuple[str, Tuple[str, ...], Tuple[str, ...]]] = [
+    ("liberty",
+     ("right", "free", "privacy", "choose", "choice", "decide", "autonom", "legaliz", "dignity",
+      "voluntary", "protected", "own path", "separate"),
+     ("ban", "mandatory", "require", "illegal", "obey", "obedience", "surveillance", "security",
+      "control", "authority", "deport", "restrict", "prohibit", "correct")),
+    ("care",
+     ("protect", "spare", "kind", "feeling", "forgiv", "compassion", "reformed", "grow", "peace",
+      "suffering", "harm", "help", "sentient", "moral consideration"),
+     ("accountab", "punish", "justice", "report", "served", "revenge", "deserve death",
+      "responsib", "tainted")),
+    ("equality",
+     ("redistribut", "taxation", "human right", "universal", "inequality", "reparation", "repair",
+      "disadvantaged", "injustic", "unequal", "citizenship", "borders are", "medical knowledge free"),
+     ("earn", "market", "merit", "patent", "work for", "entitled", "informed voters",
+      "control immigration", "keep what")),
+    ("progress",
+     ("enhance", "improve", "evolution", "extend", "create our own", "information", "forge",
+      "technolog", "exchange", "choose when"),
+     ("sacred", "god", "faith", "tradition", "natural", "wisdom", "came before", "human limits",
+      "crosses", "is enough")),
+    ("outcomes",
+     ("save", "lives", "prevent", "outcome", "survival", "justif", "functions", "priority"),
+     ("always wrong", "never", "non-negotiable", "absolute", "honest", "truth", "promise is",
+      "as written", "identical")),
+]
+DIMENSION_NAMES = [name for name, _, _ in DIMENSIONS]
+
+# Probabilists' Gauss-Hermite rule (7 points): E[f(z)], z ~ N(0, 1)
+GH_NODES = (0.0, 1.1544053947399682, -1.1544053947399682, 2.366759410734541,
+            -2.366759410734541, 3.750439717725742, -3.750439717725742)
+GH_WEIGHTS = (0.45714285714285713, 0.24012317860501264, 0.24012317860501264,
+              0.030757123967586, 0.030757123967586, 0.000548268855526, 0.000548268855526)
+
+
+def sigmoid(x: float) -> float:
+    if x >= 0:
+        return 1.0 / (1.0 + math.exp(-x))
+    z = math.exp(x)
+    return z / (1.0 + z)
+
+
+def binary_entropy(p: float) -> float:
+    if p <= 0.0 or p >= 1.0:
+        return 0.0
+    return -(p * math.log(p) + (1.0 - p) * math.log(1.0 - p))
+
+
+def lexicon_score(text: str) -> List[float]:
+    text = " " + re.sub(r"[^a-z' ]+", " ", text.lower()) + " "
+    scores = []
+    for _, towards, away in DIMENSIONS:
+        hits = sum(1 for stem in towards if " " + stem in text)
+        hits -= sum(1 for stem in away if " " + stem in text)
+        scores.append(float(hits))
+    return scores
+
+
+def question_loadings(question: Dict) -> List[float]:
+    """Loading vector for option A; option B is the opposite pole."""
+    explicit = question.get("dimensions")
+    if isinstance(explicit, dict):
+        return [float(explicit.get(name, 0.0)) for name in DIMENSION_NAMES]
+    a = lexicon_score(question.get("option_a", ""))
+    b = lexicon_score(question.get("option_b", ""))
+    return [max(-2.0, min(2.0, x - y)) for x, y in zip(a, b)]
+
+
+def soft_label(choice: str, confidence: int) -> float:
+    """Probability mass on option A implied by a choice and its confidence (25-99)."""
+    strength = min(0.995, 0.5 + 0.5 * confidence / 100.0)
+    return strength if choice == "A" else 1.0 - strength
+
+
+def expected_information_gain(mean: float, var: float) -> float:
+    """Mutual information between the answer and theta along one loading direction.
+
+    z = loading . theta ~ N(mean, var); EIG = H(E[p]) - E[H(p)].
+    """
+    sd = math.sqrt(max(var, 0.0))
+    p_bar = 0.0
+    expected_entropy = 0.0
+    for node, weight in zip(GH_NODES, GH_WEIGHTS):
+        p = sigmoid(mean + sd * node)
+        p_bar += weight * p
+        expected_entropy += weight * binary_entropy(p)
+    return binary_entropy(p_bar) - expected_entropy
+
+
+def _dot(a: Sequence[float], b: Sequence[float]) -> float:
+    return sum(x * y for x, y in zip(a, b))
+
+
+def _quad_form(m: List[List[float]], v: Sequence[float]) -> float:
+    return sum(v[i] * _dot(m[i], v) for i in range(len(v)))
+
+
+def _cholesky(m: List[List[float]]) -> List[List[float]]:
+    n = len(m)
+    lower = [[0.0] * n for _ in range(n)]
+    for i in range(n):
+        for j in range(i + 1):
+            s = m[i][j] - sum(lower[i][k] * lower[j][k] for k in range(j))
+            lower[i][j] = math.sqrt(max(s, 1e-12)) if i == j else s / lower[j][j]
+    return lower
+
+
+def _cho_solve(lower: List[List[float]], b: Sequence[float]) -> List[float]:
+    n = len(b)
+    y = [0.0] * n
+    for i in range(n):
+        y[i] = (b[i] - sum(lower[i][k] * y[k] for k in range(i))) / lower[i][i]
+    x = [0.0] * n
+    for i in reversed(range(n)):
+        x[i] = (y[i] - sum(lower[k][i] * x[k] for k in range(i + 1, n))) / lower[i][i]
+    return x
+
+
+def _cho_inverse(lower: List[List[float]]) -> List[List[float]]:
+    n = len(lower)
+    columns = [_cho_solve(lower, [1.0 if i == j else 0.0 for i in range(n)]) for j in range(n)]
+    return [[columns[j][i] for j in range(n)] for i in range(n)]
+
+
+class AdaptiveCalibrator:
+    """Chooses questions by expected information gain and decides when to stop."""
+
+    def __init__(self, questions: List[Dict], min_questions: int = 10,
+                 max_questions: Optional[int] = None, max_sd: float = 0.6,
+                 stability_tol: float = 0.05, patience: int = 3, min_gain: float = 0.01,
+                 prior_sd: float = 1.0):
+        self.questions = {q["id"]: q for q in questions}
+        self.loadings = {qid: question_loadings(q) for qid, q in self.questions.items()}
+        # Questions that load on no dimension cannot move the estimate; they are asked last
+        self.candidates = [qid for qid, a in self.loadings.items() if any(a)]
+        self.unscored = [qid for qid, a in self.loadings.items() if not any(a)]
+        self.unscored_asked: List[str] = []
+        self.min_questions = min_questions
+        self.max_questions = min(max_questions or len(self.candidates), len(self.candidates))
+        self.max_sd = max_sd
+        self.stability_tol = stability_tol
+        self.patience = patience
+        self.min_gain = min_gain
+        self.prior_precision = 1.0 / (prior_sd * prior_sd)
+
+        dims = len(DIMENSION_NAMES)
+        self.mean = [0.0] * dims
+        self.cov = [[prior_sd * prior_sd if i == j else 0.0 for j in range(dims)] for i in range(dims)]
+        self.asked: List[str] = []
+        self.targets: List[float] = []
+        self.shifts: List[float] = []
+        self.stop_reason: Optional[str] = None
+
+    def expected_gain(self, question_id: str) -> float:
+        a = self.loadings[question_id]
+        return expected_information_gain(_dot(a, self.mean), _quad_form(self.cov, a))
+
+    @property
+    def max_session_questions(self) -> int:
+        return self.max_questions + len(self.unscored)
+
+    def next_question(self) -> Optional[Dict]:
+        """Most informative unasked question; once the adaptive part stops, each
+        unscored question in turn; None when the session is over."""
+        if self.stop_reason is None:
+            question = self._next_informative()
+            if question is not None:
+                return question
+        for qid in self.unscored:
+            if qid not in self.unscored_asked:
+                return self.questions[qid]
+        return None
+
+    def _next_informative(self) -> Optional[Dict]:
+        asked = set(self.asked)
+        remaining = [qid for qid in self.candidates if qid not in asked]
+        if len(self.asked) >= self.max_questions or not remaining:
+            self.stop_reason = "question_limit" if remaining else "bank_exhausted"
+            return None
+
+        best = max(remaining, key=self.expected_gain)
+        if len(self.asked) >= self.min_questions:
+            if self.expected_gain(best) < self.min_gain:
+                self.stop_reason = "low_information"
+                return None
+            if self.is_stable():
+                self.stop_reason = "stable"
+                return None
+        return self.questions[best]
+
+    def record(self, question_id: str, choice: str, confidence: int) -> None:
+        if question_id not in self.loadings or question_id in self.asked or question_id in self.unscored_asked:
+            return
+        if question_id in self.unscored:
+            self.unscored_asked.append(question_id)
+            return
+        self.asked.append(question_id)
+        self.targets.append(soft_label(choice, confidence))
+        previous = self.mean
+        self.refit()
+        self.shifts.append(math.sqrt(sum((x - y) ** 2 for x, y in zip(self.mean, previous))))
+
+    def refit(self, iterations: int = 25) -> None:
+        """Newton's method for the MAP estimate; the covariance is the inverse Hessian there."""
+        dims = len(self.mean)
+        mean = list(self.mean)
+        lower = None
+        for _ in range(iterations):
+            grad = [-self.prior_precision * m for m in mean]
+            hess = [[self.prior_precision if i == j else 0.0 for j in range(dims)] for i in range(dims)]
+            for qid, target in zip(self.asked, self.targets):
+                a = self.loadings[qid]
+                p = sigmoid(_dot(a, mean))
+                w = p * (1.0 - p)
+                for i in range(dims):
+                    grad[i] += (target - p) * a[i]
+                    for j in range(dims):
+                        hess[i][j] += w * a[i] * a[j]
+            lower = _cholesky(hess)
+            step = _cho_solve(lower, grad)
+            mean = [m + s for m, s in zip(mean, step)]
+            if max(abs(s) for s in step) < 1e-6:
+                break
+        self.mean = mean
+        self.cov = _cho_inverse(lower)
+
+    def posterior_sd(self) -> List[float]:
+        return [math.sqrt(self.cov[i][i]) for i in range(len(self.mean))]
+
+    def is_stable(self) -> bool:
+        recent = self.shifts[-self.patience:]
+        return (
+            len(recent) == self.patience
+            and max(recent) < self.stability_tol
+            and max(self.posterior_sd()) <= self.max_sd
+        )
+
+    def profile(self) -> Dict:
+        return {
+            "dimensions": {name: round(m, 3) for name, m in zip(DIMENSION_NAMES, self.mean)},
+            "sd": {name: round(sd, 3) for name, sd in zip(DIMENSION_NAMES, self.posterior_sd())},
+            "questions_asked": len(self.asked) + len(self.unscored_asked),
+            "question_bank": len(self.questions),
+            # No dimension loadings: asked, but add "dimensions" to let them inform the estimate
+            "unscored_questions": self.unscored,
+            "stop_reason": self.stop_reason,
+        }
+
+
+def simulated_answer(loading: List[float], theta: List[float], rng: random.Random) -> Tuple[str, int]:
+    p = sigmoid(_dot(loading, theta))
+    choice = "A" if rng.random() < p else "B"
+    margin = abs(p - 0.5)
+    confidence = 99 if margin > 0.4 else 75 if margin > 0.25 else 50 if margin > 0.1 else 25
+    return choice, confidence
+
+
+def simulate(questions: List[Dict], users: int, seed: int = 0, **options) -> Dict[str, float]:
+    """Compare adaptive sessions with answering every question, for simulated users.
+
+    Users answer from the same loadings the calibrator assumes, so this tests
+    the selection and stopping rules under the model, not the model itself.
+    Unscored questions are not counted in mean_questions_asked.
+    """
+    rng = random.Random(seed)
+    asked, errors, full_errors = [], [], []
+    for _ in range(users):
+        theta = [rng.gauss(0.0, 1.0) for _ in DIMENSION_NAMES]
+        answers = {}
+
+        def answer(qid):
+            if qid not in answers:
+                answers[qid] = simulated_answer(calibrator.loadings[qid], theta, rng)
+            return answers[qid]
+
+        calibrator = AdaptiveCalibrator(questions, **options)
+        while True:
+            question = calibrator.next_question()
+            if question is None:
+                break
+            calibrator.record(question["id"], *answer(question["id"]))
+        asked.append(len(calibrator.asked))
+        adaptive_mean = calibrator.mean
+
+        full = AdaptiveCalibrator(questions)
+        for qid in full.candidates:
+            full.record(qid, *answer(qid))
+        errors.append(math.dist(adaptive_mean, full.mean))
+        full_errors.append(math.dist(full.mean, theta))
+
+    return {
+        "question_bank": len(questions),
+        "informative_questions": len(AdaptiveCalibrator(questions).candidates),
+        "unscored_questions": len(AdaptiveCalibrator(questions).unscored),
+        "mean_questions_asked": round(sum(asked) / users, 1),
+        "mean_distance_to_full_bank_estimate": round(sum(errors) / users, 3),
+        "mean_full_bank_error": round(sum(full_errors) / users, 3),
+    }
+
+
+def parse_args(argv: List[str]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Adaptive calibration simulator")
+    parser.add_argument("--questions", required=True, help="questions_with_perspectives.json")
+    parser.add_argument("--simulate", type=int, default=200, help="Number of simulated users")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--min-questions", type=int, default=10)
+    parser.add_argument("--max-sd", type=float, default=0.6, help="Stop once every dimension's sd is below this")
+    return parser.parse_args(argv)
+
+
+def main() -> None:
+    args = parse_args(sys.argv[1:])
+    questions = json.loads(Path(args.questions).read_text(encoding="utf-8"))["calibration_questions"]
+    report = simulate(questions, args.simulate, args.seed,
+                      min_questions=args.min_questions, max_sd=args.max_sd)
+    for key, value in report.items():
+        print(f"{key.replace('_', ' ').capitalize()}: {value}")
+
+
+if __name__ == "__main__":
+    main()
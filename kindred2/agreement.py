@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Agreement between a model and the user's calibration answers.
+
+Every answered A/B question is put to the model with both options listed,
+and each option is scored as the assistant's reply by its mean per-token
+log-likelihood (quality_filter.response_log_likelihoods: batched forward
+passes, no generation). The model agrees with an answer when the option the
+user chose scores higher; the weighted figure counts each answer by the
+user's confidence.
+"""
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+from jsonl_store import iter_records
+from quality_filter import response_log_likelihoods
+from question_bank import QUESTIONS_KEY
+
+
+def option_prompt(question: Dict) -> str:
+    return (
+        f"{question['question']}\n\nA: {question['option_a']}\nB: {question['option_b']}\n\n"
+        "Which do you choose?"
+    )
+
+
+class AgreementScorer:
+    """Scores a model against the user's A/B choices."""
+
+    def __init__(self, tokenizer, user_answers_path: Path, questions_path: Path,
+                 batch_size: int = 8, max_length: int = 512):
+        self.tokenizer = tokenizer
+        self.batch_size = batch_size
+        self.max_length = max_length
+        questions = {str(q.get("id")): q for q in iter_records(questions_path, key=QUESTIONS_KEY)}
+        # (choice, confidence) per usable answer, and the two option items for each
+        self.answers: List[Tuple[str, float]] = []
+        self.items: List[Dict[str, str]] = []
+        for answer in iter_records(user_answers_path, key="responses"):
+            question = questions.get(str(answer.get("question_id")))
+            if not question or answer.get("choice") not in ("A", "B"):
+                continue
+            if not question.get("question") or not question.get("option_a") or not question.get("option_b"):
+                continue
+            prompt = option_prompt(question)
+            self.items += [
+                {"instruction": prompt, "response": question["option_a"]},
+                {"instruction": prompt, "response": question["option_b"]},
+            ]
+            self.answers.append((answer["choice"], float(answer.get("confidence") or 50) / 100))
+
+    def __len__(self) -> int:
+        return len(self.answers)
+
+    def score(self, model) -> Dict:
+        """{"agreement", "weighted_agreement", "answers"}; model is left in the mode it was in."""
+        was_training = model.training
+        try:
+            scores = response_log_likelihoods(model, self.tokenizer, self.items, self.batch_size, self.max_length)
+        finally:
+            if was_training:
+                model.train()
+        agreed = 0
+        weighted = 0.0
+        total_weight = 0.0
+        for i, (choice, confidence) in enumerate(self.answers):
+            preferred = "A" if scores[2 * i] >= scores[2 * i + 1] else "B"
+            agreed += preferred == choice
+            weighted += confidence if preferred == choice else 0.0
+            total_weight += confidence
+        return {
+            "agreement": round(agreed / len(self.answers), 4) if self.answers else 0.0,
+            "weighted_agreement": round(weighted / total_weight, 4) if total_weight else 0.0,
+            "answers": len(self.answers),
+        }
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Startup-time benchmark for the Kindred2 tools.
+
+Runs each entry point with --help and with a missing input, and fails if any
+run takes longer than the budget or imports a heavy ML package. Argument
+parsing and input validation must stay ahead of torch/transformers/peft.
+A --help run must exit 0 with a usage message, and a missing-input run must
+exit non-zero saying what was not found, so a script that dies early on an
+unrelated error does not count as fast.
+
+Usage: python kindred2/bench_startup.py [--budget 1.0] [--repeat 3]
+"""
+import argparse
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import List, Optional, Set, Tuple
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+KINDRED2_DIR = REPO_ROOT / "kindred2"
+
+HEAVY_MODULES = {"torch", "transformers", "peft", "datasets", "pyarrow", "accelerate", "safetensors", "PyQt6"}
+
+
+def startup_cases(missing: Path) -> List[Tuple[str, List[str]]]:
+    """(label, argv) pairs; every case is expected to exit before loading a model."""
+    cases = []
+    for script in [
+        KINDRED2_DIR / "synthetic_generate.py",
+        KINDRED2_DIR / "train_adapter.py",
+        KINDRED2_DIR / "convert_to_gguf.py",
+        KINDRED2_DIR / "kindred2_cli.py",
+        KINDRED2_DIR / "adapter_eval.py",
+        KINDRED2_DIR / "weights_loader.py",
+        KINDRED2_DIR / "embedding_index.py",
+        KINDRED2_DIR / "speculative.py",
+        KINDRED2_DIR / "quality_filter.py",
+        KINDRED2_DIR / "expand_questions.py",
+        REPO_ROOT / "4_test_kindred_adapter.py",
+        REPO_ROOT / "test_nigel_adapter_auto.py",
+    ]:
+        cases.append((f"{script.name} --help", [str(script), "--help"]))
+
+    cases += [
+        ("synthetic_generate.py missing answers", [
+            str(KINDRED2_DIR / "synthetic_generate.py"),
+            "--user-answers", str(missing / "user_answers.json"),
+            "--output", str(missing / "synthetic_qa.jsonl"),
+        ]),
+        ("train_adapter.py missing folder", [
+            str(KINDRED2_DIR / "train_adapter.py"), "--model-folder", str(missing),
+        ]),
+        ("convert_to_gguf.py missing folder", [
+            str(KINDRED2_DIR / "convert_to_gguf.py"), "--model-folder", str(missing),
+        ]),
+        ("quality_filter.py missing folder", [
+            str(KINDRED2_DIR / "quality_filter.py"), "--model-folder", str(missing),
+        ]),
+        ("adapter_eval.py missing adapter", [
+            str(KINDRED2_DIR / "adapter_eval.py"), "--model-folder", str(missing),
+        ]),
+        ("weights_loader.py warmup missing folder", [
+            str(KINDRED2_DIR / "weights_loader.py"), "warmup", "--model-folder", str(missing),
+        ]),
+        ("kindred2_cli.py status missing model", [
+            str(KINDRED2_DIR / "kindred2_cli.py"), "--models-root", str(missing.parent), "status", "nobody",
+        ]),
+        ("4_test_kindred_adapter.py missing adapter", [
+            str(REPO_ROOT / "4_test_kindred_adapter.py"), "--adapter", str(missing),
+        ]),
+        ("test_nigel_adapter_auto.py missing adapter", [
+            str(REPO_ROOT / "test_nigel_adapter_auto.py"), "--adapter", str(missing),
+        ]),
+    ]
+    return cases
+
+
+def heavy_imports(importtime_log: str) -> Set[str]:
+    """Top-level heavy packages named in `python -X importtime` output.
+
+    Attempted imports that failed because the package is not installed count too.
+    """
+    found = set()
+    for name in re.findall(r"No module named '([^']+)'", importtime_log):
+        if name.split(".", 1)[0] in HEAVY_MODULES:
+            found.add(name.split(".", 1)[0])
+    for line in importtime_log.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        module = line.rsplit("|", 1)[-1].strip()
+        top = module.split(".", 1)[0]
+        if top in HEAVY_MODULES:
+            found.add(top)
+    return found
+
+
+def unexpected_exit(argv: List[str], result: subprocess.CompletedProcess) -> Optional[str]:
+    """Why a run did not end the way its case expects, or None if it did."""
+    if "--help" in argv:
+        if result.returncode != 0 or "usage:" not in result.stdout:
+            return f"--help exited {result.returncode} without usage text"
+        return None
+    if result.returncode == 0:
+        return "missing input was accepted (exit 0)"
+    if "not found" not in (result.stdout + result.stderr).lower():
+        return f"exited {result.returncode} without a 'not found' message"
+    return None
+
+
+def run_case(argv: List[str], repeat: int) -> Tuple[float, Set[str], Optional[str]]:
+    timings = []
+    heavy: Set[str] = set()
+    problem = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", *argv],
+            capture_output=True,
+            text=True,
+            cwd=str(KINDRED2_DIR),
+        )
+        timings.append(time.perf_counter() - start)
+        heavy |= heavy_imports(result.stderr)
+        problem = problem or unexpected_exit(argv, result)
+    return statistics.median(timings), heavy, problem
+
+
+def parse_args(argv: List[str]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Kindred2 startup-time benchmark")
+    parser.add_argument("--budget", type=float, default=1.0, help="Max median seconds per case")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per case")
+    return parser.parse_args(argv)
+
+
+def main() -> None:
+    args = parse_args(sys.argv[1:])
+    failures = 0
+    with tempfile.TemporaryDirectory() as tmp:
+        missing = Path(tmp) / "does_not_exist"
+        for label, argv in startup_cases(missing):
+            seconds, heavy, problem = run_case(argv, args.repeat)
+            ok = seconds <= args.budget and not heavy and problem is None
+            failures += 0 if ok else 1
+            note = f" imported: {', '.join(sorted(heavy))}" if heavy else ""
+            note += f" ({problem})" if problem else ""
+            print(f"{'PASS' if ok else 'FAIL'} {seconds:6.3f}s  {label}{note}")
+
+    print(f"\n{failures} failure(s), budget {args.budget:.2f}s")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
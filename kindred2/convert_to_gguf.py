@@ -1,62 +1,73 @@
 #!/usr/bin/env python3
 """
 Convert a trained Kindred2 adapter to GGUF with Q4/Q6/Q8 presets.
+
+torch, transformers and peft are imported only after the adapter and the
+llama.cpp converter have been found.
 """
 import argparse
-import json
 import os
 import subprocess
+import sys
 from pathlib import Path
 from typing import List
 
-import torch
-from transformers import AutoModelForCausalLM, AutoTokenizer
-from peft import PeftModel
+from model_store import ADAPTER_DIR, resolve_base_model
+from weights_loader import LOAD_MODES
 
 
 def parse_args(argv: List[str]) -> argparse.Namespace:
     parser = argparse.ArgumentParser(description="Convert Kindred2 adapter to GGUF")
     parser.add_argument("--model-folder", required=True, help="Path to ethical model folder")
-    parser.add_argument("--quant", default="Q4_K_M", help="Quantization preset (Q4_K_M/Q6_K/Q8_0)")
+    parser.add_argument(
+        "--quant",
+        default="Q4_K_M",
+        choices=["Q4_K_M", "Q6_K", "Q8_0"],
+        help="Quantization preset (Q4_K_M/Q6_K/Q8_0)"
+    )
+    parser.add_argument(
+        "--load-mode",
+        default="eager",
+        choices=LOAD_MODES,
+        help="eager: from_pretrained; lazy: memory-mapped shards, layers loaded on first use"
+    )
     return parser.parse_args(argv)
 
 
-def resolve_base_model(model_folder: Path) -> str:
-    base_model_file = model_folder / "base_model.txt"
-    if base_model_file.exists():
-        try:
-            value = base_model_file.read_text(encoding="utf-8").strip()
-            if value:
-                return value
-        except Exception:
-            pass
-    return "D:/_GITN/kindred_spirit/models/Huihui-Qwen3-VL-8B-Instruct-abliterated"
-
-
-def merge_adapter(base_model: str, adapter_path: Path, merged_path: Path) -> None:
+def merge_adapter(base_model: str, adapter_path: Path, merged_path: Path, load_mode: str = "eager") -> None:
     os.environ["KMP_DUPLICATE_LIB_OK"] = "TRUE"
+    from transformers import AutoTokenizer
+    from peft import PeftModel
+    from weights_loader import load_causal_lm
+
     tokenizer = AutoTokenizer.from_pretrained(base_model, trust_remote_code=True)
-    model = AutoModelForCausalLM.from_pretrained(
-        base_model,
-        torch_dtype=torch.float16 if torch.cuda.is_available() else torch.float32,
-        device_map="auto",
-        trust_remote_code=True
-    )
+    model = load_causal_lm(base_model, load_mode)
     model = PeftModel.from_pretrained(model, str(adapter_path))
-    model = model.merge_and_unload()
+    merge_loaded_adapter(model, tokenizer, merged_path)
+
+
+def merge_loaded_adapter(peft_model, tokenizer, merged_path: Path):
+    """Merge an adapter that is already attached in memory and save the result."""
+    model = peft_model.merge_and_unload()
+    model.eval()
 
     merged_path.mkdir(parents=True, exist_ok=True)
     model.save_pretrained(merged_path)
     tokenizer.save_pretrained(merged_path)
+    return model
 
 
-def convert_hf_to_gguf(merged_path: Path, gguf_path: Path, quant: str) -> None:
+def find_convert_script() -> Path:
     repo_root = Path(__file__).resolve().parents[1]
-    llama_dir = repo_root / "llama.cpp"
-    convert_script = llama_dir / "convert_hf_to_gguf.py"
-
+    convert_script = repo_root / "llama.cpp" / "convert_hf_to_gguf.py"
     if not convert_script.exists():
         raise FileNotFoundError(f"llama.cpp convert script not found: {convert_script}")
+    return convert_script
+
+
+def convert_hf_to_gguf(merged_path: Path, gguf_path: Path, quant: str) -> None:
+    convert_script = find_convert_script()
+    llama_dir = convert_script.parent
 
     fp16_out = gguf_path.with_suffix("").with_name(gguf_path.stem + "-f16.gguf")
 
@@ -83,26 +94,39 @@ def convert_hf_to_gguf(merged_path: Path, gguf_path: Path, quant: str) -> None:
         fp16_out.replace(gguf_path)
 
 
-def main() -> None:
-    args = parse_args(__import__("sys").argv[1:])
-    model_folder = Path(args.model_folder)
+def export(model_folder: Path, quant: str = "Q4_K_M", peft_model=None, tokenizer=None,
+           load_mode: str = "eager") -> Path:
+    """Merge the adapter and convert to GGUF; returns the GGUF path.
+
+    Pass the trained peft_model and tokenizer to merge in place instead of
+    reloading the base model from disk.
+    """
+    model_folder = Path(model_folder)
     if not model_folder.exists():
         raise FileNotFoundError(f"Model folder not found: {model_folder}")
 
-    adapter_path = model_folder / "finetuned_adapter"
-    if not adapter_path.exists():
+    adapter_path = model_folder / ADAPTER_DIR
+    if peft_model is None and not adapter_path.exists():
         raise FileNotFoundError(f"finetuned_adapter not found: {adapter_path}")
+    # Fail before the minutes-long merge if the converter is missing
+    find_convert_script()
 
-    base_model = resolve_base_model(model_folder)
     merged_path = model_folder / "merged_model"
+    if peft_model is None:
+        merge_adapter(resolve_base_model(model_folder), adapter_path, merged_path, load_mode)
+    else:
+        merge_loaded_adapter(peft_model, tokenizer, merged_path)
 
-    merge_adapter(base_model, adapter_path, merged_path)
-
-    quant = args.quant
     gguf_name = f"finetuned_model_{quant}.gguf".lower()
     gguf_path = model_folder / gguf_name
 
     convert_hf_to_gguf(merged_path, gguf_path, quant)
+    return gguf_path
+
+
+def main() -> None:
+    args = parse_args(sys.argv[1:])
+    export(Path(args.model_folder), args.quant, load_mode=args.load_mode)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Coverage-driven planning for synthetic generation.
+
+The planner splits a target number of synthetic items into whole-item
+per-phase targets, in proportion to each phase's share of the question set
+(contemporary, timeless, personal_existential, ...) and summing exactly to
+the total. Accepted items are assigned to their nearest calibration question,
+and each new batch of prompts targets the most under-covered phase and,
+within it, the least-covered questions. Generation stops as soon as the
+total is reached, so it never over-generates.
+"""
+import math
+from collections import Counter
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from jsonl_store import iter_records
+
+# An item whose nearest question is less similar than this counts toward the
+# question it was prompted with
+MIN_ASSIGN_SIMILARITY = 0.3
+
+
+def phase_targets(phase_sizes: Counter, total: int) -> Dict[str, int]:
+    """Split total over phases in proportion to their sizes; largest remainders get the leftover items."""
+    count = sum(phase_sizes.values())
+    shares = {phase: total * size / count for phase, size in phase_sizes.items()}
+    targets = {phase: math.floor(share) for phase, share in shares.items()}
+    leftover = total - sum(targets.values())
+    for phase in sorted(shares, key=lambda p: (shares[p] - targets[p], phase_sizes[p]), reverse=True)[:leftover]:
+        targets[phase] += 1
+    return targets
+
+
+class CoveragePlanner:
+    """Per-phase and per-question item counts against proportional targets."""
+
+    def __init__(self, questions: List[Dict], total: int):
+        self.questions = [q for q in questions if q.get("id") and q.get("question")]
+        if not self.questions:
+            raise ValueError("No questions to plan coverage over")
+        self.by_id = {q["id"]: q for q in self.questions}
+        self.total = total
+        self.phase_targets = phase_targets(Counter(self.phase_of(q["id"]) for q in self.questions), total)
+        self.question_counts: Counter = Counter()
+        self.phase_counts: Counter = Counter()
+        # Items that count toward the total without matching any question
+        self.unassigned = 0
+
+    @classmethod
+    def from_file(cls, questions_path: Path, total: int) -> "CoveragePlanner":
+        return cls(list(iter_records(questions_path, key="calibration_questions")), total)
+
+    def phase_of(self, question_id: str) -> str:
+        return self.by_id[question_id].get("phase") or "unphased"
+
+    @property
+    def accepted(self) -> int:
+        return sum(self.phase_counts.values()) + self.unassigned
+
+    def needed(self) -> int:
+        """Items still missing from the total."""
+        return max(self.total - self.accepted, 0)
+
+    @property
+    def done(self) -> bool:
+        return self.accepted >= self.total
+
+    def next_targets(self, n: int) -> List[Dict]:
+        """Up to n questions (never more than needed()) to prompt for, most under-covered phases first.
+
+        Planned prompts count as provisional coverage so one batch does not
+        aim every prompt at the same question.
+        """
+        planned_questions: Counter = Counter()
+        planned_phases: Counter = Counter()
+        targets = []
+        for _ in range(min(n, self.needed())):
+            deficits = {
+                phase: (target - self.phase_counts[phase] - planned_phases[phase]) / target
+                for phase, target in self.phase_targets.items() if target
+            }
+            if not deficits:
+                break
+            phase = max(deficits, key=deficits.get)
+            candidates = [q for q in self.questions if self.phase_of(q["id"]) == phase]
+            question = min(
+                candidates,
+                key=lambda q: self.question_counts[q["id"]] + planned_questions[q["id"]]
+            )
+            planned_questions[question["id"]] += 1
+            planned_phases[phase] += 1
+            targets.append(question)
+        return targets
+
+    def credit(self, assigned_id: Optional[str], requested_id: str) -> str:
+        """The question to count an item under: its nearest question, unless that
+        phase is already full and the one it was requested for is not."""
+        if assigned_id is None or assigned_id not in self.by_id:
+            return requested_id
+        assigned_phase, requested_phase = self.phase_of(assigned_id), self.phase_of(requested_id)
+        if (self.phase_counts[assigned_phase] >= self.phase_targets[assigned_phase]
+                and self.phase_counts[requested_phase] < self.phase_targets[requested_phase]):
+            return requested_id
+        return assigned_id
+
+    def record(self, question_id: str) -> None:
+        self.question_counts[question_id] += 1
+        self.phase_counts[self.phase_of(question_id)] += 1
+
+    def record_unassigned(self) -> None:
+        self.unassigned += 1
+
+    def report(self) -> str:
+        lines = []
+        for phase, target in self.phase_targets.items():
+            phase_questions = [q["id"] for q in self.questions if self.phase_of(q["id"]) == phase]
+            covered = sum(1 for qid in phase_questions if self.question_counts[qid])
+            lines.append(
+                f"  {phase}: {self.phase_counts[phase]}/{target} items, "
+                f"{covered}/{len(phase_questions)} questions covered"
+            )
+        if self.unassigned:
+            lines.append(f"  (no question): {self.unassigned} items")
+        return "\n".join(lines)
+
+
+class QuestionAssigner:
+    """Maps generated instructions to their nearest calibration question.
+
+    Pass the embedder already used elsewhere in the run to avoid loading a second copy.
+    """
+
+    def __init__(self, questions_path: Path, embedder=None):
+        from embedding_index import Embedder, load_index
+
+        self.embedder = embedder or Embedder()
+        self.index = load_index(questions_path, "questions", self.embedder)
+
+    def assign(self, instructions: List[str], fallback_ids: List[Optional[str]]) -> List[Optional[str]]:
+        hits = self.index.search_vectors(self.embedder.encode(instructions), k=1)
+        assigned = []
+        for item_hits, fallback in zip(hits, fallback_ids):
+            if item_hits and item_hits[0][1] >= MIN_ASSIGN_SIMILARITY:
+                assigned.append(self.index.items[item_hits[0][0]]["id"])
+            else:
+                assigned.append(fallback)
+        return assigned
@@ -0,0 +1,277 @@
+#!/usr/bin/env python3
+"""
+Embedding indexes over calibration questions, user answers and synthetic Q&A.
+
+An index is a float32 matrix of L2-normalised sentence embeddings saved as
+<stem>.emb.npy, plus <stem>.emb.json holding the model name, the source
+signature and one {id, text} entry per row. Cosine similarity is then a plain
+matrix product, so a batch of queries is scored in one call.
+
+Embeddings come from a small sentence model run on CPU (mean-pooled
+all-MiniLM-L6-v2 by default). load_index() rebuilds an index whenever its
+source file or model changes.
+
+Usage:
+  python embedding_index.py build questions_with_perspectives.json
+  python embedding_index.py query synthetic_qa.jsonl "Should I report a friend?" [--k 5]
+"""
+import argparse
+import os
+import sys
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from jsonl_store import iter_records, resolve_records_path, write_document
+
+DEFAULT_EMBED_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+INDEX_VERSION = 1
+
+
+def question_text(record: Dict) -> str:
+    options = " / ".join(record[key] for key in ("option_a", "option_b") if record.get(key))
+    return f"{record.get('question', '')} {options}".strip()
+
+
+def answer_text(record: Dict) -> str:
+    return str(record.get("question", "")).strip()
+
+
+def synthetic_text(record: Dict) -> str:
+    return str(record.get("instruction", "")).strip()
+
+
+# kind -> (JSON document key, id field, text builder)
+SOURCE_KINDS: Dict[str, Tuple[Optional[str], Optional[str], Callable[[Dict], str]]] = {
+    "questions": ("calibration_questions", "id", question_text),
+    "answers": ("responses", "question_id", answer_text),
+    "synthetic": (None, None, synthetic_text),
+}
+
+
+def parse_args(argv: List[str]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Build and query Kindred2 embedding indexes")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    build = subparsers.add_parser("build", help="Embed every record in a source file")
+    build.add_argument("source", help="questions, user answers or synthetic Q&A (.json/.jsonl)")
+    build.add_argument("--kind", choices=list(SOURCE_KINDS), default=None, help="Default: detected")
+    build.add_argument("--model", default=DEFAULT_EMBED_MODEL, help="HF sentence-embedding model")
+    query = subparsers.add_parser("query", help="Show the records closest to a text")
+    query.add_argument("source")
+    query.add_argument("text", nargs="+")
+    query.add_argument("--kind", choices=list(SOURCE_KINDS), default=None)
+    query.add_argument("--model", default=DEFAULT_EMBED_MODEL)
+    query.add_argument("--k", type=int, default=5)
+    return parser.parse_args(argv)
+
+
+def index_paths(source: Path) -> Tuple[Path, Path]:
+    """(<stem>.emb.npy, <stem>.emb.json) next to source."""
+    source = Path(source)
+    return source.with_name(f"{source.stem}.emb.npy"), source.with_name(f"{source.stem}.emb.json")
+
+
+def source_signature(source: Path, model_name: str) -> str:
+    stat = Path(source).stat()
+    return f"{INDEX_VERSION}:{model_name}:{stat.st_size}:{stat.st_mtime_ns}"
+
+
+def detect_kind(source: Path) -> str:
+    """Guess the kind from the first record's fields."""
+    for key, _, _ in SOURCE_KINDS.values():
+        first = next(iter_records(source, key=key), None)
+        if first is None:
+            continue
+        if "option_a" in first:
+            return "questions"
+        if "question_id" in first:
+            return "answers"
+        if "instruction" in first:
+            return "synthetic"
+    raise ValueError(f"Cannot tell what kind of records {source} holds; pass --kind")
+
+
+def load_items(source: Path, kind: str) -> List[Dict[str, str]]:
+    """{id, text} for every record with non-empty text, in file order."""
+    key, id_field, to_text = SOURCE_KINDS[kind]
+    items = []
+    for position, record in enumerate(iter_records(source, key=key)):
+        text = to_text(record)
+        if text:
+            item_id = record.get(id_field) if id_field else None
+            items.append({"id": str(item_id if item_id is not None else position), "text": text})
+    return items
+
+
+class Embedder:
+    """Mean-pooled sentence embeddings on CPU; the model loads on first use."""
+
+    def __init__(self, model_name: str = DEFAULT_EMBED_MODEL, batch_size: int = 64, max_length: int = 256):
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self.max_length = max_length
+        self.tokenizer = None
+        self.model = None
+
+    def load(self) -> None:
+        if self.model is not None:
+            return
+        from transformers import AutoModel, AutoTokenizer
+
+        self.tokenizer = AutoTokenizer.from_pretrained(self.model_name)
+        self.model = AutoModel.from_pretrained(self.model_name).to("cpu").eval()
+
+    def encode(self, texts: Sequence[str]):
+        """(len(texts), dim) float32 array of unit-length rows."""
+        import numpy as np
+        import torch
+
+        self.load()
+        batches = []
+        with torch.inference_mode():
+            for start in range(0, len(texts), self.batch_size):
+                batch = self.tokenizer(
+                    list(texts[start:start + self.batch_size]), padding=True, truncation=True,
+                    max_length=self.max_length, return_tensors="pt",
+                )
+                hidden = self.model(**batch).last_hidden_state
+                mask = batch["attention_mask"].unsqueeze(-1).to(hidden.dtype)
+                pooled = (hidden * mask).sum(dim=1) / mask.sum(dim=1).clamp(min=1e-9)
+                batches.append(torch.nn.functional.normalize(pooled, dim=-1).float().numpy())
+        if not batches:
+            dim = self.model.config.hidden_size
+            return np.zeros((0, dim), dtype=np.float32)
+        return np.concatenate(batches).astype(np.float32, copy=False)
+
+
+class EmbeddingIndex:
+    """Rows of unit vectors with their {id, text}; cosine search is a matrix product."""
+
+    def __init__(self, vectors, items: List[Dict[str, str]], model_name: str = DEFAULT_EMBED_MODEL):
+        self.vectors = vectors
+        self.items = items
+        self.model_name = model_name
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    def search_vectors(self, queries, k: int = 5, exclude_self: bool = False) -> List[List[Tuple[int, float]]]:
+        """Top-k (row, cosine) per query row, best first.
+
+        exclude_self drops the matching row when queries are this index's own
+        vectors (for dedup and coverage over a single source).
+        """
+        import numpy as np
+
+        queries = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+        if not len(self) or not len(queries):
+            return [[] for _ in range(len(queries))]
+        scores = queries @ np.asarray(self.vectors).T
+        if exclude_self:
+            np.fill_diagonal(scores, -np.inf)
+        k = min(k, scores.shape[1] - (1 if exclude_self else 0))
+        if k <= 0:
+            return [[] for _ in range(len(queries))]
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        top_scores = np.take_along_axis(scores, top, axis=1)
+        order = np.argsort(-top_scores, axis=1)
+        top = np.take_along_axis(top, order, axis=1)
+        top_scores = np.take_along_axis(top_scores, order, axis=1)
+        return [
+            [(int(row), float(score)) for row, score in zip(rows, row_scores)]
+            for rows, row_scores in zip(top, top_scores)
+        ]
+
+    def search(self, texts: Sequence[str], embedder: Embedder, k: int = 5) -> List[List[Tuple[Dict, float]]]:
+        """Top-k (item, cosine) for each text."""
+        hits = self.search_vectors(embedder.encode(texts), k)
+        return [[(self.items[row], score) for row, score in row_hits] for row_hits in hits]
+
+    def near_duplicates(self, threshold: float = 0.95) -> List[Tuple[int, int, float]]:
+        """(i, j, cosine) for every pair i < j at or above threshold."""
+        import numpy as np
+
+        vectors = np.asarray(self.vectors)
+        pairs = []
+        # Row blocks keep the score matrix small for large sources
+        for start in range(0, len(vectors), 1024):
+            scores = vectors[start:start + 1024] @ vectors.T
+            rows, cols = np.nonzero(scores >= threshold)
+            for row, col in zip(rows, cols):
+                i = start + int(row)
+                if i < col:
+                    pairs.append((i, int(col), float(scores[row, col])))
+        return pairs
+
+
+def build_index(source: Path, kind: Optional[str] = None, embedder: Optional[Embedder] = None) -> EmbeddingIndex:
+    """Embed source and save the index beside it."""
+    import numpy as np
+
+    source = Path(source)
+    kind = kind or detect_kind(source)
+    embedder = embedder or Embedder()
+    items = load_items(source, kind)
+    vectors = embedder.encode([item["text"] for item in items])
+
+    vectors_path, meta_path = index_paths(source)
+    tmp = vectors_path.with_name(vectors_path.name + ".tmp")
+    with open(tmp, "wb") as f:
+        np.save(f, vectors)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, vectors_path)
+    # Metadata last: a stale or missing signature forces a rebuild
+    write_document(meta_path, {
+        "model": embedder.model_name,
+        "kind": kind,
+        "source": str(source),
+        "source_signature": source_signature(source, embedder.model_name),
+        "dim": int(vectors.shape[1]),
+        "items": items,
+    })
+    return EmbeddingIndex(vectors, items, embedder.model_name)
+
+
+def load_index(source: Path, kind: Optional[str] = None, embedder: Optional[Embedder] = None,
+               rebuild: bool = True) -> Optional[EmbeddingIndex]:
+    """Open the index for source, (re)building it if it is missing or stale.
+
+    With rebuild=False a missing or stale index returns None instead.
+    """
+    import json
+    import numpy as np
+
+    source = resolve_records_path(Path(source))
+    if not source.is_file():
+        raise FileNotFoundError(f"Source not found: {source}")
+    model_name = embedder.model_name if embedder else DEFAULT_EMBED_MODEL
+    vectors_path, meta_path = index_paths(source)
+    if vectors_path.is_file() and meta_path.is_file():
+        meta = json.loads(meta_path.read_text(encoding="utf-8"))
+        if meta.get("source_signature") == source_signature(source, model_name):
+            return EmbeddingIndex(np.load(vectors_path, mmap_mode="r"), meta["items"], model_name)
+    if not rebuild:
+        return None
+    return build_index(source, kind, embedder or Embedder(model_name))
+
+
+def main() -> None:
+    args = parse_args(sys.argv[1:])
+    source = resolve_records_path(Path(args.source))
+    if not source.is_file():
+        print(f"Source not found: {source}")
+        sys.exit(1)
+
+    embedder = Embedder(args.model)
+    if args.command == "build":
+        index = build_index(source, args.kind, embedder)
+        print(f"Indexed {len(index)} records from {source} -> {index_paths(source)[0]}")
+        return
+
+    index = load_index(source, args.kind, embedder)
+    for item, score in index.search([" ".join(args.text)], embedder, args.k)[0]:
+        print(f"{score:.3f}  [{item['id']}] {item['text']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,282 @@
+#!/usr/bin/env python3
+"""
+Grow the calibration question bank with generated dilemmas.
+
+New questions follow the questions_with_perspectives.json schema exactly (id,
+phase, question, option_a/option_b, perspective_for/against with person,
+years, role, quote). Prompts for one phase are generated together in a
+single left-padded batch. Each prompt shows real questions from that phase as
+the format to copy. Output that fails schema validation is discarded, and
+duplicates of existing or earlier questions are dropped by normalised text and
+by embedding cosine.
+
+The shard is a questions JSONL file, so it can be passed to the calibrators'
+--questions directly; --merged-output also writes the existing set plus the
+new questions as one file.
+
+Usage: python expand_questions.py --questions questions_with_perspectives.json --count 200
+"""
+import argparse
+import hashlib
+import json
+import random
+import re
+import sys
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from jsonl_store import iter_records, write_records
+from question_bank import QUESTIONS_KEY
+
+DEFAULT_MODEL = "Qwen/Qwen2.5-3B-Instruct"
+PERSPECTIVE_FIELDS = ("person", "years", "role", "quote")
+TEXT_FIELDS = ("question", "option_a", "option_b")
+
+
+def parse_args(argv: List[str]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Generate new calibration questions with perspectives")
+    parser.add_argument("--questions", required=True, help="Existing questions_with_perspectives.json or .jsonl")
+    parser.add_argument("--output", default=None, help="Shard path (default: <stem>.expansion.jsonl)")
+    parser.add_argument("--merged-output", default=None, help="Also write existing + new questions here")
+    parser.add_argument("--count", type=int, default=50, help="New questions to add")
+    parser.add_argument("--phase", default=None, help="Only generate for this phase (default: all, proportionally)")
+    parser.add_argument("--model", default=DEFAULT_MODEL, help="HF model for generation")
+    parser.add_argument("--batch-size", type=int, default=4, help="Prompts per generate() call")
+    parser.add_argument("--per-prompt", type=int, default=5, help="Questions requested per prompt")
+    parser.add_argument("--max-new-tokens", type=int, default=2400)
+    parser.add_argument("--dedup-threshold", type=float, default=0.88,
+                        help="Drop a question this similar (cosine) to an existing one")
+    parser.add_argument("--seed", type=int, default=0)
+    return parser.parse_args(argv)
+
+
+def normalize(text: str) -> str:
+    return " ".join(re.sub(r"[^\w\s]", " ", text.lower()).split())
+
+
+def question_id(phase: str, question: str) -> str:
+    return f"gen_{phase}_{hashlib.sha1(normalize(question).encode('utf-8')).hexdigest()[:10]}"
+
+
+def validate_question(raw, phase: str) -> Optional[Dict]:
+    """A clean question in the bank schema, or None if raw does not fit it."""
+    if not isinstance(raw, dict):
+        return None
+    question = {"id": "", "phase": phase}
+    for field in TEXT_FIELDS:
+        value = raw.get(field)
+        if not isinstance(value, str) or not value.strip():
+            return None
+        question[field] = value.strip()
+    if normalize(question["option_a"]) == normalize(question["option_b"]):
+        return None
+    for side in ("perspective_for", "perspective_against"):
+        perspective = raw.get(side)
+        if not isinstance(perspective, dict):
+            return None
+        cleaned = {}
+        for field in PERSPECTIVE_FIELDS:
+            value = perspective.get(field)
+            if isinstance(value, (int, float)) and field == "years":
+                value = str(value)
+            if not isinstance(value, str) or not value.strip():
+                return None
+            cleaned[field] = value.strip()
+        question[side] = cleaned
+    if question["perspective_for"]["person"] == question["perspective_against"]["person"]:
+        return None
+    question["id"] = question_id(phase, question["question"])
+    return question
+
+
+def build_prompt(phase: str, examples: List[Dict], count: int) -> str:
+    shown = json.dumps([{k: v for k, v in q.items() if k != "id"} for q in examples], indent=1, ensure_ascii=False)
+    return (
+        f"Here are moral dilemmas from the '{phase}' part of a values questionnaire:\n{shown}\n\n"
+        f"Write {count} NEW dilemmas for the same phase, on different issues from these. "
+        "Each must have exactly these fields: phase, question, option_a, option_b, "
+        "perspective_for and perspective_against. Each perspective is an object with person, years, role "
+        "and quote: a real historical or contemporary figure who would argue for option_a "
+        "(perspective_for) or option_b (perspective_against), with a quote in their spirit. "
+        "Output ONLY a JSON array."
+    )
+
+
+def extract_json_array(text: str) -> List:
+    match = re.search(r"\[[\s\S]*\]", text)
+    if not match:
+        return []
+    try:
+        data = json.loads(match.group(0))
+    except ValueError:
+        return []
+    return data if isinstance(data, list) else []
+
+
+def generate_batch(model, tokenizer, prompts: List[str], max_new_tokens: int) -> List[str]:
+    """Generate for all prompts in one left-padded batch; returns only the new text of each."""
+    import torch
+
+    texts = []
+    for prompt in prompts:
+        messages = [
+            {"role": "system", "content": "You output only strict JSON arrays."},
+            {"role": "user", "content": prompt},
+        ]
+        try:
+            texts.append(tokenizer.apply_chat_template(messages, tokenize=False, add_generation_prompt=True))
+        except Exception:
+            texts.append(prompt)
+    inputs = tokenizer(texts, return_tensors="pt", padding=True).to(model.device)
+    with torch.no_grad():
+        outputs = model.generate(
+            **inputs,
+            max_new_tokens=max_new_tokens,
+            temperature=0.8,
+            top_p=0.95,
+            do_sample=True,
+            pad_token_id=tokenizer.pad_token_id,
+        )
+    width = inputs["input_ids"].shape[1]
+    return tokenizer.batch_decode(outputs[:, width:], skip_special_tokens=True)
+
+
+def phase_quotas(existing: List[Dict], count: int, phase: Optional[str]) -> Dict[str, int]:
+    """New questions per phase, proportional to the existing mix."""
+    sizes = Counter(q.get("phase") or "unphased" for q in existing)
+    if phase:
+        return {phase: count}
+    total = sum(sizes.values())
+    quotas = {p: count * n // total for p, n in sizes.items()}
+    for p, _ in sizes.most_common(count - sum(quotas.values())):
+        quotas[p] += 1
+    return quotas
+
+
+class Deduplicator:
+    """Rejects questions whose text or meaning repeats one already in the bank or accepted."""
+
+    def __init__(self, existing: List[Dict], questions_path: Path, threshold: float):
+        import numpy as np
+        from embedding_index import Embedder, load_index
+
+        self.threshold = threshold
+        self.texts = {normalize(q["question"]) for q in existing if q.get("question")}
+        self.embedder = Embedder()
+        self.vectors = np.asarray(load_index(questions_path, "questions", self.embedder).vectors)
+
+    def filter(self, candidates: List[Dict]) -> Tuple[List[Dict], int]:
+        """(accepted candidates, number dropped); accepted ones are remembered."""
+        import numpy as np
+        from embedding_index import question_text
+
+        fresh = [q for q in candidates if normalize(q["question"]) not in self.texts]
+        dropped = len(candidates) - len(fresh)
+        if not fresh:
+            return [], dropped
+        vectors = self.embedder.encode([question_text(q) for q in fresh])
+        accepted = []
+        for question, vector in zip(fresh, vectors):
+            key = normalize(question["question"])
+            if key in self.texts or (len(self.vectors) and float((self.vectors @ vector).max()) >= self.threshold):
+                dropped += 1
+                continue
+            self.texts.add(key)
+            self.vectors = np.vstack([self.vectors, vector[None, :]]) if len(self.vectors) else vector[None, :]
+            accepted.append(question)
+        return accepted, dropped
+
+
+def expand(questions_path: Path, output_path: Path, count: int, model_name: str = DEFAULT_MODEL,
+           phase: Optional[str] = None, batch_size: int = 4, per_prompt: int = 5,
+           max_new_tokens: int = 2400, dedup_threshold: float = 0.88, seed: int = 0,
+           merged_output: Optional[Path] = None) -> int:
+    """Generate up to count new questions into output_path; returns how many were written."""
+    existing = list(iter_records(questions_path, key=QUESTIONS_KEY))
+    if not existing:
+        raise ValueError(f"No questions in {questions_path}")
+    quotas = phase_quotas(existing, count, phase)
+    by_phase: Dict[str, List[Dict]] = {}
+    for q in existing:
+        by_phase.setdefault(q.get("phase") or "unphased", []).append(q)
+    if phase and phase not in by_phase:
+        raise ValueError(f"Unknown phase '{phase}'. Phases: {', '.join(by_phase)}")
+
+    import torch
+    from transformers import AutoModelForCausalLM, AutoTokenizer
+
+    rng = random.Random(seed)
+    torch.manual_seed(seed)
+    tokenizer = AutoTokenizer.from_pretrained(model_name, trust_remote_code=True)
+    tokenizer.padding_side = "left"
+    if tokenizer.pad_token is None:
+        tokenizer.pad_token = tokenizer.eos_token
+    model = AutoModelForCausalLM.from_pretrained(
+        model_name,
+        device_map="auto",
+        torch_dtype=torch.float16 if torch.cuda.is_available() else torch.float32,
+        trust_remote_code=True
+    )
+    model.eval()
+    dedup = Deduplicator(existing, questions_path, dedup_threshold)
+
+    start = time.perf_counter()
+    new_questions: List[Dict] = []
+    counters = Counter()
+    for current_phase, quota in quotas.items():
+        accepted: List[Dict] = []
+        # Generous cap: a batch can come back entirely invalid or duplicated
+        for _ in range(3 * -(-quota // (batch_size * per_prompt)) + 1):
+            if len(accepted) >= quota:
+                break
+            pool = by_phase[current_phase]
+            prompts = [
+                build_prompt(current_phase, rng.sample(pool, min(2, len(pool))), per_prompt)
+                for _ in range(batch_size)
+            ]
+            for text in generate_batch(model, tokenizer, prompts, max_new_tokens):
+                raw = extract_json_array(text)
+                counters["parse_failures"] += 0 if raw else 1
+                valid = [q for q in (validate_question(r, current_phase) for r in raw) if q]
+                counters["invalid"] += len(raw) - len(valid)
+                kept, dropped = dedup.filter(valid)
+                counters["duplicates"] += dropped
+                accepted.extend(kept)
+        accepted = accepted[:quota]
+        print(f"{current_phase}: {len(accepted)}/{quota} new questions", flush=True)
+        new_questions.extend(accepted)
+
+    meta = {"source": str(questions_path), "model": model_name, "time": time.time(), **counters}
+    written = write_records(output_path, new_questions, meta=meta)
+    print(f"Wrote {written} questions to {output_path} in {time.perf_counter() - start:.0f}s "
+          f"({counters['invalid']} invalid, {counters['duplicates']} duplicates, "
+          f"{counters['parse_failures']} unparseable outputs)")
+    if merged_output:
+        merged_meta = {"merged_from": [str(questions_path), str(output_path)]}
+        write_records(merged_output, existing + new_questions, meta=merged_meta, key=QUESTIONS_KEY)
+        print(f"Wrote {len(existing) + written} questions to {merged_output}")
+    return written
+
+
+def main() -> None:
+    args = parse_args(sys.argv[1:])
+    questions_path = Path(args.questions)
+    if not questions_path.is_file():
+        print(f"Questions file not found: {questions_path}")
+        sys.exit(1)
+    output_path = Path(args.output) if args.output else questions_path.with_name(f"{questions_path.stem}.expansion.jsonl")
+    try:
+        expand(
+            questions_path, output_path, args.count, args.model, args.phase, args.batch_size, args.per_prompt,
+            args.max_new_tokens, args.dedup_threshold, args.seed,
+            Path(args.merged_output) if args.merged_output else None,
+        )
+    except ValueError as exc:
+        print(exc)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+JSONL-first record storage with read support for legacy JSON documents.
+
+A .jsonl file holds one record per line. An optional first line of the form
+{"_meta": {...}} carries document-level fields (username, timestamp, ...).
+Legacy .json files are either a list of records or a dict holding the list
+under a key such as "responses".
+"""
+import json
+import os
+import stat
+import tempfile
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, Optional, TextIO
+
+
+META_KEY = "_meta"
+
+
+def is_jsonl(path: Path) -> bool:
+    return Path(path).suffix.lower() == ".jsonl"
+
+
+def resolve_records_path(path: Path) -> Path:
+    """Return the existing .jsonl or .json variant of path, preferring JSONL."""
+    path = Path(path)
+    if path.suffix.lower() not in (".json", ".jsonl"):
+        return path
+    for candidate in (path.with_suffix(".jsonl"), path.with_suffix(".json")):
+        if candidate.exists():
+            return candidate
+    return path
+
+
+def records_exist(path: Path) -> bool:
+    """True if either variant of path exists and is non-empty."""
+    resolved = resolve_records_path(path)
+    return resolved.is_file() and resolved.stat().st_size > 0
+
+
+def iter_records(path: Path, key: Optional[str] = None) -> Iterator[Dict]:
+    """Yield records lazily from a .jsonl file, or from a legacy .json document."""
+    path = Path(path)
+    if is_jsonl(path):
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                record = json.loads(line)
+                if META_KEY in record:
+                    continue
+                yield record
+        return
+
+    data = json.loads(path.read_text(encoding="utf-8"))
+    if isinstance(data, dict):
+        data = data.get(key, []) if key else []
+    yield from data
+
+
+def read_meta(path: Path, key: Optional[str] = None) -> Dict:
+    """Document-level fields: the JSONL meta line, or the non-record keys of a JSON dict."""
+    path = Path(path)
+    if is_jsonl(path):
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                record = json.loads(line)
+                return record.get(META_KEY, {})
+        return {}
+
+    data = json.loads(path.read_text(encoding="utf-8"))
+    if isinstance(data, dict):
+        return {k: v for k, v in data.items() if k != key}
+    return {}
+
+
+def append_record(path: Path, record: Dict, fsync: bool = False) -> None:
+    """Append one record to a .jsonl file in O(1)."""
+    path = Path(path)
+    if not is_jsonl(path):
+        raise ValueError(f"Appending requires a .jsonl file: {path}")
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "a", encoding="utf-8", newline="\n") as f:
+        f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        if fsync:
+            f.flush()
+            os.fsync(f.fileno())
+
+
+def replacement_mode(path: Path) -> int:
+    """Permission bits for a file about to replace path.
+
+    mkstemp creates files as 0600, and os.replace would carry that over, so
+    keep the existing file's mode, or for a new file use what open() gives.
+    """
+    try:
+        return stat.S_IMODE(os.stat(path).st_mode)
+    except FileNotFoundError:
+        umask = os.umask(0)
+        os.umask(umask)
+        return 0o666 & ~umask
+
+
+@contextmanager
+def atomic_writer(path: Path) -> Iterator[TextIO]:
+    """Write to a temp file beside path, fsync, then rename over path.
+
+    Readers see either the old file or the complete new one, never a partial write.
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_name = tempfile.mkstemp(prefix=f".{path.name}.", suffix=".tmp", dir=path.parent)
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8", newline="\n") as f:
+            yield f
+            f.flush()
+            os.fsync(f.fileno())
+        os.chmod(tmp_name, replacement_mode(path))
+        os.replace(tmp_name, path)
+    except BaseException:
+        Path(tmp_name).unlink(missing_ok=True)
+        raise
+
+
+def write_records(path: Path, records: Iterable[Dict], meta: Optional[Dict] = None,
+                  key: Optional[str] = None) -> int:
+    """Atomically write records in the format implied by the suffix; returns the count.
+
+    JSONL output is streamed. JSON output is a list, or a dict of meta plus the
+    list under key, matching the legacy layouts.
+    """
+    path = Path(path)
+    count = 0
+    with atomic_writer(path) as f:
+        if is_jsonl(path):
+            if meta:
+                f.write(json.dumps({META_KEY: meta}, ensure_ascii=False) + "\n")
+            for record in records:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+                count += 1
+        else:
+            items = list(records)
+            count = len(items)
+            document = {**(meta or {}), key: items} if key else items
+            json.dump(document, f, indent=2, ensure_ascii=False)
+    return count
+
+
+def write_document(path: Path, document: Any) -> None:
+    """Atomically write a single JSON document."""
+    with atomic_writer(path) as f:
+        json.dump(document, f, indent=2, ensure_ascii=False)
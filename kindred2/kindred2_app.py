@@ -3,16 +3,14 @@
 Kindred2 - Ethical Model Manager (Standalone)
 """
 import argparse
-import json
-import os
 import shutil
 import subprocess
 import sys
-from dataclasses import dataclass
+from collections import OrderedDict
 from pathlib import Path
-from typing import Dict, List, Optional, Tuple
+from typing import Dict, List, Optional, Set
 
-from PyQt6.QtCore import Qt, QUrl, QTimer
+from PyQt6.QtCore import Qt, QObject, QUrl, QTimer, QFileSystemWatcher, pyqtSignal
 from PyQt6.QtGui import QDesktopServices
 from PyQt6.QtWidgets import (
     QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, QLabel,
@@ -20,59 +18,120 @@ from PyQt6.QtWidgets import (
     QFileDialog, QFrame
 )
 
-
-FILE_SPECS: List[Tuple[str, str]] = [
-    ("Question set", "questions_with_perspectives.json"),
-    ("User answers", "user_answers.json"),
-    ("Synthetic Q&A", "synthetic_qa.json"),
-    ("Root model", "root_model.safetensors"),
-    ("Finetuned model", "finetuned_model.safetensors"),
-]
-
-
-@dataclass
-class Settings:
-    models_root: Path
-
-
-class SettingsStore:
-    def __init__(self, settings_path: Path):
-        self.settings_path = settings_path
-
-    def load(self) -> Settings:
-        if self.settings_path.exists():
-            try:
-                data = json.loads(self.settings_path.read_text(encoding="utf-8"))
-                root = Path(data.get("models_root", "")).expanduser()
-                if root:
-                    return Settings(models_root=root)
-            except Exception:
-                pass
-        default_root = Path.home() / "Documents" / "KindredModels"
-        settings = Settings(models_root=default_root)
-        self.save(settings)
-        return settings
-
-    def save(self, settings: Settings) -> None:
-        self.settings_path.parent.mkdir(parents=True, exist_ok=True)
-        self.settings_path.write_text(
-            json.dumps({"models_root": str(settings.models_root)}, indent=2),
-            encoding="utf-8"
-        )
-
-
-class ModelManager:
-    def __init__(self, models_root: Path):
+from jsonl_store import iter_records, records_exist, resolve_records_path
+from model_store import ADAPTER_DIR, FILE_SPECS, SETTINGS_PATH, ModelManager, SettingsStore, scan_model_folder
+from training_metrics import METRICS_FILENAME, read_metrics, summarize_metrics, format_summary
+
+
+class ModelStatusCache(QObject):
+    """Caches artifact presence per model folder and refreshes it from QFileSystemWatcher.
+
+    Folders are scanned lazily on first request and watched afterwards. At most
+    max_watched folders are watched at once (least recently used are dropped),
+    so hundreds of models under models_root cost nothing until they are opened.
+    Bursts of change notifications are coalesced into one rescan per folder.
+    """
+
+    statusChanged = pyqtSignal(str)
+    modelsChanged = pyqtSignal()
+
+    def __init__(self, models_root: Path, max_watched: int = 64, debounce_ms: int = 250, parent=None):
+        super().__init__(parent)
+        self.max_watched = max_watched
+        self.watcher = QFileSystemWatcher(self)
+        self.watcher.directoryChanged.connect(self._on_directory_changed)
+        self.watcher.fileChanged.connect(self._on_file_changed)
+        self._debounce = QTimer(self)
+        self._debounce.setSingleShot(True)
+        self._debounce.setInterval(debounce_ms)
+        self._debounce.timeout.connect(self._flush)
+        self._status: "OrderedDict[str, Dict[str, bool]]" = OrderedDict()
+        self._empty_files: Dict[str, Set[Path]] = {}
+        self._pending: Set[str] = set()
+        self._root_changed = False
         self.models_root = models_root
-        self.models_root.mkdir(parents=True, exist_ok=True)
-
-    def list_models(self) -> List[str]:
-        if not self.models_root.exists():
-            return []
-        return sorted([p.name for p in self.models_root.iterdir() if p.is_dir()])
-
-    def get_model_path(self, model_name: str) -> Path:
-        return self.models_root / model_name
+        self.set_root(models_root)
+
+    def set_root(self, models_root: Path) -> None:
+        paths = self.watcher.directories() + self.watcher.files()
+        if paths:
+            self.watcher.removePaths(paths)
+        self._status.clear()
+        self._empty_files.clear()
+        self._pending.clear()
+        self.models_root = models_root
+        if models_root.exists():
+            self.watcher.addPath(str(models_root))
+
+    def status(self, model_name: str) -> Dict[str, bool]:
+        if model_name in self._status:
+            self._status.move_to_end(model_name)
+            return self._status[model_name]
+        self._rescan(model_name)
+        self.watcher.addPath(str(self.models_root / model_name))
+        while len(self._status) > self.max_watched:
+            evicted, _ = self._status.popitem(last=False)
+            self._unwatch(evicted)
+        return self._status[model_name]
+
+    def _model_for_path(self, path: str) -> Optional[str]:
+        try:
+            relative = Path(path).relative_to(self.models_root)
+        except ValueError:
+            return None
+        return relative.parts[0] if relative.parts else None
+
+    def _on_directory_changed(self, path: str) -> None:
+        model_name = self._model_for_path(path)
+        if model_name is None:
+            self._root_changed = True
+        elif model_name in self._status:
+            self._pending.add(model_name)
+        self._debounce.start()
+
+    def _on_file_changed(self, path: str) -> None:
+        model_name = self._model_for_path(path)
+        if model_name in self._status:
+            self._pending.add(model_name)
+            self._debounce.start()
+
+    def _flush(self) -> None:
+        if self._root_changed:
+            self._root_changed = False
+            # Forget folders that were removed or renamed away
+            for model_name in list(self._status):
+                if not (self.models_root / model_name).is_dir():
+                    del self._status[model_name]
+                    self._unwatch(model_name)
+                    self._pending.discard(model_name)
+            self.modelsChanged.emit()
+        pending, self._pending = self._pending, set()
+        for model_name in pending:
+            if model_name not in self._status:
+                continue
+            previous = self._status[model_name]
+            if self._rescan(model_name) != previous:
+                self.statusChanged.emit(model_name)
+
+    def _rescan(self, model_name: str) -> Dict[str, bool]:
+        model_path = self.models_root / model_name
+        present, empty = scan_model_folder(model_path)
+        # Files that exist but are still being written only fire fileChanged
+        old_empty = self._empty_files.get(model_name, set())
+        stale = [str(p) for p in old_empty - empty]
+        if stale:
+            self.watcher.removePaths(stale)
+        added = [str(p) for p in empty - old_empty]
+        if added:
+            self.watcher.addPaths(added)
+        self._empty_files[model_name] = empty
+        self._status[model_name] = present
+        return present
+
+    def _unwatch(self, model_name: str) -> None:
+        paths = [str(self.models_root / model_name)]
+        paths += [str(p) for p in self._empty_files.pop(model_name, set())]
+        self.watcher.removePaths(paths)
 
 
 class Kindred2Window(QMainWindow):
@@ -81,9 +140,12 @@ class Kindred2Window(QMainWindow):
         self.setWindowTitle("Kindred2 - Ethical Model Manager")
         self.setMinimumSize(1100, 700)
 
-        self.settings_store = SettingsStore(Path(__file__).with_name("settings.json"))
+        self.settings_store = SettingsStore(SETTINGS_PATH)
         self.settings = self.settings_store.load()
         self.model_manager = ModelManager(self.settings.models_root)
+        self.status_cache = ModelStatusCache(self.settings.models_root, parent=self)
+        self.status_cache.statusChanged.connect(self.on_status_changed)
+        self.status_cache.modelsChanged.connect(self.refresh_models)
 
         self.selected_model: Optional[str] = None
         self.status_labels: Dict[str, QLabel] = {}
@@ -185,8 +247,11 @@ class Kindred2Window(QMainWindow):
         change_root_action = menu.addAction("Change Models Folder...")
         change_root_action.triggered.connect(self.change_models_root)
 
-        export_action = menu.addAction("Export GGUF (Q4/Q6/Q8)...")
-        export_action.triggered.connect(self.export_gguf)
+        self.export_action = menu.addAction("Export GGUF (Q4/Q6/Q8)...")
+        self.export_action.triggered.connect(self.export_gguf)
+
+        self.warmup_action = menu.addAction("Warm Up Base Model")
+        self.warmup_action.triggered.connect(self.warmup_base_model)
 
         refresh_action = menu.addAction("Refresh")
         refresh_action.triggered.connect(self.refresh_models)
@@ -202,11 +267,17 @@ class Kindred2Window(QMainWindow):
         self.summarize_button.setEnabled(enabled)
 
     def refresh_models(self) -> None:
+        previous = self.selected_model
+        self.models_list.blockSignals(True)
         self.models_list.clear()
         models = self.model_manager.list_models()
         for model_name in models:
             item = QListWidgetItem(model_name)
             self.models_list.addItem(item)
+        self.models_list.blockSignals(False)
+        if previous in models:
+            self.models_list.setCurrentRow(models.index(previous))
+            return
         self.selected_model = None
         self.model_path_label.setText("No model selected")
         self.set_action_buttons_enabled(False)
@@ -227,15 +298,24 @@ class Kindred2Window(QMainWindow):
         self.update_status(model_path)
 
     def update_status(self, model_path: Optional[Path]) -> None:
+        status = self.status_cache.status(model_path.name) if model_path else {}
         for _, filename in FILE_SPECS:
             label = self.status_labels[filename]
-            if not model_path:
-                label.setStyleSheet("color: #ffffff;")
-                continue
-            file_path = model_path / filename
-            exists = file_path.exists() and file_path.is_file() and file_path.stat().st_size > 0
-            color = "#8be28b" if exists else "#ffffff"
+            color = "#8be28b" if status.get(filename) else "#ffffff"
             label.setStyleSheet(f"color: {color};")
+        if model_path:
+            # Enable actions as their input artifacts appear
+            has_answers = status.get("user_answers.json", False)
+            self.change_questions_button.setEnabled(status.get("questions_with_perspectives.json", False))
+            self.reanswer_button.setEnabled(status.get("questions_with_perspectives.json", False))
+            self.build_synth_button.setEnabled(has_answers)
+            self.summarize_button.setEnabled(has_answers)
+            self.run_tune_button.setEnabled(status.get("synthetic_qa.json", False))
+        self.export_action.setEnabled(bool(status.get(ADAPTER_DIR)))
+
+    def on_status_changed(self, model_name: str) -> None:
+        if model_name == self.selected_model:
+            self.update_status(self.model_manager.get_model_path(model_name))
 
     def change_models_root(self) -> None:
         new_root = QFileDialog.getExistingDirectory(
@@ -286,6 +366,7 @@ class Kindred2Window(QMainWindow):
         self.settings.models_root = new_root_path
         self.settings_store.save(self.settings)
         self.model_manager = ModelManager(self.settings.models_root)
+        self.status_cache.set_root(self.settings.models_root)
         self.refresh_models()
 
     def get_selected_model_path(self) -> Optional[Path]:
@@ -312,7 +393,7 @@ class Kindred2Window(QMainWindow):
         if not model_path:
             return
         questions_path = model_path / "questions_with_perspectives.json"
-        output_path = model_path / "user_answers.json"
+        output_path = resolve_records_path(model_path / "user_answers.json")
         if not questions_path.exists():
             QMessageBox.warning(
                 self,
@@ -338,15 +419,16 @@ class Kindred2Window(QMainWindow):
         model_path = self.get_selected_model_path()
         if not model_path:
             return
-        user_answers = model_path / "user_answers.json"
-        if not user_answers.exists() or user_answers.stat().st_size == 0:
+        user_answers = resolve_records_path(model_path / "user_answers.json")
+        if not records_exist(user_answers):
             QMessageBox.warning(
                 self,
                 "Missing User Answers",
                 f"User answers not found:\n{user_answers}"
             )
             return
-        output_path = model_path / "synthetic_qa.json"
+        # Keep an existing legacy synthetic_qa.json; new outputs are JSONL
+        output_path = resolve_records_path(model_path / "synthetic_qa.jsonl")
         script_path = Path(__file__).with_name("synthetic_generate.py")
         args = [
             sys.executable,
@@ -354,6 +436,9 @@ class Kindred2Window(QMainWindow):
             "--user-answers", str(user_answers),
             "--output", str(output_path),
         ]
+        if records_exist(output_path):
+            # After a re-answer only items derived from changed answers are rebuilt
+            args.append("--incremental")
         try:
             subprocess.Popen(args, cwd=str(Path(__file__).parent))
             QMessageBox.information(
@@ -368,8 +453,8 @@ class Kindred2Window(QMainWindow):
         model_path = self.get_selected_model_path()
         if not model_path:
             return
-        synthetic_path = model_path / "synthetic_qa.json"
-        if not synthetic_path.exists() or synthetic_path.stat().st_size == 0:
+        synthetic_path = resolve_records_path(model_path / "synthetic_qa.json")
+        if not records_exist(synthetic_path):
             QMessageBox.warning(
                 self,
                 "Missing Synthetic Q&A",
@@ -399,8 +484,8 @@ class Kindred2Window(QMainWindow):
         model_path = self.get_selected_model_path()
         if not model_path:
             return
-        user_answers = model_path / "user_answers.json"
-        if not user_answers.exists() or user_answers.stat().st_size == 0:
+        user_answers = resolve_records_path(model_path / "user_answers.json")
+        if not records_exist(user_answers):
             QMessageBox.warning(
                 self,
                 "Missing User Answers",
@@ -408,11 +493,10 @@ class Kindred2Window(QMainWindow):
             )
             return
         try:
-            data = json.loads(user_answers.read_text(encoding="utf-8"))
-            responses = data.get("responses", [])
-            total = len(responses)
+            total = 0
             counts = {"A": 0, "B": 0}
-            for item in responses:
+            for item in iter_records(user_answers, key="responses"):
+                total += 1
                 choice = item.get("choice")
                 if choice in counts:
                     counts[choice] += 1
@@ -421,6 +505,9 @@ class Kindred2Window(QMainWindow):
                 f"Choice A: {counts['A']}\n"
                 f"Choice B: {counts['B']}\n"
             )
+            metrics = read_metrics(model_path / METRICS_FILENAME)
+            if metrics:
+                summary += "\nLast training run:\n" + format_summary(summarize_metrics(metrics)) + "\n"
             QMessageBox.information(self, "Summary", summary)
         except Exception as exc:
             QMessageBox.critical(self, "Summary Failed", f"Failed to summarize results:\n{exc}")
@@ -476,6 +563,30 @@ class Kindred2Window(QMainWindow):
         except Exception as exc:
             QMessageBox.critical(self, "Export Failed", f"Failed to start export:\n{exc}")
 
+    def warmup_base_model(self) -> None:
+        model_path = self.get_selected_model_path()
+        if not model_path:
+            QMessageBox.information(self, "No Model Selected", "Select an ethical model first.")
+            return
+
+        script_path = Path(__file__).with_name("weights_loader.py")
+        args = [
+            sys.executable,
+            str(script_path),
+            "warmup",
+            "--model-folder", str(model_path),
+        ]
+        try:
+            subprocess.Popen(args, cwd=str(Path(__file__).parent))
+            QMessageBox.information(
+                self,
+                "Warmup Started",
+                "Reading base model shards into the page cache in a new process.\n"
+                "Queued training or export jobs will then start from memory."
+            )
+        except Exception as exc:
+            QMessageBox.critical(self, "Warmup Failed", f"Failed to start warmup:\n{exc}")
+
 
 def parse_args(argv: List[str]) -> argparse.Namespace:
     parser = argparse.ArgumentParser(description="Kindred2 - Ethical Model Manager")
@@ -0,0 +1,366 @@
+#!/usr/bin/env python3
+"""
+Kindred2 - headless command-line driver (no Qt).
+
+Runs the same pipeline as the Kindred2 app buttons. build-all chains the stages
+in one process: it scores and filters the synthetic set, trains the LoRA on the
+same base model, evaluates it with the adapter still attached, then merges in
+place and exports, so the base model is loaded once for filter + train + eval
++ merge.
+
+Usage:
+  python kindred2_cli.py list
+  python kindred2_cli.py status MODEL
+  python kindred2_cli.py synthesize MODEL [--model NAME] [--count N] [--incremental]
+  python kindred2_cli.py filter MODEL [--keep-fraction F]
+  python kindred2_cli.py train MODEL [--base-model PATH] [--epochs N] [--prune weight|skip]
+  python kindred2_cli.py evaluate MODEL [--max-new-tokens N]
+  python kindred2_cli.py export MODEL [--quant Q4_K_M|Q6_K|Q8_0]
+  python kindred2_cli.py build-all MODEL [--force-synth] [--skip-filter] [--skip-eval] [--quant ...]
+  python kindred2_cli.py warmup MODEL
+
+Stages that load the base model accept --load-mode eager|lazy (see weights_loader.py).
+synthesize, evaluate and build-all accept --draft-model for assisted decoding.
+"""
+import argparse
+import gc
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from jsonl_store import records_exist, resolve_records_path
+from loss_pruning import PRUNE_MODES
+from model_store import (
+    ADAPTER_DIR, DEFAULT_BASE_MODEL, FILE_SPECS, SETTINGS_PATH,
+    ModelManager, SettingsStore, resolve_base_model, scan_model_folder,
+)
+from weights_loader import LOAD_MODES
+
+QUANT_PRESETS = ["Q4_K_M", "Q6_K", "Q8_0"]
+
+
+def log(msg: str) -> None:
+    print(f"[{time.strftime('%H:%M:%S')}] {msg}", flush=True)
+
+
+def release_memory() -> None:
+    """Drop the previous stage's model before loading the next one."""
+    gc.collect()
+    torch = sys.modules.get("torch")
+    if torch is not None and torch.cuda.is_available():
+        torch.cuda.empty_cache()
+
+
+def resolve_model_path(manager: ModelManager, model_name: str) -> Path:
+    model_path = manager.get_model_path(model_name)
+    if not model_path.is_dir():
+        raise FileNotFoundError(f"Model folder not found: {model_path}")
+    return model_path
+
+
+def cmd_list(manager: ModelManager, args: argparse.Namespace) -> None:
+    models = manager.list_models()
+    if not models:
+        print(f"No models under {manager.models_root}")
+        return
+    for model_name in models:
+        present, _ = scan_model_folder(manager.get_model_path(model_name))
+        flags = "".join("x" if present[filename] else "." for _, filename in FILE_SPECS)
+        adapter = " adapter" if present[ADAPTER_DIR] else ""
+        print(f"{flags}  {model_name}{adapter}")
+
+
+def cmd_status(manager: ModelManager, args: argparse.Namespace) -> None:
+    model_path = resolve_model_path(manager, args.model_name)
+    present, empty = scan_model_folder(model_path)
+    print(model_path)
+    for label, filename in FILE_SPECS:
+        print(f"  {'yes' if present[filename] else 'no ':3}  {label}: {filename}")
+    print(f"  {'yes' if present[ADAPTER_DIR] else 'no ':3}  Adapter: {ADAPTER_DIR}/")
+    for path in sorted(empty):
+        print(f"  (empty, possibly still being written: {path.name})")
+
+
+def run_synthesize(model_path: Path, args: argparse.Namespace, incremental: bool = False) -> None:
+    import synthetic_generate
+
+    user_answers = resolve_records_path(model_path / "user_answers.json")
+    output_path = resolve_records_path(model_path / "synthetic_qa.jsonl")
+    log(f"Synthesizing {args.count} items with {args.model}" + (" (incremental)" if incremental else ""))
+    written = synthetic_generate.generate(
+        user_answers, output_path, args.model, args.count,
+        example_tokens=args.example_tokens, draft_model_name=args.draft_model, workers=args.workers,
+        worker_dtype=args.worker_dtype, incremental=incremental,
+    )
+    log(f"Wrote {written} items to {output_path}")
+
+
+def run_filter(model_path: Path, args: argparse.Namespace, preloaded=None) -> None:
+    import quality_filter
+
+    if preloaded is None:
+        import train_adapter
+        preloaded = train_adapter.setup_model_and_tokenizer(args.base_model, args.load_mode)
+    log(f"Scoring synthetic items (keeping {args.keep_fraction:.0%})")
+    model, tokenizer = preloaded
+    quality_filter.filter_items(model, tokenizer, model_path, keep_fraction=args.keep_fraction)
+
+
+def run_train(model_path: Path, args: argparse.Namespace, timings: Optional[Dict[str, float]] = None,
+              preloaded=None, use_filtered: bool = True):
+    import train_adapter
+
+    log(f"Training adapter on {args.base_model}")
+    return train_adapter.train(
+        model_path,
+        base_model=args.base_model,
+        epochs=args.epochs,
+        batch_size=args.batch_size,
+        max_length=args.max_length,
+        timings=timings,
+        load_mode=args.load_mode,
+        preloaded=preloaded,
+        prune=args.prune,
+        prune_keep=args.prune_keep,
+        agreement_steps=args.agreement_steps,
+        agreement_patience=args.agreement_patience,
+        use_filtered=use_filtered,
+    )
+
+
+def run_evaluate(model_path: Path, args: argparse.Namespace, peft_model=None, tokenizer=None) -> None:
+    import adapter_eval
+
+    if peft_model is None:
+        if not (model_path / ADAPTER_DIR).exists():
+            raise FileNotFoundError(f"finetuned_adapter not found: {model_path / ADAPTER_DIR}")
+        peft_model, tokenizer = adapter_eval.load_adapter_model(model_path, args.load_mode)
+    output_path = model_path / adapter_eval.EVAL_FILENAME
+    log(f"Evaluating {len(adapter_eval.SCENARIOS)} scenarios")
+    adapter_eval.evaluate(peft_model, tokenizer, output_path, max_new_tokens=args.max_new_tokens,
+                          draft_model_name=args.draft_model)
+    log(f"Wrote {output_path}")
+
+
+def run_export(model_path: Path, args: argparse.Namespace, peft_model=None, tokenizer=None) -> None:
+    import convert_to_gguf
+
+    log(f"Exporting GGUF ({args.quant})" + (" from the in-memory model" if peft_model is not None else ""))
+    gguf_path = convert_to_gguf.export(
+        model_path, args.quant, peft_model=peft_model, tokenizer=tokenizer, load_mode=args.load_mode
+    )
+    log(f"Wrote {gguf_path}")
+
+
+def cmd_synthesize(manager: ModelManager, args: argparse.Namespace) -> None:
+    run_synthesize(resolve_model_path(manager, args.model_name), args, incremental=args.incremental)
+
+
+def cmd_filter(manager: ModelManager, args: argparse.Namespace) -> None:
+    run_filter(resolve_model_path(manager, args.model_name), args)
+
+
+def cmd_train(manager: ModelManager, args: argparse.Namespace) -> None:
+    run_train(resolve_model_path(manager, args.model_name), args)
+
+
+def cmd_evaluate(manager: ModelManager, args: argparse.Namespace) -> None:
+    run_evaluate(resolve_model_path(manager, args.model_name), args)
+
+
+def cmd_export(manager: ModelManager, args: argparse.Namespace) -> None:
+    run_export(resolve_model_path(manager, args.model_name), args)
+
+
+def cmd_warmup(manager: ModelManager, args: argparse.Namespace) -> None:
+    import weights_loader
+
+    model_path = resolve_model_path(manager, args.model_name)
+    base_model = args.base_model or resolve_base_model(model_path)
+    log(f"Warming page cache for {base_model}")
+    size, seconds = weights_loader.warmup(base_model)
+    log(f"Read {size / 2**30:.2f} GiB in {seconds:.1f}s")
+
+
+def cmd_build_all(manager: ModelManager, args: argparse.Namespace) -> None:
+    model_path = resolve_model_path(manager, args.model_name)
+    start = time.perf_counter()
+
+    synthetic_path = resolve_records_path(model_path / "synthetic_qa.json")
+    user_answers = resolve_records_path(model_path / "user_answers.json")
+    if args.force_synth or not records_exist(synthetic_path):
+        run_synthesize(model_path, args)
+        release_memory()
+    elif user_answers.is_file() and user_answers.stat().st_mtime_ns > synthetic_path.stat().st_mtime_ns:
+        log("User answers changed since the synthetic Q&A was built; regenerating affected items")
+        run_synthesize(model_path, args, incremental=True)
+        release_memory()
+    else:
+        log("Reusing existing synthetic Q&A (use --force-synth to regenerate)")
+
+    timings: Dict[str, float] = {}
+    # Each stage after the first would otherwise reload the base model from disk
+    avoided_loads = 1
+    preloaded = None
+    if not args.skip_filter:
+        import train_adapter
+
+        load_start = time.perf_counter()
+        preloaded = train_adapter.setup_model_and_tokenizer(args.base_model, args.load_mode)
+        timings["base_load"] = time.perf_counter() - load_start
+        run_filter(model_path, args, preloaded)
+        avoided_loads += 1
+    peft_model, tokenizer = run_train(model_path, args, timings, preloaded, use_filtered=not args.skip_filter)
+    preloaded = None
+    release_memory()
+    if not args.skip_eval:
+        run_evaluate(model_path, args, peft_model=peft_model, tokenizer=tokenizer)
+        avoided_loads += 1
+    run_export(model_path, args, peft_model=peft_model, tokenizer=tokenizer)
+
+    log(f"build-all finished in {time.perf_counter() - start:.0f}s")
+    base_load = timings.get("base_load")
+    if base_load is not None:
+        log(f"Base model loaded once ({base_load:.0f}s); {avoided_loads} reload(s) avoided, "
+            f"~{base_load * avoided_loads:.0f}s saved")
+
+
+def add_load_args(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument(
+        "--load-mode", default="eager", choices=LOAD_MODES,
+        help="eager: from_pretrained; lazy: memory-mapped shards, layers loaded on first use",
+    )
+
+
+def add_draft_args(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument(
+        "--draft-model", default=None,
+        help="Small same-tokenizer model for assisted decoding (see speculative.py)",
+    )
+
+
+def add_synth_args(parser: argparse.ArgumentParser) -> None:
+    from synthetic_generate import DEFAULT_EXAMPLE_TOKENS, DEFAULT_MODEL
+    from worker_pool import WORKER_DTYPES
+    parser.add_argument("--model", default=DEFAULT_MODEL, help="HF model for synthetic generation")
+    parser.add_argument("--count", type=int, default=30, help="Number of synthetic items")
+    parser.add_argument("--example-tokens", type=int, default=DEFAULT_EXAMPLE_TOKENS,
+                        help="Prompt token budget for the user's answered examples")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="CPU generation processes sharing memory-mapped weights")
+    parser.add_argument("--worker-dtype", default="checkpoint", choices=WORKER_DTYPES,
+                        help="Weights dtype in each worker: checkpoint shares one copy; float32 copies per "
+                             "worker but is often faster on CPU")
+
+
+def add_train_args(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--base-model", default=DEFAULT_BASE_MODEL, help="HF base model or local path")
+    parser.add_argument("--epochs", type=int, default=1)
+    parser.add_argument("--batch-size", type=int, default=2)
+    parser.add_argument("--max-length", type=int, default=2048)
+    parser.add_argument("--prune", default="off", choices=PRUNE_MODES,
+                        help="Skip or down-weight low-loss examples after the first epoch")
+    parser.add_argument("--prune-keep", type=float, default=0.5,
+                        help="Share of hardest examples kept at full weight when pruning")
+    parser.add_argument("--agreement-steps", type=int, default=None,
+                        help="Stop when agreement with user answers, scored every N steps, plateaus "
+                             "(default: once per epoch or pruned pass; 0: off)")
+    parser.add_argument("--agreement-patience", type=int, default=3,
+                        help="Agreement measurements without improvement before stopping")
+
+
+def add_filter_args(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--keep-fraction", type=float, default=0.8,
+                        help="Share of synthetic items the quality filter keeps")
+
+
+def add_eval_args(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--max-new-tokens", type=int, default=512, help="Tokens per scenario response")
+
+
+def add_export_args(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--quant", default="Q4_K_M", choices=QUANT_PRESETS, help="GGUF quantization preset")
+
+
+def parse_args(argv: List[str]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Kindred2 - headless pipeline driver")
+    parser.add_argument("--models-root", default=None, help="Override models_root from settings.json")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    subparsers.add_parser("list", help="List model folders with artifact flags").set_defaults(func=cmd_list)
+
+    status = subparsers.add_parser("status", help="Show artifacts for one model")
+    status.add_argument("model_name")
+    status.set_defaults(func=cmd_status)
+
+    synth = subparsers.add_parser("synthesize", help="Generate synthetic Q&A from user answers")
+    synth.add_argument("model_name")
+    synth.add_argument("--incremental", action="store_true",
+                       help="Regenerate only items derived from changed or removed answers")
+    add_synth_args(synth)
+    add_draft_args(synth)
+    synth.set_defaults(func=cmd_synthesize)
+
+    quality = subparsers.add_parser("filter", help="Score synthetic Q&A and keep the best for training")
+    quality.add_argument("model_name")
+    quality.add_argument("--base-model", default=DEFAULT_BASE_MODEL, help="HF base model or local path")
+    add_filter_args(quality)
+    add_load_args(quality)
+    quality.set_defaults(func=cmd_filter)
+
+    train = subparsers.add_parser("train", help="Train the LoRA adapter")
+    train.add_argument("model_name")
+    add_train_args(train)
+    add_load_args(train)
+    train.set_defaults(func=cmd_train)
+
+    evaluate = subparsers.add_parser("evaluate", help="Run the value scenarios against the adapter")
+    evaluate.add_argument("model_name")
+    add_eval_args(evaluate)
+    add_draft_args(evaluate)
+    add_load_args(evaluate)
+    evaluate.set_defaults(func=cmd_evaluate)
+
+    export = subparsers.add_parser("export", help="Merge the adapter and convert to GGUF")
+    export.add_argument("model_name")
+    add_export_args(export)
+    add_load_args(export)
+    export.set_defaults(func=cmd_export)
+
+    build_all = subparsers.add_parser("build-all", help="Synthesize, filter, train, evaluate and export in one process")
+    build_all.add_argument("model_name")
+    build_all.add_argument("--force-synth", action="store_true", help="Regenerate synthetic Q&A even if present")
+    build_all.add_argument("--skip-eval", action="store_true", help="Do not evaluate before merging")
+    build_all.add_argument("--skip-filter", action="store_true", help="Train on every synthetic item")
+    add_synth_args(build_all)
+    add_train_args(build_all)
+    add_filter_args(build_all)
+    add_eval_args(build_all)
+    add_export_args(build_all)
+    add_draft_args(build_all)
+    add_load_args(build_all)
+    build_all.set_defaults(func=cmd_build_all)
+
+    warmup = subparsers.add_parser("warmup", help="Read the base model into the OS page cache")
+    warmup.add_argument("model_name")
+    warmup.add_argument("--base-model", default=None, help="Override the model's base_model.txt")
+    warmup.set_defaults(func=cmd_warmup)
+
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    args = parse_args(sys.argv[1:] if argv is None else argv)
+    settings = SettingsStore(SETTINGS_PATH).load()
+    models_root = Path(args.models_root).expanduser() if args.models_root else settings.models_root
+    manager = ModelManager(models_root)
+    try:
+        args.func(manager, args)
+    except (FileNotFoundError, ValueError) as exc:
+        print(f"error: {exc}", file=sys.stderr)
+        sys.exit(2)
+
+
+if __name__ == "__main__":
+    main()
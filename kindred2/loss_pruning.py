@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Loss-based data pruning for the Kindred trainers.
+
+The first pass over the training set trains on every example and records
+each one's loss. Every later pass starts by ranking examples on their most
+recent loss and taking the loss at the --prune-keep quantile as a threshold:
+  skip    only examples at or above the threshold (the hardest share) are
+          trained on again, so later passes cost a fraction of an epoch
+  weight  every example is trained on, but an easy example's loss is scaled
+          by its loss over the threshold, so it contributes less gradient
+All passes run as a single Trainer epoch over one sampler, so the optimizer,
+learning-rate schedule and step counter carry straight through.
+
+After training, one no-grad pass over the full set gives the final loss, and
+the run is appended to pruning_runs.jsonl with the examples trained against
+a full run and, when user answers are available, answer agreement. A run with
+--prune-keep 1.0 trains on everything and gives a baseline for comparison.
+
+The Trainer side lives in training_callbacks.LossPruningTrainer; this module
+imports torch only inside per_example_losses.
+"""
+import random
+import statistics
+import time
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+from jsonl_store import append_record
+
+PRUNE_MODES = ["off", "weight", "skip"]
+RUNS_FILENAME = "pruning_runs.jsonl"
+# Dataset column carrying each example's row number through the collator
+INDEX_COLUMN = "example_index"
+
+
+def per_example_losses(logits, labels):
+    """Mean next-token loss of each row over its unmasked (label != -100) tokens."""
+    import torch
+    import torch.nn.functional as F
+
+    losses = []
+    for row_logits, row_labels in zip(logits, labels):
+        # Position t predicts token t + 1; float32 one row at a time
+        targets = row_labels[1:].to(row_logits.device)
+        token_losses = F.cross_entropy(row_logits[:-1].float(), targets, ignore_index=-100, reduction="none")
+        count = (targets != -100).sum()
+        losses.append(token_losses.sum() / count.clamp(min=1))
+    return torch.stack(losses)
+
+
+class LossPruning:
+    """Per-example losses and the pass-by-pass training order built from them.
+
+    Iterating yields example indices for every pass in turn, so the object
+    serves as the Trainer's sampler; each pass is chosen when it starts,
+    from the losses recorded so far.
+    """
+
+    def __init__(self, size: int, epochs: int, mode: str = "skip", keep_fraction: float = 0.5, seed: int = 42):
+        if mode not in PRUNE_MODES[1:]:
+            raise ValueError(f"Unknown prune mode '{mode}'")
+        self.size = size
+        self.epochs = max(1, epochs)
+        self.mode = mode
+        self.keep_fraction = min(max(keep_fraction, 0.0), 1.0)
+        self.seed = seed
+        self.losses: List[Optional[float]] = [None] * size
+        self.threshold: Optional[float] = None
+        self.pass_sizes: List[int] = []
+        self.pass_losses: List[List[float]] = []
+
+    @property
+    def keep_count(self) -> int:
+        return max(1, round(self.size * self.keep_fraction))
+
+    def pass_size(self, pass_index: int) -> int:
+        return self.keep_count if pass_index and self.mode == "skip" else self.size
+
+    def __len__(self) -> int:
+        return sum(self.pass_size(p) for p in range(self.epochs))
+
+    def _start_pass(self, pass_index: int) -> List[int]:
+        indices = list(range(self.size))
+        if pass_index:
+            # Hardest first; examples without a loss yet (a batch still in flight) rank above all
+            ranked = sorted(indices, key=lambda i: (self.losses[i] is not None, -(self.losses[i] or 0.0)))
+            self.threshold = self.losses[ranked[self.keep_count - 1]]
+            if self.mode == "skip":
+                indices = ranked[:self.keep_count]
+        random.Random(self.seed + pass_index).shuffle(indices)
+        self.pass_sizes.append(len(indices))
+        self.pass_losses.append([])
+        return indices
+
+    def __iter__(self) -> Iterator[int]:
+        self.threshold = None
+        self.pass_sizes, self.pass_losses = [], []
+        for pass_index in range(self.epochs):
+            yield from self._start_pass(pass_index)
+
+    def weights(self, indices: List[int]) -> List[float]:
+        """Loss weights for a batch: below the threshold, loss / threshold (weight mode only)."""
+        if self.mode != "weight" or not self.threshold:
+            return [1.0] * len(indices)
+        return [
+            1.0 if self.losses[i] is None or self.losses[i] >= self.threshold else self.losses[i] / self.threshold
+            for i in indices
+        ]
+
+    def record(self, indices: List[int], losses: List[float]) -> None:
+        for index, loss in zip(indices, losses):
+            self.losses[index] = loss
+        if self.pass_losses:
+            self.pass_losses[-1].extend(losses)
+
+    def summary(self) -> Dict:
+        trained = sum(self.pass_sizes)
+        full = self.size * self.epochs
+        return {
+            "mode": self.mode,
+            "keep_fraction": self.keep_fraction,
+            "epochs": self.epochs,
+            "examples": self.size,
+            "trained": trained,
+            "full_run": full,
+            "compute_saved": round(1 - trained / full, 4) if full else 0.0,
+            "pass_sizes": self.pass_sizes,
+            "pass_mean_loss": [round(statistics.fmean(l), 4) if l else None for l in self.pass_losses],
+        }
+
+
+def report_pruning(trainer, runs_path: Path, scorer=None, **context) -> Dict:
+    """Final full-set loss (and agreement if scorer is given) for a LossPruningTrainer run, appended to runs_path."""
+    record = {"time": time.time(), **context, **trainer.pruning.summary()}
+    record["final_loss"] = round(trainer.full_pass_loss(), 4)
+    if scorer is not None and len(scorer):
+        record.update(scorer.score(trainer.model))
+    append_record(runs_path, record)
+
+    line = (f"Pruning ({record['mode']}, keep {record['keep_fraction']:.0%}): trained "
+            f"{record['trained']}/{record['full_run']} examples ({record['compute_saved']:.0%} saved), "
+            f"final loss {record['final_loss']:.4f}")
+    if "agreement" in record:
+        line += f", agreement {record['agreement']:.0%} of {record['answers']} answers"
+    print(line, flush=True)
+    return record
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Kindred2 model folders and settings, shared by the Qt app and the headless CLI.
+
+Must not import PyQt6 or any ML framework.
+"""
+import json
+import os
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Set, Tuple
+
+
+DEFAULT_BASE_MODEL = "D:/_GITN/kindred_spirit/models/Huihui-Qwen3-VL-8B-Instruct-abliterated"
+SETTINGS_PATH = Path(__file__).with_name("settings.json")
+
+FILE_SPECS: List[Tuple[str, str]] = [
+    ("Question set", "questions_with_perspectives.json"),
+    ("User answers", "user_answers.json"),
+    ("Synthetic Q&A", "synthetic_qa.json"),
+    ("Root model", "root_model.safetensors"),
+    ("Finetuned model", "finetuned_model.safetensors"),
+]
+
+# Artifacts that gate actions but have no status row
+ADAPTER_DIR = "finetuned_adapter"
+
+
+def scan_model_folder(model_path: Path) -> Tuple[Dict[str, bool], Set[Path]]:
+    """Report which FILE_SPECS artifacts are present from a single directory listing.
+
+    .json artifacts also count when their .jsonl variant is present. Returns the
+    presence map and any matching files that exist but are still empty.
+    """
+    present: Dict[str, bool] = {filename: False for _, filename in FILE_SPECS}
+    present[ADAPTER_DIR] = False
+    aliases = {}
+    for _, filename in FILE_SPECS:
+        aliases[filename] = filename
+        if filename.endswith(".json"):
+            aliases[filename + "l"] = filename
+    empty: Set[Path] = set()
+    try:
+        with os.scandir(model_path) as entries:
+            for entry in entries:
+                if entry.name == ADAPTER_DIR and entry.is_dir():
+                    present[ADAPTER_DIR] = True
+                    continue
+                key = aliases.get(entry.name)
+                if key is None or not entry.is_file():
+                    continue
+                # On Windows scandir carries the size, so this is not an extra stat
+                if entry.stat().st_size > 0:
+                    present[key] = True
+                else:
+                    empty.add(Path(entry.path))
+    except OSError:
+        pass
+    return present, empty
+
+
+def resolve_base_model(model_folder: Path) -> str:
+    """Base model recorded by train_adapter.py, or the default."""
+    base_model_file = model_folder / "base_model.txt"
+    if base_model_file.exists():
+        try:
+            value = base_model_file.read_text(encoding="utf-8").strip()
+            if value:
+                return value
+        except Exception:
+            pass
+    return DEFAULT_BASE_MODEL
+
+
+@dataclass
+class Settings:
+    models_root: Path
+
+
+class SettingsStore:
+    def __init__(self, settings_path: Path):
+        self.settings_path = settings_path
+
+    def load(self) -> Settings:
+        if self.settings_path.exists():
+            try:
+                data = json.loads(self.settings_path.read_text(encoding="utf-8"))
+                root = Path(data.get("models_root", "")).expanduser()
+                if root:
+                    return Settings(models_root=root)
+            except Exception:
+                pass
+        default_root = Path.home() / "Documents" / "KindredModels"
+        settings = Settings(models_root=default_root)
+        self.save(settings)
+        return settings
+
+    def save(self, settings: Settings) -> None:
+        self.settings_path.parent.mkdir(parents=True, exist_ok=True)
+        self.settings_path.write_text(
+            json.dumps({"models_root": str(settings.models_root)}, indent=2),
+            encoding="utf-8"
+        )
+
+
+class ModelManager:
+    def __init__(self, models_root: Path):
+        self.models_root = models_root
+        self.models_root.mkdir(parents=True, exist_ok=True)
+
+    def list_models(self) -> List[str]:
+        if not self.models_root.exists():
+            return []
+        with os.scandir(self.models_root) as entries:
+            return sorted(entry.name for entry in entries if entry.is_dir())
+
+    def get_model_path(self, model_name: str) -> Path:
+        return self.models_root / model_name
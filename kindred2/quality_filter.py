@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+"""
+Score synthetic Q&A before training and drop the weakest items.
+
+Each {instruction, response} gets two scores:
+  fluency      mean per-token log-likelihood of the response under the base
+               model, from batched forward passes over length-sorted items
+  consistency  for the user's answered question nearest to the instruction
+               (embedding index), how much closer the response sits to the
+               option the user chose than to the other one, scaled by the
+               user's confidence; 0 when no answered question is related
+
+The two are z-scored across the set and summed (consistency weighted), and
+the top --keep-fraction is written to synthetic_qa_filtered.jsonl, which
+train_adapter.py uses while it is newer than synthetic_qa. Every score goes
+to synthetic_quality.jsonl.
+
+Usage: python quality_filter.py --model-folder PATH [--keep-fraction 0.8]
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from jsonl_store import iter_records, read_meta, resolve_records_path, write_records
+from model_store import DEFAULT_BASE_MODEL
+from question_bank import QUESTIONS_KEY
+from weights_loader import LOAD_MODES
+
+FILTERED_FILENAME = "synthetic_qa_filtered.jsonl"
+SCORES_FILENAME = "synthetic_quality.jsonl"
+# Below this cosine the nearest answered question is not evidence either way
+MIN_RELEVANCE = 0.35
+
+
+def parse_args(argv: List[str]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Score and filter Kindred2 synthetic Q&A")
+    parser.add_argument("--model-folder", required=True, help="Path to ethical model folder")
+    parser.add_argument("--base-model", default=DEFAULT_BASE_MODEL, help="HF base model or local path")
+    parser.add_argument("--keep-fraction", type=float, default=0.8, help="Share of items to keep")
+    parser.add_argument("--consistency-weight", type=float, default=1.0)
+    parser.add_argument("--batch-size", type=int, default=8)
+    parser.add_argument("--max-length", type=int, default=1024)
+    parser.add_argument(
+        "--load-mode",
+        default="eager",
+        choices=LOAD_MODES,
+        help="eager: from_pretrained; lazy: memory-mapped shards, layers loaded on first use"
+    )
+    return parser.parse_args(argv)
+
+
+def format_prompt(instruction: str) -> str:
+    # Same layout as train_adapter.iter_synthetic_texts
+    return f"<|im_start|>user\n{instruction}<|im_end|>\n<|im_start|>assistant\n"
+
+
+def response_log_likelihoods(model, tokenizer, items: List[Dict], batch_size: int = 8,
+                             max_length: int = 1024) -> List[float]:
+    """Mean log-probability per response token, in item order.
+
+    Items are scored in length-sorted batches so padding stays small; only
+    response tokens count, not the instruction.
+    """
+    import torch
+
+    prompts = [tokenizer(format_prompt(item["instruction"]), add_special_tokens=False)["input_ids"]
+               for item in items]
+    responses = [tokenizer(item["response"] + "<|im_end|>", add_special_tokens=False)["input_ids"]
+                 for item in items]
+    sequences = [(p + r)[:max_length] for p, r in zip(prompts, responses)]
+    order = sorted(range(len(items)), key=lambda i: len(sequences[i]))
+    pad_id = tokenizer.pad_token_id if tokenizer.pad_token_id is not None else tokenizer.eos_token_id
+    device = next(model.parameters()).device
+
+    scores = [float("-inf")] * len(items)
+    model.eval()
+    with torch.no_grad():
+        for start in range(0, len(order), batch_size):
+            batch = order[start:start + batch_size]
+            width = max(len(sequences[i]) for i in batch)
+            input_ids = torch.full((len(batch), width), pad_id, dtype=torch.long)
+            attention = torch.zeros((len(batch), width), dtype=torch.long)
+            for row, i in enumerate(batch):
+                input_ids[row, :len(sequences[i])] = torch.tensor(sequences[i])
+                attention[row, :len(sequences[i])] = 1
+            logits = model(input_ids=input_ids.to(device), attention_mask=attention.to(device)).logits
+            for row, i in enumerate(batch):
+                begin, end = len(prompts[i]), len(sequences[i])
+                if end <= begin:
+                    continue
+                # Position t predicts token t + 1; float32 only for this row's span
+                row_logits = logits[row, begin - 1:end - 1].float()
+                targets = input_ids[row, begin:end].to(row_logits.device)
+                log_probs = row_logits.log_softmax(dim=-1).gather(1, targets.unsqueeze(1))
+                scores[i] = log_probs.mean().item()
+            del logits
+    return scores
+
+
+def consistency_scores(items: List[Dict], user_answers_path: Path, questions_path: Path) -> List[float]:
+    """Signed agreement of each response with the user's choice on the nearest answered question."""
+    import numpy as np
+    from embedding_index import Embedder, load_index
+
+    answers = {str(r.get("question_id")): r for r in iter_records(user_answers_path, key="responses")}
+    questions = {str(q.get("id")): q for q in iter_records(questions_path, key=QUESTIONS_KEY)}
+    embedder = Embedder()
+    index = load_index(user_answers_path, "answers", embedder)
+
+    hits = index.search_vectors(embedder.encode([item["instruction"] for item in items]), k=1)
+    response_vectors = embedder.encode([item["response"] for item in items])
+
+    # Option texts of every answered question that can serve as evidence
+    option_rows: Dict[str, int] = {}
+    option_texts: List[str] = []
+    for item in index.items:
+        question = questions.get(item["id"])
+        if question and item["id"] in answers and item["id"] not in option_rows:
+            option_rows[item["id"]] = len(option_texts)
+            option_texts += [question.get("option_a", ""), question.get("option_b", "")]
+    option_vectors = embedder.encode(option_texts) if option_texts else np.zeros((0, 1), np.float32)
+
+    scores = []
+    for item_hits, response_vector in zip(hits, response_vectors):
+        if not item_hits or item_hits[0][1] < MIN_RELEVANCE:
+            scores.append(0.0)
+            continue
+        question_id = index.items[item_hits[0][0]]["id"]
+        answer = answers.get(question_id)
+        if question_id not in option_rows or answer.get("choice") not in ("A", "B"):
+            scores.append(0.0)
+            continue
+        row = option_rows[question_id]
+        chosen, other = (row, row + 1) if answer["choice"] == "A" else (row + 1, row)
+        margin = float(response_vector @ option_vectors[chosen] - response_vector @ option_vectors[other])
+        confidence = float(answer.get("confidence") or 50) / 100
+        scores.append(margin * confidence)
+    return scores
+
+
+def zscores(values: List[float]) -> List[float]:
+    finite = [v for v in values if v != float("-inf")]
+    if len(finite) < 2:
+        return [0.0 if v != float("-inf") else -10.0 for v in values]
+    mean = statistics.fmean(finite)
+    sd = statistics.pstdev(finite) or 1.0
+    return [(v - mean) / sd if v != float("-inf") else -10.0 for v in values]
+
+
+def source_signature(path: Path) -> str:
+    """Size and mtime of the file a filtered set was scored from."""
+    stat = Path(path).stat()
+    return f"{stat.st_size}:{stat.st_mtime_ns}"
+
+
+def current_filtered(model_folder: Path, synthetic_path: Path) -> Optional[Path]:
+    """The filtered subset if it was scored from synthetic_path as it is now, else None."""
+    filtered_path = Path(model_folder) / FILTERED_FILENAME
+    if not filtered_path.is_file():
+        return None
+    meta = read_meta(filtered_path)
+    if meta.get("source") != str(synthetic_path) or meta.get("source_signature") != source_signature(synthetic_path):
+        return None
+    return filtered_path
+
+
+def filter_items(model, tokenizer, model_folder: Path, keep_fraction: float = 0.8,
+                 consistency_weight: float = 1.0, batch_size: int = 8, max_length: int = 1024) -> Path:
+    """Score synthetic_qa with model and write the kept items; returns the filtered path."""
+    model_folder = Path(model_folder)
+    synthetic_path = resolve_records_path(model_folder / "synthetic_qa.json")
+    # Taken before reading, so a rewrite during scoring leaves the result stale
+    signature = source_signature(synthetic_path)
+    items = [
+        {"instruction": str(item.get("instruction", "")).strip(), "response": str(item.get("response", "")).strip()}
+        for item in iter_records(synthetic_path)
+    ]
+    items = [item for item in items if item["instruction"] and item["response"]]
+    if not items:
+        raise ValueError(f"No usable synthetic items in {synthetic_path}")
+
+    start = time.perf_counter()
+    fluency = response_log_likelihoods(model, tokenizer, items, batch_size, max_length)
+    user_answers = resolve_records_path(model_folder / "user_answers.json")
+    questions = model_folder / "questions_with_perspectives.json"
+    if user_answers.is_file() and questions.is_file():
+        consistency = consistency_scores(items, user_answers, questions)
+    else:
+        print("No user answers or question set in the model folder; scoring fluency only")
+        consistency = [0.0] * len(items)
+
+    combined = [f + consistency_weight * c for f, c in zip(zscores(fluency), zscores(consistency))]
+    keep_count = max(1, round(len(items) * keep_fraction))
+    kept = set(sorted(range(len(items)), key=lambda i: combined[i], reverse=True)[:keep_count])
+
+    scores = [
+        {"index": i, "instruction": item["instruction"], "fluency": round(fluency[i], 4),
+         "consistency": round(consistency[i], 4), "score": round(combined[i], 4), "kept": i in kept}
+        for i, item in enumerate(items)
+    ]
+    write_records(model_folder / SCORES_FILENAME, scores, meta={"source": str(synthetic_path), "time": time.time()})
+    filtered_path = model_folder / FILTERED_FILENAME
+    write_records(filtered_path, (item for i, item in enumerate(items) if i in kept),
+                  meta={"source": str(synthetic_path), "source_signature": signature,
+                        "kept": keep_count, "scored": len(items)})
+    print(f"Kept {keep_count}/{len(items)} items in {time.perf_counter() - start:.0f}s -> {filtered_path}")
+    return filtered_path
+
+
+def main() -> None:
+    args = parse_args(sys.argv[1:])
+    model_folder = Path(args.model_folder)
+    synthetic_path = resolve_records_path(model_folder / "synthetic_qa.json")
+    if not synthetic_path.is_file():
+        print(f"synthetic_qa.json/.jsonl not found: {synthetic_path}")
+        sys.exit(1)
+
+    os.environ["KMP_DUPLICATE_LIB_OK"] = "TRUE"
+    from transformers import AutoTokenizer
+    from weights_loader import load_causal_lm
+
+    tokenizer = AutoTokenizer.from_pretrained(args.base_model, trust_remote_code=True)
+    model = load_causal_lm(args.base_model, args.load_mode)
+    filter_items(model, tokenizer, model_folder, args.keep_fraction, args.consistency_weight,
+                 args.batch_size, args.max_length)
+
+
+if __name__ == "__main__":
+    main()
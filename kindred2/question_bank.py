@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+"""
+Indexed question banks for the calibrators.
+
+A bank is a SQLite file holding one row per question (file order, id, phase,
+JSON body) with an index on phase. Opening a bank reads no questions; counts
+and phase filters are index lookups, and a question is parsed only when it is
+shown.
+
+open_question_bank() accepts a bank or a legacy questions JSON/JSONL file. For
+the latter it builds <stem>.bank.sqlite next to the source on first use and
+rebuilds it when the source changes.
+
+Usage: python question_bank.py build questions_with_perspectives.json [--output bank.sqlite]
+"""
+import argparse
+import json
+import os
+import sqlite3
+import sys
+from functools import lru_cache
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional, Sequence
+
+from jsonl_store import iter_records
+
+BANK_SUFFIXES = (".sqlite", ".db")
+SCHEMA_VERSION = 1
+QUESTIONS_KEY = "calibration_questions"
+
+
+def parse_args(argv: List[str]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Build an indexed calibration question bank")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    build = subparsers.add_parser("build", help="Convert questions JSON/JSONL into a bank")
+    build.add_argument("source", help="questions_with_perspectives.json or a .jsonl of questions")
+    build.add_argument("--output", default=None, help="Bank path (default: <source stem>.bank.sqlite)")
+    info = subparsers.add_parser("info", help="Show question counts per phase")
+    info.add_argument("bank")
+    return parser.parse_args(argv)
+
+
+def default_bank_path(source: Path) -> Path:
+    return source.with_name(f"{source.stem}.bank.sqlite")
+
+
+def source_signature(source: Path) -> str:
+    stat = source.stat()
+    return f"{SCHEMA_VERSION}:{stat.st_size}:{stat.st_mtime_ns}"
+
+
+def build_bank(source: Path, output: Optional[Path] = None) -> Path:
+    """Write every question in source to a fresh bank, atomically; returns the bank path."""
+    source = Path(source)
+    output = Path(output) if output else default_bank_path(source)
+    tmp = output.with_name(output.name + ".tmp")
+    tmp.unlink(missing_ok=True)
+
+    conn = sqlite3.connect(tmp)
+    try:
+        conn.executescript("""
+            CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT);
+            CREATE TABLE questions (
+                position INTEGER PRIMARY KEY,
+                id TEXT UNIQUE NOT NULL,
+                phase TEXT,
+                data TEXT NOT NULL
+            );
+        """)
+        rows = (
+            (position, q["id"], q.get("phase"), json.dumps(q, ensure_ascii=False))
+            for position, q in enumerate(iter_records(source, key=QUESTIONS_KEY))
+        )
+        conn.executemany("INSERT INTO questions VALUES (?, ?, ?, ?)", rows)
+        # Built after the bulk insert: one sort instead of per-row index updates
+        conn.execute("CREATE INDEX questions_phase ON questions (phase, position)")
+        conn.executemany("INSERT INTO meta VALUES (?, ?)", [
+            ("schema_version", str(SCHEMA_VERSION)),
+            ("source", str(source)),
+            ("source_signature", source_signature(source)),
+        ])
+        conn.commit()
+    finally:
+        conn.close()
+    os.replace(tmp, output)
+    return output
+
+
+class QuestionBank:
+    """Read-only view over a bank file."""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        if not self.path.is_file():
+            raise FileNotFoundError(f"Question bank not found: {self.path}")
+        self.conn = sqlite3.connect(f"{self.path.resolve().as_uri()}?mode=ro", uri=True)
+
+    def close(self) -> None:
+        self.conn.close()
+
+    def meta(self, key: str) -> Optional[str]:
+        row = self.conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def phases(self) -> Dict[str, int]:
+        rows = self.conn.execute("SELECT phase, COUNT(*) FROM questions GROUP BY phase ORDER BY MIN(position)")
+        return {phase: count for phase, count in rows}
+
+    def count(self, phase: Optional[str] = None) -> int:
+        if phase is None:
+            return self.conn.execute("SELECT COUNT(*) FROM questions").fetchone()[0]
+        return self.conn.execute("SELECT COUNT(*) FROM questions WHERE phase = ?", (phase,)).fetchone()[0]
+
+    def positions(self, phase: Optional[str] = None) -> List[int]:
+        """File-order positions of the questions in phase (all questions if None)."""
+        if phase is None:
+            rows = self.conn.execute("SELECT position FROM questions ORDER BY position")
+        else:
+            rows = self.conn.execute(
+                "SELECT position FROM questions WHERE phase = ? ORDER BY position", (phase,)
+            )
+        return [row[0] for row in rows]
+
+    def get(self, position: int) -> Dict:
+        row = self.conn.execute("SELECT data FROM questions WHERE position = ?", (position,)).fetchone()
+        if row is None:
+            raise KeyError(position)
+        return json.loads(row[0])
+
+    def get_by_id(self, question_id: str) -> Optional[Dict]:
+        row = self.conn.execute("SELECT data FROM questions WHERE id = ?", (question_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def iter_questions(self, phase: Optional[str] = None) -> Iterator[Dict]:
+        if phase is None:
+            rows = self.conn.execute("SELECT data FROM questions ORDER BY position")
+        else:
+            rows = self.conn.execute(
+                "SELECT data FROM questions WHERE phase = ? ORDER BY position", (phase,)
+            )
+        for (data,) in rows:
+            yield json.loads(data)
+
+    def sequence(self, phase: Optional[str] = None, factory: Optional[Callable[[Dict], object]] = None,
+                 cache_size: int = 8) -> "QuestionSequence":
+        return QuestionSequence(self, self.positions(phase), factory, cache_size)
+
+
+class QuestionSequence(Sequence):
+    """List-like access to a bank's questions that parses each one on demand."""
+
+    def __init__(self, bank: QuestionBank, positions: List[int],
+                 factory: Optional[Callable[[Dict], object]] = None, cache_size: int = 8):
+        self.bank = bank
+        self.positions = positions
+        self.factory = factory
+        self._load = lru_cache(maxsize=cache_size)(self._load_uncached)
+
+    def _load_uncached(self, position: int):
+        data = self.bank.get(position)
+        return self.factory(data) if self.factory else data
+
+    def __len__(self) -> int:
+        return len(self.positions)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._load(p) for p in self.positions[index]]
+        return self._load(self.positions[index])
+
+
+def open_question_bank(path: Path) -> QuestionBank:
+    """Open a bank, building or refreshing it first if path is a questions JSON/JSONL file."""
+    path = Path(path)
+    if path.suffix.lower() in BANK_SUFFIXES:
+        return QuestionBank(path)
+    if not path.is_file():
+        raise FileNotFoundError(f"Questions file not found: {path}")
+
+    bank_path = default_bank_path(path)
+    if bank_path.is_file():
+        bank = QuestionBank(bank_path)
+        if bank.meta("source_signature") == source_signature(path):
+            return bank
+        bank.close()
+    return QuestionBank(build_bank(path, bank_path))
+
+
+def main() -> None:
+    args = parse_args(sys.argv[1:])
+    if args.command == "build":
+        source = Path(args.source)
+        if not source.is_file():
+            print(f"Questions file not found: {source}")
+            sys.exit(1)
+        bank_path = build_bank(source, Path(args.output) if args.output else None)
+        bank = QuestionBank(bank_path)
+        print(f"Wrote {bank.count()} questions to {bank_path}")
+    else:
+        bank = QuestionBank(Path(args.bank))
+    for phase, count in bank.phases().items():
+        print(f"  {phase}: {count}")
+    bank.close()
+
+
+if __name__ == "__main__":
+    main()
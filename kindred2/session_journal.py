@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Crash-safe autosave for calibration sessions.
+
+A journal is a JSONL file: a {"_meta": {...}} line describing the session,
+then one record per answer, each appended and fsynced before the next
+question is shown. A crash loses at most the answer being typed. Resuming
+replays the records; a torn final line from a crash mid-write is dropped and
+the journal is rewritten without it before any new answer is appended. An
+unreadable line anywhere else is not a crash artefact, so recovery refuses
+to touch the file rather than lose the answers after it.
+"""
+import json
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+from jsonl_store import META_KEY, append_record, atomic_writer, write_records
+
+
+def journal_path_for(output_path: Path) -> Path:
+    """Journal kept beside a results file: results.json -> results.journal.jsonl."""
+    output_path = Path(output_path)
+    return output_path.with_name(f"{output_path.stem}.journal.jsonl")
+
+
+class SessionJournal:
+    def __init__(self, path: Path):
+        self.path = Path(path)
+
+    def exists(self) -> bool:
+        return self.path.is_file() and self.path.stat().st_size > 0
+
+    def start(self, meta: Dict) -> None:
+        """Begin a new session, replacing any previous journal atomically."""
+        write_records(self.path, [], meta=meta)
+
+    def append(self, record: Dict) -> None:
+        append_record(self.path, record, fsync=True)
+
+    def recover(self) -> Tuple[Dict, List[Dict]]:
+        """Session meta and answer records; repairs the file if its last line is torn.
+
+        Raises ValueError, leaving the file as it is, if any earlier line is unreadable.
+        """
+        if not self.exists():
+            return {}, []
+        meta: Dict = {}
+        records: List[Dict] = []
+        torn = False
+        with open(self.path, "r", encoding="utf-8", errors="replace") as f:
+            lines = [(number, line.strip()) for number, line in enumerate(f, 1) if line.strip()]
+        for position, (number, line) in enumerate(lines):
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                if position < len(lines) - 1:
+                    raise ValueError(
+                        f"Session journal {self.path} has an unreadable line {number} with "
+                        f"{len(lines) - position - 1} line(s) after it; fix or remove the line to resume"
+                    )
+                torn = True
+                break
+            if META_KEY in record:
+                meta = record[META_KEY]
+            else:
+                records.append(record)
+        if torn:
+            with atomic_writer(self.path) as f:
+                f.write(json.dumps({META_KEY: meta}, ensure_ascii=False) + "\n")
+                for record in records:
+                    f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        return meta, records
+
+    def answer_count(self) -> int:
+        return len(self.recover()[1]) if self.exists() else 0
+
+    def discard(self) -> None:
+        """Remove the journal once its answers are safely in the results file."""
+        self.path.unlink(missing_ok=True)
@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+"""
+Assisted (speculative) decoding with a small draft model.
+
+The draft model proposes a few tokens at a time and the main model checks
+them all in one forward pass, so every accepted token saves a full-size
+decode step. The draft must use the main model's tokenizer (e.g. a 0.5B Qwen
+for a Qwen main model); outputs follow the main model's distribution.
+
+SpeculativeGenerator wraps model.generate(), counts forward calls on both
+models to estimate the draft acceptance rate, and times a plain decode of the
+first prompt so it can report the tokens/sec speedup.
+
+Usage: python speculative.py --model Qwen/Qwen2.5-3B-Instruct --draft-model Qwen/Qwen2.5-0.5B-Instruct
+"""
+import argparse
+import sys
+import time
+from typing import Dict, List, Optional
+
+DEFAULT_DRAFT_MODEL = "Qwen/Qwen2.5-0.5B-Instruct"
+
+
+def parse_args(argv: List[str]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark assisted decoding against plain decoding")
+    parser.add_argument("--model", required=True, help="HF main model or local path")
+    parser.add_argument("--draft-model", default=DEFAULT_DRAFT_MODEL, help="Small model sharing the tokenizer")
+    parser.add_argument("--max-new-tokens", type=int, default=256)
+    return parser.parse_args(argv)
+
+
+def load_draft_model(draft_name: str, model, tokenizer):
+    """Load draft_name on model's device and dtype; raises ValueError if the tokenizers differ."""
+    from transformers import AutoModelForCausalLM, AutoTokenizer
+
+    draft_tokenizer = AutoTokenizer.from_pretrained(draft_name, trust_remote_code=True)
+    if draft_tokenizer.get_vocab() != tokenizer.get_vocab():
+        raise ValueError(f"Draft model {draft_name} does not share the main model's tokenizer")
+    draft = AutoModelForCausalLM.from_pretrained(
+        draft_name, torch_dtype=model.dtype, trust_remote_code=True
+    ).to(model.device)
+    draft.eval()
+    return draft
+
+
+def maybe_load_draft_model(draft_name: Optional[str], model, tokenizer):
+    """load_draft_model, or None (plain decoding) if no draft is given or it does not fit."""
+    if not draft_name:
+        return None
+    try:
+        return load_draft_model(draft_name, model, tokenizer)
+    except ValueError as exc:
+        print(f"{exc}; using plain decoding")
+        return None
+
+
+class DecodeStats:
+    """Token and forward-call totals across generate() calls."""
+
+    def __init__(self):
+        self.prompt_tokens = 0
+        self.new_tokens = 0
+        self.seconds = 0.0
+        self.target_forwards = 0
+        self.draft_forwards = 0
+        self.baseline_tokens_per_second: Optional[float] = None
+
+    def merge(self, other: "DecodeStats") -> None:
+        """Add another process's totals; the first measured baseline is kept."""
+        self.prompt_tokens += other.prompt_tokens
+        self.new_tokens += other.new_tokens
+        self.seconds += other.seconds
+        self.target_forwards += other.target_forwards
+        self.draft_forwards += other.draft_forwards
+        if self.baseline_tokens_per_second is None:
+            self.baseline_tokens_per_second = other.baseline_tokens_per_second
+
+    @property
+    def tokens_per_second(self) -> float:
+        return self.new_tokens / self.seconds if self.seconds > 0 else 0.0
+
+    @property
+    def acceptance_rate(self) -> Optional[float]:
+        """Share of drafted tokens the main model kept.
+
+        Every verification pass emits one token of its own after the accepted
+        draft tokens, so accepted = new tokens - main-model forwards. Each draft
+        forward proposes one token.
+        """
+        if not self.draft_forwards:
+            return None
+        accepted = max(self.new_tokens - self.target_forwards, 0)
+        return min(accepted / self.draft_forwards, 1.0)
+
+    @property
+    def speedup(self) -> Optional[float]:
+        if not self.baseline_tokens_per_second:
+            return None
+        return self.tokens_per_second / self.baseline_tokens_per_second
+
+    def as_dict(self) -> Dict:
+        return {
+            "prompt_tokens": self.prompt_tokens,
+            "new_tokens": self.new_tokens,
+            "seconds": round(self.seconds, 2),
+            "tokens_per_second": round(self.tokens_per_second, 2),
+            "target_forwards": self.target_forwards,
+            "draft_forwards": self.draft_forwards,
+            "acceptance_rate": None if self.acceptance_rate is None else round(self.acceptance_rate, 3),
+            "baseline_tokens_per_second": (
+                None if self.baseline_tokens_per_second is None else round(self.baseline_tokens_per_second, 2)
+            ),
+            "speedup": None if self.speedup is None else round(self.speedup, 2),
+        }
+
+    def summary(self) -> str:
+        parts = [f"{self.new_tokens} tokens at {self.tokens_per_second:.1f} tok/s"]
+        if self.acceptance_rate is not None:
+            parts.append(f"draft acceptance {self.acceptance_rate:.0%}")
+            parts.append(f"{self.new_tokens / max(self.target_forwards, 1):.2f} tokens per main-model pass")
+        if self.speedup is not None:
+            parts.append(f"{self.speedup:.2f}x vs plain decoding ({self.baseline_tokens_per_second:.1f} tok/s)")
+        return ", ".join(parts)
+
+
+def _count_calls(module, counter: Dict[str, int], key: str):
+    def hook(*_):
+        counter[key] += 1
+    return module.register_forward_hook(hook)
+
+
+def _innermost(model):
+    """The transformers model under any PEFT wrapper; its forward runs once per decode step."""
+    return model.get_base_model() if hasattr(model, "get_base_model") else model
+
+
+class SpeculativeGenerator:
+    """Calls model.generate() with a draft model attached and keeps DecodeStats.
+
+    With measure_baseline the first call is also run without the draft, once,
+    to give the speedup a reference rate on the same prompt.
+    """
+
+    def __init__(self, model, draft_model=None, measure_baseline: bool = True):
+        self.model = model
+        self.draft_model = draft_model
+        self.measure_baseline = measure_baseline and draft_model is not None
+        self.stats = DecodeStats()
+
+    def _timed_generate(self, inputs, draft_model, kwargs):
+        import torch
+
+        counter = {"target": 0, "draft": 0}
+        handles = [_count_calls(_innermost(self.model), counter, "target")]
+        if draft_model is not None:
+            handles.append(_count_calls(draft_model, counter, "draft"))
+            kwargs = {**kwargs, "assistant_model": draft_model}
+        try:
+            if torch.cuda.is_available():
+                torch.cuda.synchronize()
+            start = time.perf_counter()
+            with torch.no_grad():
+                outputs = self.model.generate(**inputs, **kwargs)
+            if torch.cuda.is_available():
+                torch.cuda.synchronize()
+            seconds = time.perf_counter() - start
+        finally:
+            for handle in handles:
+                handle.remove()
+        new_tokens = int(outputs.shape[1] - inputs["input_ids"].shape[1]) * outputs.shape[0]
+        return outputs, new_tokens, seconds, counter
+
+    def generate(self, inputs, **kwargs):
+        """model.generate(**inputs, **kwargs), with the draft model attached if there is one."""
+        if self.measure_baseline:
+            self.measure_baseline = False
+            _, tokens, seconds, _ = self._timed_generate(inputs, None, kwargs)
+            if seconds > 0:
+                self.stats.baseline_tokens_per_second = tokens / seconds
+
+        outputs, tokens, seconds, counter = self._timed_generate(inputs, self.draft_model, kwargs)
+        self.stats.prompt_tokens += int(inputs["input_ids"].numel())
+        self.stats.new_tokens += tokens
+        self.stats.seconds += seconds
+        self.stats.target_forwards += counter["target"]
+        self.stats.draft_forwards += counter["draft"]
+        return outputs
+
+
+def main() -> None:
+    args = parse_args(sys.argv[1:])
+
+    import torch
+    from transformers import AutoModelForCausalLM, AutoTokenizer
+    from adapter_eval import SCENARIOS
+
+    tokenizer = AutoTokenizer.from_pretrained(args.model, trust_remote_code=True)
+    model = AutoModelForCausalLM.from_pretrained(
+        args.model,
+        torch_dtype=torch.float16 if torch.cuda.is_available() else torch.float32,
+        device_map="auto",
+        trust_remote_code=True
+    )
+    model.eval()
+    draft = load_draft_model(args.draft_model, model, tokenizer)
+
+    plain = SpeculativeGenerator(model)
+    assisted = SpeculativeGenerator(model, draft, measure_baseline=False)
+    # Greedy decoding so both runs produce comparable outputs
+    settings = {"max_new_tokens": args.max_new_tokens, "do_sample": False}
+    for scenario in SCENARIOS:
+        messages = [{"role": "user", "content": scenario["prompt"]}]
+        text = tokenizer.apply_chat_template(messages, tokenize=False, add_generation_prompt=True)
+        inputs = tokenizer([text], return_tensors="pt").to(model.device)
+        plain.generate(inputs, **settings)
+        assisted.generate(inputs, **settings)
+        print(f"{scenario['name']}: done", flush=True)
+
+    assisted.stats.baseline_tokens_per_second = plain.stats.tokens_per_second
+    print(f"Plain:    {plain.stats.summary()}")
+    print(f"Assisted: {assisted.stats.summary()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,58 +1,282 @@
 #!/usr/bin/env python3
 """
 Generate synthetic Q&A from user answers using a small HF model.
+
+Generation is steered by coverage_planner: each round of prompts targets the
+calibration questions and phases that have the fewest items so far, and
+generation stops once every phase has its share. Each prompt shows the user's
+answers most relevant to its target questions (retrieved from the embedding
+index, diversified by MMR) packed into a fixed token budget measured with the
+generation tokenizer, so prefill stays bounded however many questions the
+user has answered.
+
+torch and transformers are imported only after the inputs have been validated.
 """
 import argparse
+import hashlib
 import json
+import math
 import re
+import sys
+import time
+from itertools import islice
 from pathlib import Path
-from typing import List, Dict
+from typing import Iterable, List, Dict, Optional, Tuple
+
+from coverage_planner import CoveragePlanner, QuestionAssigner
+from embedding_index import Embedder, EmbeddingIndex
+from jsonl_store import append_record, iter_records, resolve_records_path, write_records
+from speculative import SpeculativeGenerator, maybe_load_draft_model
+from worker_pool import WORKER_DTYPES
 
-import torch
-from transformers import AutoModelForCausalLM, AutoTokenizer
+DEFAULT_MODEL = "Qwen/Qwen2.5-3B-Instruct"
+DEFAULT_EXAMPLE_TOKENS = 1500
+DEFAULT_ITEMS_PER_PROMPT = 10
+QUESTIONS_FILENAME = "questions_with_perspectives.json"
+RUNS_FILENAME = "synthetic_runs.jsonl"
+GENERATION_SETTINGS = {"max_new_tokens": 1200, "temperature": 0.7, "top_p": 0.9, "do_sample": True}
+# Closest answers (besides the item's own question) recorded as an item's seeds
+SEED_COUNT = 3
+
+# Used when no question set is available: one topic per prompt, cycled
+GENERATION_TOPICS = [
+    "family loyalty and obligations to relatives",
+    "honesty, lying and keeping promises",
+    "work, money and fairness between people",
+    "helping strangers and charity",
+    "law, authority and civil disobedience",
+    "personal freedom versus the common good",
+    "friendship, trust and betrayal",
+    "meaning, mortality and how to live",
+]
 
 
 def parse_args(argv: List[str]) -> argparse.Namespace:
     parser = argparse.ArgumentParser(description="Generate synthetic Q&A")
-    parser.add_argument("--user-answers", required=True, help="Path to user_answers.json")
-    parser.add_argument("--output", required=True, help="Path to synthetic_qa.json output")
-    parser.add_argument("--model", default="Qwen/Qwen2.5-3B-Instruct", help="HF model name")
+    parser.add_argument("--user-answers", required=True, help="Path to user_answers.json or .jsonl")
+    parser.add_argument("--output", required=True, help="Path to synthetic_qa.json or .jsonl output")
+    parser.add_argument("--model", default=DEFAULT_MODEL, help="HF model name")
     parser.add_argument("--count", type=int, default=30, help="Number of synthetic items")
+    parser.add_argument("--example-tokens", type=int, default=DEFAULT_EXAMPLE_TOKENS,
+                        help="Prompt token budget for the user's answered examples")
+    parser.add_argument("--items-per-prompt", type=int, default=DEFAULT_ITEMS_PER_PROMPT)
+    parser.add_argument("--draft-model", default=None,
+                        help="Small same-tokenizer model for assisted decoding, e.g. Qwen/Qwen2.5-0.5B-Instruct")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="CPU generation processes sharing memory-mapped weights, each on its own cores")
+    parser.add_argument("--worker-dtype", default="checkpoint", choices=WORKER_DTYPES,
+                        help="Weights dtype in each worker: checkpoint shares one copy; float32 copies per "
+                             "worker but is often faster on CPU (see worker_pool.py)")
+    parser.add_argument("--questions", default=None,
+                        help="Question set to plan coverage over (default: questions_with_perspectives.json "
+                             "beside the user answers)")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Keep existing items whose seed answers are unchanged; regenerate only the rest")
     return parser.parse_args(argv)
 
 
-def extract_examples(user_answers: Dict, max_items: int = 30) -> List[Dict[str, str]]:
-    responses = user_answers.get("responses", [])
+def extract_examples(responses: Iterable[Dict], max_items: Optional[int] = None) -> List[Dict[str, str]]:
     examples = []
-    for item in responses[:max_items]:
+    for position, item in enumerate(islice(responses, max_items)):
+        question_id = item.get("question_id")
         examples.append({
+            # Same key embedding_index uses for this record
+            "id": str(question_id if question_id is not None else position),
             "question": item.get("question", ""),
             "choice": item.get("choice", ""),
             "confidence": item.get("confidence", ""),
-            "response": item.get("response", "")
+            "response": item.get("response", ""),
+            "fingerprint": answer_fingerprint(item),
         })
     return examples
 
 
-def build_prompt(examples: List[Dict[str, str]], count: int) -> str:
-    def format_example(ex: Dict[str, str]) -> str:
-        if ex.get("response"):
-            return f"- Q: {ex['question']} | Response: {ex['response']} | Confidence: {ex.get('confidence', '')}"
-        return f"- Q: {ex['question']} | Choice: {ex.get('choice', '')} | Confidence: {ex.get('confidence', '')}"
+def answer_fingerprint(answer: Dict) -> str:
+    """Short hash of the parts of an answer that shape generated items."""
+    fields = [answer.get(key, "") for key in ("question", "choice", "confidence", "response")]
+    return hashlib.sha1(json.dumps(fields, ensure_ascii=False).encode("utf-8")).hexdigest()[:12]
+
+
+def split_by_seeds(items: Iterable[Dict], fingerprints: Dict[str, str]) -> Tuple[List[Dict], int]:
+    """(items whose seed answers are all unchanged, number of items invalidated).
+
+    Items without recorded seeds predate seed tracking and are kept.
+    """
+    kept, invalidated = [], 0
+    for item in items:
+        seeds = item.get("seeds") or {}
+        if all(fingerprints.get(question_id) == fingerprint for question_id, fingerprint in seeds.items()):
+            kept.append(item)
+        else:
+            invalidated += 1
+    return kept, invalidated
+
+
+def format_example(ex: Dict[str, str]) -> str:
+    if ex.get("response"):
+        return f"- Q: {ex['question']} | Response: {ex['response']} | Confidence: {ex.get('confidence', '')}"
+    return f"- Q: {ex['question']} | Choice: {ex.get('choice', '')} | Confidence: {ex.get('confidence', '')}"
+
 
+def build_prompt(examples: List[Dict[str, str]], count: int, topic: Optional[str] = None,
+                 targets: Optional[List[str]] = None) -> str:
+    """targets, if given, are dilemmas to write one new item each about (count = len(targets))."""
     samples_text = "\n".join(
         format_example(ex) for ex in examples if ex.get("question")
     )
+    if targets:
+        topic_text = (
+            "Write one new item for each of these dilemmas, in this order, as a fresh scenario "
+            "in the same area rather than a copy:\n" + "\n".join(f"{i}. {t}" for i, t in enumerate(targets, 1)) + "\n"
+        )
+    else:
+        topic_text = f"Every new question must be about: {topic}.\n" if topic else ""
     return (
         "You are helping generate synthetic ethics Q&A for a single user. "
         "Infer the user's values from these answered questions and generate new Q&A that match their style.\n\n"
         "Answered examples:\n"
         f"{samples_text}\n\n"
+        f"{topic_text}"
         "Output ONLY a JSON array. Each item must have: instruction, response. "
         f"Generate exactly {count} items. Avoid political slogans; keep answers concise, nuanced, and in the user's voice."
     )
 
 
+def example_token_counts(examples: List[Dict[str, str]], tokenizer) -> List[int]:
+    """Prompt tokens each example line costs, newline included."""
+    lines = [format_example(ex) + "\n" for ex in examples]
+    return [len(ids) for ids in tokenizer(lines, add_special_tokens=False)["input_ids"]]
+
+
+def select_examples(examples: List[Dict[str, str]], token_counts: List[int], token_budget: int,
+                    relevance=None, similarity=None, diversity: float = 0.3,
+                    required: Iterable[int] = ()) -> List[Dict[str, str]]:
+    """Pack examples into token_budget by maximal marginal relevance.
+
+    relevance[i] is example i's cosine to the topic and similarity the example
+    x example cosine matrix. The required indices go in first; then each step
+    takes the example that best trades relevance against its closest
+    already-chosen example; examples that no longer fit are skipped. Without
+    scores the examples are packed in order.
+    """
+    chosen: List[int] = []
+    used = 0
+    for i in required:
+        if i not in chosen and used + token_counts[i] <= token_budget:
+            chosen.append(i)
+            used += token_counts[i]
+    remaining = [i for i in range(len(examples)) if i not in chosen]
+    while remaining:
+        if relevance is None:
+            best = remaining[0]
+        else:
+            def mmr(i: int) -> float:
+                redundancy = max((similarity[i][j] for j in chosen), default=0.0)
+                return (1 - diversity) * relevance[i] - diversity * redundancy
+            best = max(remaining, key=mmr)
+        remaining.remove(best)
+        if used + token_counts[best] <= token_budget:
+            chosen.append(best)
+            used += token_counts[best]
+    return [examples[i] for i in chosen]
+
+
+class ExampleSelector:
+    """Chooses the answered examples to show for a prompt, within token_budget.
+
+    The embedding model and the user-answers index are loaded only when
+    needed: to pick seeds, or when the examples do not all fit in the budget.
+    embedder is shared with the run's QuestionAssigner.
+    """
+
+    def __init__(self, examples: List[Dict[str, str]], tokenizer, token_budget: int, user_answers_path: Path,
+                 embedder: Embedder):
+        self.examples = examples
+        self.token_budget = token_budget
+        self.user_answers_path = user_answers_path
+        self.token_counts = example_token_counts(examples, tokenizer)
+        self.fits = sum(self.token_counts) <= token_budget
+        self.embedder = embedder
+        self.pool = None
+
+    def _load(self) -> None:
+        if self.pool is not None:
+            return
+        import numpy as np
+        from embedding_index import load_index
+
+        index = load_index(self.user_answers_path, "answers", self.embedder)
+        rows = {item["id"]: row for row, item in enumerate(index.items)}
+        candidates = [i for i, ex in enumerate(self.examples) if ex["id"] in rows]
+        self.vectors = np.asarray(index.vectors)[[rows[self.examples[i]["id"]] for i in candidates]]
+        self.similarity = self.vectors @ self.vectors.T
+        self.pool = [self.examples[i] for i in candidates]
+        self.pool_counts = [self.token_counts[i] for i in candidates]
+        self.pool_rows = {ex["id"]: row for row, ex in enumerate(self.pool)}
+
+    def seeds(self, topics: List[str], question_ids: Optional[List[Optional[str]]] = None) -> List[Dict[str, str]]:
+        """{question_id: fingerprint} of the answers each topic's item is derived from.
+
+        These are the user's own answer to the item's calibration question (if
+        any) plus the SEED_COUNT answers closest to the topic. select() always
+        shows them, and an item is regenerated when any of them changes.
+        """
+        self._load()
+        question_ids = question_ids or [None] * len(topics)
+        hits = EmbeddingIndex(self.vectors, self.pool).search_vectors(self.embedder.encode(topics), SEED_COUNT)
+        seeds = []
+        for question_id, topic_hits in zip(question_ids, hits):
+            rows = [self.pool_rows[question_id]] if question_id in self.pool_rows else []
+            rows += [row for row, _ in topic_hits]
+            seeds.append({self.pool[row]["id"]: self.pool[row]["fingerprint"] for row in rows})
+        return seeds
+
+    def select(self, topic_groups: List[List[str]],
+               required: Optional[List[Iterable[str]]] = None) -> List[List[Dict[str, str]]]:
+        """One example set per group; relevance is the best cosine to any topic in the group.
+
+        required[g] lists example ids that group g must show (its seeds).
+        """
+        if self.fits:
+            return [self.examples] * len(topic_groups)
+        self._load()
+        required = required or [()] * len(topic_groups)
+        sets = []
+        for topics, required_ids in zip(topic_groups, required):
+            relevance = (self.embedder.encode(topics) @ self.vectors.T).max(axis=0)
+            required_rows = [self.pool_rows[i] for i in required_ids if i in self.pool_rows]
+            sets.append(select_examples(self.pool, self.pool_counts, self.token_budget, relevance,
+                                        self.similarity, required=required_rows))
+        return sets
+
+
+class LocalRunner:
+    """In-process counterpart of worker_pool.GenerationPool."""
+
+    def __init__(self, model_name: str, tokenizer, draft_model_name: Optional[str] = None):
+        import torch
+        from transformers import AutoModelForCausalLM
+
+        model = AutoModelForCausalLM.from_pretrained(
+            model_name,
+            device_map="auto",
+            torch_dtype=torch.float16 if torch.cuda.is_available() else torch.float32,
+            trust_remote_code=True
+        )
+        self.tokenizer = tokenizer
+        self.generator = SpeculativeGenerator(model, maybe_load_draft_model(draft_model_name, model, tokenizer))
+        self.stats = self.generator.stats
+
+    def __enter__(self) -> "LocalRunner":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        pass
+
+    def run(self, prompts: List[str]) -> List[Tuple[List[Dict[str, str]], Dict[str, int]]]:
+        return [generate_items(self.generator, self.tokenizer, prompt) for prompt in prompts]
+
+
 def extract_json_array(text: str) -> List[Dict]:
     match = re.search(r"\[[\s\S]*\]", text)
     if not match:
@@ -60,26 +284,21 @@ def extract_json_array(text: str) -> List[Dict]:
     return json.loads(match.group(0))
 
 
-def main() -> None:
-    args = parse_args(__import__("sys").argv[1:])
-    user_answers_path = Path(args.user_answers)
-    output_path = Path(args.output)
-
+def load_examples(user_answers_path: Path) -> List[Dict[str, str]]:
     if not user_answers_path.exists():
         raise FileNotFoundError(f"user_answers.json not found: {user_answers_path}")
 
-    user_answers = json.loads(user_answers_path.read_text(encoding="utf-8"))
-    examples = extract_examples(user_answers)
-    prompt = build_prompt(examples, args.count)
+    examples = [ex for ex in extract_examples(iter_records(user_answers_path, key="responses")) if ex.get("question")]
+    if not examples:
+        raise ValueError(f"No answered questions found in {user_answers_path}")
+    return examples
 
-    tokenizer = AutoTokenizer.from_pretrained(args.model, trust_remote_code=True)
-    model = AutoModelForCausalLM.from_pretrained(
-        args.model,
-        device_map="auto",
-        torch_dtype=torch.float16 if torch.cuda.is_available() else torch.float32,
-        trust_remote_code=True
-    )
 
+def generate_items(generator, tokenizer, prompt: str) -> Tuple[List[Dict[str, str]], Dict[str, int]]:
+    """One generation call through a SpeculativeGenerator.
+
+    Returns the well-formed items and counters for RunAccounting.
+    """
     messages = [
         {"role": "system", "content": "You output only strict JSON arrays."},
         {"role": "user", "content": prompt}
@@ -90,29 +309,267 @@ def main() -> None:
     except Exception:
         text = messages[-1]["content"]
 
-    inputs = tokenizer([text], return_tensors="pt").to(model.device)
-    outputs = model.generate(
-        **inputs,
-        max_new_tokens=1200,
-        temperature=0.7,
-        top_p=0.9,
-        do_sample=True
-    )
-    decoded = tokenizer.decode(outputs[0], skip_special_tokens=True)
+    inputs = tokenizer([text], return_tensors="pt").to(generator.model.device)
+    outputs = generator.generate(inputs, **GENERATION_SETTINGS)
+    # Only the new tokens: the prompt's own examples must not be parsed as output
+    new_tokens = outputs[0][inputs["input_ids"].shape[1]:]
+    decoded = tokenizer.decode(new_tokens, skip_special_tokens=True)
 
-    items = extract_json_array(decoded)
+    try:
+        items = extract_json_array(decoded)
+    except ValueError as exc:
+        print(f"Skipping unparseable output: {exc}")
+        return [], {"parse_failures": 1, "raw_items": 0, "invalid_items": 0}
     cleaned = []
     for item in items:
+        if not isinstance(item, dict):
+            continue
         instruction = str(item.get("instruction", "")).strip()
         response = str(item.get("response", "")).strip()
         if instruction and response:
             cleaned.append({"instruction": instruction, "response": response})
+    return cleaned, {"parse_failures": 0, "raw_items": len(items), "invalid_items": len(items) - len(cleaned)}
+
+
+def normalize_instruction(text: str) -> str:
+    return " ".join(re.sub(r"[^\w\s]", " ", text.lower()).split())
+
+
+class RunAccounting:
+    """Yield and cost counters for one generation run, appended to synthetic_runs.jsonl."""
+
+    def __init__(self, existing: Iterable[Dict] = ()):
+        self.start = time.perf_counter()
+        self.prompts = 0
+        self.parse_failures = 0
+        self.raw_items = 0
+        self.invalid_items = 0
+        self.duplicates = 0
+        self.accepted = 0
+        self.seen = {normalize_instruction(item.get("instruction", "")) for item in existing}
 
-    if not cleaned:
+    def add(self, counts: Dict[str, int]) -> None:
+        self.prompts += 1
+        self.parse_failures += counts["parse_failures"]
+        self.raw_items += counts["raw_items"]
+        self.invalid_items += counts["invalid_items"]
+
+    def accept(self, item: Dict[str, str]) -> bool:
+        """False (and counted) if an item with the same instruction was already accepted or kept."""
+        key = normalize_instruction(item["instruction"])
+        if key in self.seen:
+            self.duplicates += 1
+            return False
+        self.seen.add(key)
+        self.accepted += 1
+        return True
+
+    def record(self, stats, **context) -> Dict:
+        wall = time.perf_counter() - self.start
+        return {
+            "time": time.time(),
+            **context,
+            **GENERATION_SETTINGS,
+            "prompts": self.prompts,
+            "prompt_tokens": stats.prompt_tokens,
+            "generated_tokens": stats.new_tokens,
+            "wall_seconds": round(wall, 1),
+            "tokens_per_second": round(stats.tokens_per_second, 2),
+            "valid_items": self.accepted,
+            "valid_per_1k_generated_tokens": (
+                round(1000 * self.accepted / stats.new_tokens, 2) if stats.new_tokens else 0.0
+            ),
+            "parse_failure_rate": round(self.parse_failures / self.prompts, 3) if self.prompts else 0.0,
+            "invalid_items": self.invalid_items,
+            "duplicates_dropped": self.duplicates,
+            "seconds_per_valid_item": round(wall / self.accepted, 2) if self.accepted else None,
+            "decoding": stats.as_dict(),
+        }
+
+
+def generate_by_topic(runner, selector: ExampleSelector, accounting: RunAccounting,
+                      count: int, items_per_prompt: int) -> List[Dict[str, str]]:
+    """Fallback without a question set: cycle through GENERATION_TOPICS."""
+    prompt_sizes = [min(items_per_prompt, count - start) for start in range(0, count, items_per_prompt)]
+    topics = [GENERATION_TOPICS[i % len(GENERATION_TOPICS)] for i in range(len(prompt_sizes))]
+    seeds = selector.seeds(topics)
+    example_sets = selector.select([[topic] for topic in topics], required=seeds)
+    prompts = [
+        build_prompt(topic_examples, size, topic)
+        for size, topic, topic_examples in zip(prompt_sizes, topics, example_sets)
+    ]
+    cleaned = []
+    for topic, size, topic_seeds, (items, counts) in zip(topics, prompt_sizes, seeds, runner.run(prompts)):
+        accounting.add(counts)
+        items = [item for item in items[:size] if accounting.accept(item)]
+        print(f"{topic}: {len(items)} item(s)", flush=True)
+        cleaned.extend({**item, "seeds": topic_seeds} for item in items)
+    return cleaned
+
+
+def generate_by_coverage(runner, selector: ExampleSelector, accounting: RunAccounting, planner: CoveragePlanner,
+                         assigner: QuestionAssigner, items_per_prompt: int,
+                         prompts_per_round: int) -> List[Dict[str, str]]:
+    """Aim each round of prompts at the least-covered calibration questions until targets are met."""
+    max_rounds = 3 * math.ceil(planner.total / (items_per_prompt * prompts_per_round)) + 1
+    cleaned = []
+    for round_number in range(1, max_rounds + 1):
+        if planner.done:
+            break
+        wanted = min(items_per_prompt * prompts_per_round, planner.needed())
+        targets = planner.next_targets(wanted)
+        target_seeds = selector.seeds([q["question"] for q in targets], [q["id"] for q in targets])
+        groups = [targets[i:i + items_per_prompt] for i in range(0, len(targets), items_per_prompt)]
+        group_seeds = [target_seeds[i:i + items_per_prompt] for i in range(0, len(targets), items_per_prompt)]
+        example_sets = selector.select(
+            [[q["question"] for q in group] for group in groups],
+            required=[[qid for seeds in item_seeds for qid in seeds] for item_seeds in group_seeds],
+        )
+        prompts = [
+            build_prompt(group_examples, len(group), targets=[q["question"] for q in group])
+            for group, group_examples in zip(groups, example_sets)
+        ]
+
+        accepted = 0
+        for group, item_seeds, (items, counts) in zip(groups, group_seeds, runner.run(prompts)):
+            accounting.add(counts)
+            # Item i was requested for group[i]; that is the fallback if it drifted off-topic
+            requested = [
+                (item, group[i]["id"], item_seeds[i])
+                for i, item in enumerate(items[:len(group)]) if accounting.accept(item)
+            ]
+            if not requested:
+                continue
+            question_ids = assigner.assign(
+                [item["instruction"] for item, _, _ in requested], [qid for _, qid, _ in requested]
+            )
+            for (item, requested_id, seeds), question_id in zip(requested, question_ids):
+                if planner.done:
+                    break
+                question_id = planner.credit(question_id, requested_id)
+                planner.record(question_id)
+                cleaned.append({**item, "question_id": question_id, "phase": planner.phase_of(question_id),
+                                "seeds": seeds})
+                accepted += 1
+        print(f"Round {round_number}: {accepted}/{len(targets)} item(s) accepted, "
+              f"{planner.accepted}/{planner.total} total", flush=True)
+    else:
+        if not planner.done:
+            print(f"Stopped after {max_rounds} rounds with coverage targets unmet")
+    print("Coverage:\n" + planner.report())
+    return cleaned
+
+
+def generate(user_answers_path: Path, output_path: Path,
+             model_name: str = DEFAULT_MODEL, count: int = 30,
+             example_tokens: int = DEFAULT_EXAMPLE_TOKENS,
+             items_per_prompt: int = DEFAULT_ITEMS_PER_PROMPT,
+             draft_model_name: Optional[str] = None, workers: int = 1,
+             questions_path: Optional[Path] = None, incremental: bool = False,
+             worker_dtype: str = "checkpoint") -> int:
+    """Generate synthetic items from a user's answers; returns the number written.
+
+    With a question set (questions_path, default: questions_with_perspectives.json
+    beside the answers) generation is steered by a CoveragePlanner: every
+    prompt asks for one item on each of up to items_per_prompt under-covered
+    calibration questions, and rounds continue until each phase has its share
+    of count. Without one, prompts cycle through GENERATION_TOPICS.
+
+    Each prompt shows the user's answers most relevant to its questions within
+    example_tokens prompt tokens. draft_model_name enables assisted decoding
+    with that model (see speculative.py). workers > 1 spreads the prompts
+    over that many CPU processes sharing memory-mapped weights, cast to
+    worker_dtype unless that is "checkpoint" (see worker_pool.py).
+
+    Every item records the fingerprints of the answers it was derived from
+    ("seeds"). With incremental, existing items in output_path whose seeds
+    are unchanged are kept and only the missing coverage is regenerated.
+    """
+    user_answers_path = resolve_records_path(Path(user_answers_path))
+    output_path = Path(output_path)
+    examples = load_examples(user_answers_path)
+    questions_path = Path(questions_path) if questions_path else user_answers_path.with_name(QUESTIONS_FILENAME)
+    planner = CoveragePlanner.from_file(questions_path, count) if questions_path.is_file() else None
+    # One embedding model for the run, loaded on first use by whichever needs it
+    embedder = Embedder()
+    assigner = None
+
+    kept: List[Dict] = []
+    if incremental and output_path.is_file():
+        kept, invalidated = split_by_seeds(iter_records(output_path), {ex["id"]: ex["fingerprint"] for ex in examples})
+        kept = kept[:count]
+        print(f"Keeping {len(kept)} existing item(s); {invalidated} derived from changed or removed answers")
+        if planner is not None:
+            # Items from before coverage planning have no question_id: match them to their
+            # nearest question, or count them toward the total only
+            legacy = [item for item in kept if item.get("question_id") not in planner.by_id]
+            if legacy:
+                assigner = QuestionAssigner(questions_path, embedder)
+                assigned = assigner.assign(
+                    [str(item.get("instruction", "")) for item in legacy], [None] * len(legacy)
+                )
+                for item, question_id in zip(legacy, assigned):
+                    if question_id is not None:
+                        item.update(question_id=question_id, phase=planner.phase_of(question_id))
+            for item in kept:
+                if item.get("question_id") in planner.by_id:
+                    planner.record(item["question_id"])
+                else:
+                    planner.record_unassigned()
+    missing = count - len(kept)
+    if (planner.done if planner is not None else missing <= 0):
+        print("Nothing to regenerate")
+        return write_records(output_path, kept)
+
+    import torch
+    from transformers import AutoTokenizer
+
+    tokenizer = AutoTokenizer.from_pretrained(model_name, trust_remote_code=True)
+    selector = ExampleSelector(examples, tokenizer, example_tokens, user_answers_path, embedder)
+
+    if workers > 1 and torch.cuda.is_available():
+        print("--workers is for CPU-only generation; using one process on the GPU")
+        workers = 1
+    if workers > 1:
+        from worker_pool import GenerationPool
+        runner = GenerationPool(model_name, workers, draft_model_name, worker_dtype)
+    else:
+        runner = LocalRunner(model_name, tokenizer, draft_model_name)
+
+    accounting = RunAccounting(kept)
+    with runner:
+        if planner is None:
+            print(f"No question set at {questions_path}; generating by fixed topics")
+            cleaned = generate_by_topic(runner, selector, accounting, missing, items_per_prompt)
+        else:
+            assigner = assigner or QuestionAssigner(questions_path, embedder)
+            cleaned = generate_by_coverage(runner, selector, accounting, planner, assigner,
+                                           items_per_prompt, prompts_per_round=max(workers, 1))
+    print(f"Decoding: {runner.stats.summary()}")
+    if workers > 1:
+        print(f"Pool throughput: {runner.tokens_per_second:.1f} tok/s")
+
+    run = accounting.record(
+        runner.stats, model=model_name, draft_model=draft_model_name, workers=workers,
+        worker_dtype=worker_dtype if workers > 1 else None,
+        requested=count, kept=len(kept), incremental=incremental, output=str(output_path),
+    )
+    append_record(output_path.with_name(RUNS_FILENAME), run)
+    print(f"Run: {run['valid_items']} valid items, {run['valid_per_1k_generated_tokens']} per 1k generated tokens, "
+          f"{run['parse_failure_rate']:.0%} parse failures, {run['duplicates_dropped']} duplicates dropped, "
+          f"{run['seconds_per_valid_item']}s per valid item")
+
+    if not cleaned and not kept:
         raise ValueError("No valid synthetic items generated")
 
-    output_path.parent.mkdir(parents=True, exist_ok=True)
-    output_path.write_text(json.dumps(cleaned, indent=2, ensure_ascii=False), encoding="utf-8")
+    return write_records(output_path, (kept + cleaned)[:count])
+
+
+def main() -> None:
+    args = parse_args(sys.argv[1:])
+    generate(args.user_answers, args.output, args.model, args.count,
+             args.example_tokens, args.items_per_prompt, args.draft_model, args.workers,
+             Path(args.questions) if args.questions else None, args.incremental, args.worker_dtype)
 
 
 if __name__ == "__main__":
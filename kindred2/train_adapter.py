@@ -1,24 +1,30 @@
 #!/usr/bin/env python3
 """
 Train a LoRA adapter from synthetic Q&A within a selected model folder.
+
+torch, transformers, peft, datasets and pyarrow are imported only after the
+arguments and input files have been validated.
 """
 import argparse
+import hashlib
 import json
+import math
 import os
 import shutil
+import sys
+import time
 from pathlib import Path
-from typing import List
+from typing import TYPE_CHECKING, Dict, Iterator, List, Optional
+
+from jsonl_store import iter_records, resolve_records_path
+from loss_pruning import PRUNE_MODES, RUNS_FILENAME as PRUNING_RUNS_FILENAME
+from model_store import DEFAULT_BASE_MODEL
+from quality_filter import current_filtered
+from training_metrics import METRICS_FILENAME
+from weights_loader import LOAD_MODES
 
-import torch
-from datasets import Dataset
-from transformers import (
-    AutoModelForCausalLM,
-    AutoTokenizer,
-    TrainingArguments,
-    Trainer,
-    DataCollatorForLanguageModeling,
-)
-from peft import LoraConfig, get_peft_model, TaskType
+if TYPE_CHECKING:
+    from datasets import Dataset
 
 
 def parse_args(argv: List[str]) -> argparse.Namespace:
@@ -26,57 +32,165 @@ def parse_args(argv: List[str]) -> argparse.Namespace:
     parser.add_argument("--model-folder", required=True, help="Path to ethical model folder")
     parser.add_argument(
         "--base-model",
-        default="D:/_GITN/kindred_spirit/models/Huihui-Qwen3-VL-8B-Instruct-abliterated",
+        default=DEFAULT_BASE_MODEL,
         help="HF base model or local path"
     )
     parser.add_argument("--output-dir", default=None, help="Output directory for adapter")
     parser.add_argument("--epochs", type=int, default=1)
     parser.add_argument("--batch-size", type=int, default=2)
     parser.add_argument("--max-length", type=int, default=2048)
+    parser.add_argument(
+        "--metrics-file",
+        default=None,
+        help=f"JSONL training metrics output (default: <model-folder>/{METRICS_FILENAME})"
+    )
+    parser.add_argument(
+        "--dataset-cache",
+        default=None,
+        help="Directory for the memory-mapped Arrow dataset (default: <model-folder>/.dataset_cache)"
+    )
+    parser.add_argument(
+        "--load-mode",
+        default="eager",
+        choices=LOAD_MODES,
+        help="eager: from_pretrained; lazy: memory-mapped shards, faster startup only "
+             "(Trainer places the whole model on its device)"
+    )
+    parser.add_argument(
+        "--unfiltered",
+        action="store_true",
+        help="Train on synthetic_qa even if a current quality-filtered subset exists"
+    )
+    parser.add_argument(
+        "--prune",
+        default="off",
+        choices=PRUNE_MODES,
+        help="After the first epoch, skip or down-weight examples whose loss is already low (see loss_pruning.py)"
+    )
+    parser.add_argument("--prune-keep", type=float, default=0.5,
+                        help="Share of hardest examples trained at full weight after the first epoch")
+    parser.add_argument(
+        "--agreement-steps",
+        type=int,
+        default=None,
+        help="Score agreement with user_answers every N steps and stop when it plateaus "
+             "(default: once per epoch or pruned pass; 0: off)"
+    )
+    parser.add_argument("--agreement-patience", type=int, default=3,
+                        help="Measurements without improvement before stopping")
     return parser.parse_args(argv)
 
 
-def load_synthetic_data(model_folder: Path) -> Dataset:
-    synthetic_path = model_folder / "synthetic_qa.json"
-    if not synthetic_path.exists():
-        raise FileNotFoundError(f"synthetic_qa.json not found: {synthetic_path}")
+# Bump when the text format below changes so cached Arrow files are rebuilt
+ARROW_CACHE_VERSION = 1
+ARROW_BATCH_ROWS = 1000
+
 
-    data = json.loads(synthetic_path.read_text(encoding="utf-8"))
-    formatted = []
-    for item in data:
+def iter_synthetic_texts(synthetic_path: Path) -> Iterator[str]:
+    for item in iter_records(synthetic_path):
         instruction = item.get("instruction", "").strip()
         response = item.get("response", "").strip()
         if not instruction or not response:
             continue
-        text = (
+        yield (
             f"<|im_start|>user\n{instruction}<|im_end|>\n"
             f"<|im_start|>assistant\n{response}<|im_end|>"
         )
-        formatted.append({"text": text})
 
-    if not formatted:
-        raise ValueError("No usable synthetic items found")
 
-    return Dataset.from_list(formatted)
+def write_arrow_texts(texts: Iterator[str], arrow_path: Path) -> int:
+    """Stream texts into an Arrow IPC file in fixed-size batches; returns the row count."""
+    import pyarrow as pa
+
+    schema = pa.schema([("text", pa.string())])
+    tmp_path = arrow_path.with_name(arrow_path.name + ".tmp")
+    rows = 0
+    batch: List[str] = []
+    with pa.OSFile(str(tmp_path), "wb") as sink, pa.ipc.new_stream(sink, schema) as writer:
+        for text in texts:
+            batch.append(text)
+            if len(batch) >= ARROW_BATCH_ROWS:
+                writer.write_batch(pa.record_batch([pa.array(batch, pa.string())], schema=schema))
+                rows += len(batch)
+                batch = []
+        if batch:
+            writer.write_batch(pa.record_batch([pa.array(batch, pa.string())], schema=schema))
+            rows += len(batch)
+    os.replace(tmp_path, arrow_path)
+    return rows
+
+
+def find_synthetic_data(model_folder: Path, use_filtered: bool = True) -> Path:
+    """synthetic_qa, or with use_filtered its quality-filtered subset if that was scored from the current set."""
+    synthetic_path = resolve_records_path(model_folder / "synthetic_qa.json")
+    if not synthetic_path.exists():
+        raise FileNotFoundError(f"synthetic_qa.json/.jsonl not found: {synthetic_path}")
+    if use_filtered:
+        return current_filtered(model_folder, synthetic_path) or synthetic_path
+    return synthetic_path
+
 
+def load_synthetic_data(model_folder: Path, cache_dir: Optional[Path] = None,
+                        use_filtered: bool = True) -> "Dataset":
+    """Memory-map the synthetic set from an Arrow file, converting the source once.
 
-def setup_model_and_tokenizer(base_model: str):
+    The Arrow file is keyed on the source's name, size and mtime, so it is rebuilt
+    only when that source changes. Each source (synthetic_qa and its filtered
+    subset) has its own subdirectory, so switching between them keeps both.
+    Neither step holds the whole set in RAM.
+    """
+    from datasets import Dataset
+
+    synthetic_path = find_synthetic_data(model_folder, use_filtered)
+    print(f"Training on {synthetic_path.name}", flush=True)
+    cache_root = cache_dir or model_folder / ".dataset_cache"
+    # The tokenized map caches land beside the Arrow file, inside this directory too
+    cache_dir = cache_root / synthetic_path.stem
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    stat = synthetic_path.stat()
+    key = f"{ARROW_CACHE_VERSION}:{synthetic_path.name}:{stat.st_size}:{stat.st_mtime_ns}"
+    digest = hashlib.sha1(key.encode("utf-8")).hexdigest()[:16]
+    arrow_path = cache_dir / f"{synthetic_path.stem}-{digest}.arrow"
+    manifest_path = cache_dir / "manifest.json"
+
+    if not arrow_path.exists():
+        # Drop this source's older Arrow files and their tokenized map caches
+        for stale in cache_dir.glob("*.arrow"):
+            stale.unlink()
+        # Files from the earlier flat layout, shared by every source
+        for stale in cache_root.glob("*.arrow"):
+            stale.unlink()
+        rows = write_arrow_texts(iter_synthetic_texts(synthetic_path), arrow_path)
+        manifest_path.write_text(
+            json.dumps({"source": str(synthetic_path), "key": key, "rows": rows}, indent=2),
+            encoding="utf-8"
+        )
+
+    dataset = Dataset.from_file(str(arrow_path))
+    if len(dataset) == 0:
+        raise ValueError("No usable synthetic items found")
+    return dataset
+
+
+def setup_model_and_tokenizer(base_model: str, load_mode: str = "eager"):
     os.environ["KMP_DUPLICATE_LIB_OK"] = "TRUE"
+    import torch
+    from transformers import AutoTokenizer
+    from weights_loader import load_causal_lm
+
     tokenizer = AutoTokenizer.from_pretrained(base_model, trust_remote_code=True)
     tokenizer.pad_token = tokenizer.eos_token
     tokenizer.padding_side = "right"
 
-    model = AutoModelForCausalLM.from_pretrained(
-        base_model,
-        torch_dtype=torch.float16 if torch.cuda.is_available() else torch.float32,
-        device_map="auto",
-        trust_remote_code=True
-    )
+    # Explicit so lazy and eager loads train in the same dtype (lazy keeps the checkpoint dtype otherwise)
+    model = load_causal_lm(base_model, load_mode, torch.float16 if torch.cuda.is_available() else torch.float32)
     model.gradient_checkpointing_enable()
     return model, tokenizer
 
 
 def setup_lora(model):
+    from peft import LoraConfig, get_peft_model, TaskType
+
     lora_config = LoraConfig(
         task_type=TaskType.CAUSAL_LM,
         r=32,
@@ -99,43 +213,103 @@ def tokenize_function(examples, tokenizer, max_length: int):
     )
 
 
-def main() -> None:
-    args = parse_args(__import__("sys").argv[1:])
-    model_folder = Path(args.model_folder)
+def train(model_folder: Path, base_model: str = DEFAULT_BASE_MODEL, output_dir: Optional[Path] = None,
+          epochs: int = 1, batch_size: int = 2, max_length: int = 2048,
+          metrics_path: Optional[Path] = None, dataset_cache: Optional[Path] = None,
+          timings: Optional[Dict[str, float]] = None, load_mode: str = "eager",
+          preloaded: Optional[tuple] = None, prune: str = "off", prune_keep: float = 0.5,
+          agreement_steps: Optional[int] = None, agreement_patience: int = 3, use_filtered: bool = True):
+    """Train and save the adapter; returns the PEFT model and tokenizer still in memory.
+
+    If timings is given, the base-model load time is stored under "base_load".
+    preloaded is a (model, tokenizer) pair from setup_model_and_tokenizer to
+    train on instead of loading base_model again. With prune other than "off"
+    the run is also recorded in pruning_runs.jsonl in the model folder. When
+    the folder has user answers, agreement with them is scored every
+    agreement_steps optimizer steps (None: once per epoch, or per pruned pass
+    when pruning; 0: never) and training stops once it plateaus; epochs is
+    then a ceiling. use_filtered=False trains on synthetic_qa even when a
+    current filtered subset exists.
+    """
+    model_folder = Path(model_folder)
     if not model_folder.exists():
         raise FileNotFoundError(f"Model folder not found: {model_folder}")
+    find_synthetic_data(model_folder, use_filtered)
+
+    output_dir = Path(output_dir) if output_dir else model_folder / "finetuned_adapter"
+    metrics_path = Path(metrics_path) if metrics_path else model_folder / METRICS_FILENAME
 
-    output_dir = Path(args.output_dir) if args.output_dir else model_folder / "finetuned_adapter"
+    import torch
+    from transformers import TrainingArguments, Trainer, DataCollatorForLanguageModeling
+    from agreement import AgreementScorer
+    from training_callbacks import AgreementEarlyStoppingCallback, LossPruningTrainer, MetricsCallback
 
-    dataset = load_synthetic_data(model_folder)
-    model, tokenizer = setup_model_and_tokenizer(args.base_model)
+    dataset = load_synthetic_data(model_folder, dataset_cache, use_filtered)
+    if preloaded is not None:
+        model, tokenizer = preloaded
+    else:
+        load_start = time.perf_counter()
+        model, tokenizer = setup_model_and_tokenizer(base_model, load_mode)
+        if timings is not None:
+            timings["base_load"] = time.perf_counter() - load_start
     model = setup_lora(model)
 
-    tokenized = dataset.map(lambda x: tokenize_function(x, tokenizer, args.max_length), batched=True)
+    tokenized = dataset.map(lambda x: tokenize_function(x, tokenizer, max_length), batched=True)
+    pruning = None
+    if prune != "off":
+        from loss_pruning import INDEX_COLUMN, LossPruning
+
+        tokenized = tokenized.remove_columns(["text"])
+        tokenized = tokenized.add_column(INDEX_COLUMN, list(range(len(tokenized))))
+        pruning = LossPruning(len(tokenized), epochs, prune, prune_keep)
 
+    gradient_accumulation = 2
     training_args = TrainingArguments(
         output_dir=str(output_dir),
-        num_train_epochs=args.epochs,
-        per_device_train_batch_size=args.batch_size,
-        gradient_accumulation_steps=2,
+        # The pruning sampler runs every epoch's pass inside one Trainer epoch
+        num_train_epochs=1 if pruning else epochs,
+        per_device_train_batch_size=batch_size,
+        gradient_accumulation_steps=gradient_accumulation,
         learning_rate=1e-5,
         weight_decay=0.01,
         logging_steps=10,
         save_steps=50,
         fp16=torch.cuda.is_available(),
         report_to="none",
+        remove_unused_columns=pruning is None,
     )
 
     data_collator = DataCollatorForLanguageModeling(tokenizer=tokenizer, mlm=False)
 
-    trainer = Trainer(
+    user_answers = resolve_records_path(model_folder / "user_answers.json")
+    questions = model_folder / "questions_with_perspectives.json"
+    scorer = None
+    if user_answers.is_file() and questions.is_file():
+        scorer = AgreementScorer(tokenizer, user_answers, questions, batch_size=batch_size)
+    callbacks = [MetricsCallback(metrics_path, padded_tokens_per_sample=max_length)]
+    if agreement_steps is None:
+        # Once per epoch; under pruning, once per pass at the pruned passes' size
+        pass_examples = pruning.pass_size(1) if pruning else len(tokenized)
+        agreement_steps = max(1, math.ceil(math.ceil(pass_examples / batch_size) / gradient_accumulation))
+    if scorer is not None and len(scorer) and agreement_steps > 0:
+        callbacks.append(AgreementEarlyStoppingCallback(
+            scorer, every_steps=agreement_steps, patience=agreement_patience, metrics_path=metrics_path
+        ))
+
+    trainer_kwargs = dict(
         model=model,
         args=training_args,
         train_dataset=tokenized,
         data_collator=data_collator,
+        callbacks=callbacks,
     )
+    trainer = LossPruningTrainer(**trainer_kwargs, pruning=pruning) if pruning else Trainer(**trainer_kwargs)
 
     trainer.train()
+    if pruning:
+        from loss_pruning import report_pruning
+
+        report_pruning(trainer, model_folder / PRUNING_RUNS_FILENAME, scorer, base_model=base_model)
     output_dir.mkdir(parents=True, exist_ok=True)
     model.save_pretrained(output_dir)
     tokenizer.save_pretrained(output_dir)
@@ -145,6 +319,30 @@ def main() -> None:
         target_file = model_folder / "finetuned_model.safetensors"
         shutil.copy2(adapter_file, target_file)
 
+    # convert_to_gguf.py merges onto whatever base this records
+    (model_folder / "base_model.txt").write_text(base_model, encoding="utf-8")
+    return model, tokenizer
+
+
+def main() -> None:
+    args = parse_args(sys.argv[1:])
+    train(
+        Path(args.model_folder),
+        base_model=args.base_model,
+        output_dir=Path(args.output_dir) if args.output_dir else None,
+        epochs=args.epochs,
+        batch_size=args.batch_size,
+        max_length=args.max_length,
+        metrics_path=Path(args.metrics_file) if args.metrics_file else None,
+        dataset_cache=Path(args.dataset_cache) if args.dataset_cache else None,
+        load_mode=args.load_mode,
+        prune=args.prune,
+        prune_keep=args.prune_keep,
+        agreement_steps=args.agreement_steps,
+        agreement_patience=args.agreement_patience,
+        use_filtered=not args.unfiltered,
+    )
+
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+Trainer callbacks and the loss-pruning Trainer shared by the Kindred trainers.
+"""
+import time
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+import torch
+from transformers import Trainer, TrainerCallback
+
+from loss_pruning import INDEX_COLUMN, LossPruning, per_example_losses
+from training_metrics import MetricsWriter
+
+
+class MetricsCallback(TrainerCallback):
+    """Streams step, loss, LR, throughput and peak memory to a JSONL file."""
+
+    def __init__(self, metrics_path: Path, padded_tokens_per_sample: Optional[int] = None):
+        self.writer = MetricsWriter(metrics_path, padded_tokens_per_sample)
+
+    def on_train_begin(self, args, state, control, **kwargs):
+        if not state.is_world_process_zero:
+            return
+        samples_per_step = (
+            args.per_device_train_batch_size
+            * args.gradient_accumulation_steps
+            * max(1, args.world_size)
+        )
+        self.writer.start(
+            samples_per_step,
+            max_steps=state.max_steps,
+            num_train_epochs=args.num_train_epochs,
+            learning_rate=args.learning_rate,
+        )
+
+    def on_step_end(self, args, state, control, **kwargs):
+        if state.is_world_process_zero:
+            self.writer.step_end()
+
+    def on_log(self, args, state, control, logs=None, **kwargs):
+        if state.is_world_process_zero and logs:
+            self.writer.log(state.global_step, logs)
+
+
+class AgreementEarlyStoppingCallback(TrainerCallback):
+    """Stops training once agreement with the user's A/B answers plateaus.
+
+    The model is scored with an agreement.AgreementScorer before training and
+    every every_steps optimizer steps. Training stops after patience
+    measurements in a row fail to beat the best by min_delta. Measurements are
+    appended to the metrics file (event "agreement"), and on a step that is
+    also evaluated they are added to the eval metrics as eval_agreement and
+    eval_weighted_agreement, so metric_for_best_model can select on them.
+    Place it after MetricsCallback, which starts the metrics file.
+
+    When the run is too short to take patience measurements before its last
+    step, the callback cannot stop anything and measures nothing, except at
+    evaluations, where metric_for_best_model may still need the score.
+    """
+
+    def __init__(self, scorer, every_steps: int = 50, patience: int = 3, min_delta: float = 0.01,
+                 metric: str = "weighted_agreement", metrics_path: Optional[Path] = None):
+        self.scorer = scorer
+        self.every_steps = max(1, every_steps)
+        self.patience = patience
+        self.min_delta = min_delta
+        self.metric = metric
+        self.writer = MetricsWriter(metrics_path) if metrics_path else None
+        self.best: Optional[float] = None
+        self.best_step = 0
+        self.stale = 0
+        self.latest: Optional[Tuple[int, Dict]] = None
+        self.active = True
+
+    def _measure(self, state, model) -> Dict:
+        scores = self.scorer.score(model)
+        self.latest = (state.global_step, scores)
+        value = scores[self.metric]
+        if self.best is None or value > self.best + self.min_delta:
+            self.best, self.best_step, self.stale = value, state.global_step, 0
+        else:
+            self.stale += 1
+        if state.is_world_process_zero:
+            print(f"[agreement] step {state.global_step}: {scores['agreement']:.0%} "
+                  f"({scores['weighted_agreement']:.0%} weighted) of {scores['answers']} answers; "
+                  f"best {self.best:.0%} at step {self.best_step}", flush=True)
+            if self.writer:
+                self.writer.write({"event": "agreement", "step": state.global_step, **scores, "time": time.time()})
+        return scores
+
+    def on_train_begin(self, args, state, control, model=None, **kwargs):
+        self.best, self.best_step, self.stale, self.latest = None, 0, 0, None
+        # Measurements strictly before the last step are the only ones that can stop training
+        self.active = (state.max_steps - 1) // self.every_steps >= self.patience
+        if not self.active:
+            if state.is_world_process_zero:
+                print(f"[agreement] {state.max_steps} steps is too short to stop early "
+                      f"(every {self.every_steps} steps, patience {self.patience}); not measuring", flush=True)
+            return
+        self._measure(state, model)
+
+    def on_step_end(self, args, state, control, model=None, **kwargs):
+        if not self.active or state.global_step % self.every_steps:
+            return
+        self._measure(state, model)
+        if self.stale >= self.patience:
+            if state.is_world_process_zero:
+                print(f"[agreement] no gain over {self.best:.0%} in {self.stale} measurements; stopping", flush=True)
+            control.should_training_stop = True
+
+    def on_evaluate(self, args, state, control, metrics=None, model=None, **kwargs):
+        if metrics is None:
+            return
+        if not self.latest or self.latest[0] != state.global_step:
+            self._measure(state, model)
+        scores = self.latest[1]
+        metrics["eval_agreement"] = scores["agreement"]
+        metrics["eval_weighted_agreement"] = scores["weighted_agreement"]
+
+
+class LossPruningTrainer(Trainer):
+    """Trainer that records every example's loss and prunes later passes by it.
+
+    The train dataset needs an INDEX_COLUMN column and remove_unused_columns
+    off; run with num_train_epochs=1, since pruning.epochs sets the passes.
+    """
+
+    def __init__(self, *args, pruning: LossPruning, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.pruning = pruning
+        # compute_loss returns a batch mean, so Trainer must scale it for gradient accumulation
+        self.model_accepts_loss_kwargs = False
+
+    def _get_train_sampler(self, *args, **kwargs):
+        return self.pruning
+
+    def compute_loss(self, model, inputs, return_outputs=False, **kwargs):
+        indices = inputs.pop(INDEX_COLUMN, None)
+        if indices is None or not model.training:
+            return super().compute_loss(model, inputs, return_outputs=return_outputs, **kwargs)
+        indices = indices.tolist()
+        labels = inputs.pop("labels")
+        outputs = model(**inputs)
+        losses = per_example_losses(outputs.logits, labels)
+        weights = torch.tensor(self.pruning.weights(indices), dtype=losses.dtype, device=losses.device)
+        self.pruning.record(indices, losses.detach().tolist())
+        loss = (losses * weights).mean()
+        return (loss, outputs) if return_outputs else loss
+
+    def full_pass_loss(self) -> float:
+        """Mean per-example loss over the whole train set, without gradients."""
+        model = self.model
+        was_training = model.training
+        model.eval()
+        total, count = 0.0, 0
+        with torch.no_grad(), self.compute_loss_context_manager():
+            for batch in self.get_eval_dataloader(self.train_dataset):
+                batch = self._prepare_inputs(batch)
+                batch.pop(INDEX_COLUMN, None)
+                labels = batch.pop("labels")
+                losses = per_example_losses(model(**batch).logits, labels)
+                total += float(losses.sum())
+                count += len(losses)
+        if was_training:
+            model.train()
+        return total / count if count else 0.0
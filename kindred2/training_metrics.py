@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+Structured training metrics: a JSONL stream of step, loss, learning rate,
+throughput and peak memory, plus helpers to read and summarise it.
+
+This module has no heavy dependencies so that monitors (auto_train.py,
+kindred2_app.py) can read metrics without importing torch or transformers.
+The Trainer-facing callback lives in training_callbacks.py.
+"""
+import json
+import sys
+import time
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+
+METRICS_FILENAME = "training_metrics.jsonl"
+
+
+def peak_rss_mb() -> Optional[float]:
+    """Peak resident set size of this process in MiB, if it can be measured."""
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is bytes on macOS and KiB on Linux
+        return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+    except ImportError:
+        pass
+    try:
+        import psutil
+        info = psutil.Process().memory_info()
+        # peak_wset is the Windows peak working set
+        return getattr(info, "peak_wset", info.rss) / (1024 * 1024)
+    except ImportError:
+        return None
+
+
+def peak_accelerator_mb() -> Optional[float]:
+    """Peak allocated CUDA memory in MiB, or None without an accelerator."""
+    torch = sys.modules.get("torch")
+    if torch is None or not torch.cuda.is_available():
+        return None
+    return torch.cuda.max_memory_allocated() / (1024 * 1024)
+
+
+class MetricsWriter:
+    """Accumulates step timings and appends one JSON record per logging event.
+
+    padded_tokens_per_sample is the padded sequence length: the trainers pad
+    to max_length, so the token rate it gives counts padding, not text.
+    """
+
+    def __init__(self, metrics_path: Path, padded_tokens_per_sample: Optional[int] = None):
+        self.metrics_path = Path(metrics_path)
+        self.padded_tokens_per_sample = padded_tokens_per_sample
+        self.samples_per_step = 1
+        self._last_step_end: Optional[float] = None
+        self._interval_steps = 0
+        self._interval_time = 0.0
+
+    def start(self, samples_per_step: int, **run_info) -> None:
+        self.samples_per_step = max(1, samples_per_step)
+        self.metrics_path.parent.mkdir(parents=True, exist_ok=True)
+        self.metrics_path.write_text("", encoding="utf-8")
+        self._last_step_end = time.perf_counter()
+        self._interval_steps = 0
+        self._interval_time = 0.0
+        self.write({
+            "event": "train_begin",
+            "time": time.time(),
+            "samples_per_step": self.samples_per_step,
+            "padded_tokens_per_sample": self.padded_tokens_per_sample,
+            **run_info,
+        })
+
+    def step_end(self) -> None:
+        now = time.perf_counter()
+        if self._last_step_end is not None:
+            self._interval_time += now - self._last_step_end
+            self._interval_steps += 1
+        self._last_step_end = now
+
+    def log(self, step: int, logs: Dict) -> None:
+        if "loss" in logs:
+            record = {"event": "train", "step": step}
+            record.update(self._throughput())
+        elif "eval_loss" in logs:
+            record = {"event": "eval", "step": step}
+        elif "train_runtime" in logs:
+            record = {"event": "train_end", "step": step}
+        else:
+            return
+        record.update({k: v for k, v in logs.items() if isinstance(v, (int, float))})
+        record["peak_rss_mb"] = peak_rss_mb()
+        record["peak_accelerator_mb"] = peak_accelerator_mb()
+        record["time"] = time.time()
+        self.write(record)
+
+    def write(self, record: Dict) -> None:
+        with open(self.metrics_path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+    def _throughput(self) -> Dict[str, Optional[float]]:
+        if not self._interval_steps or self._interval_time <= 0:
+            return {"step_time": None, "samples_per_sec": None, "padded_tokens_per_sec": None}
+        step_time = self._interval_time / self._interval_steps
+        samples_per_sec = self.samples_per_step / step_time
+        padded = self.padded_tokens_per_sample
+        padded_tokens_per_sec = samples_per_sec * padded if padded else None
+        self._interval_steps = 0
+        self._interval_time = 0.0
+        return {
+            "step_time": round(step_time, 4),
+            "samples_per_sec": round(samples_per_sec, 3),
+            "padded_tokens_per_sec": round(padded_tokens_per_sec, 1) if padded_tokens_per_sec else None,
+        }
+
+
+def iter_metrics(metrics_path: Path) -> Iterator[Dict]:
+    """Yield metric records, skipping a partially written trailing line."""
+    metrics_path = Path(metrics_path)
+    if not metrics_path.exists():
+        return
+    with open(metrics_path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                continue
+
+
+def read_metrics(metrics_path: Path) -> List[Dict]:
+    return list(iter_metrics(metrics_path))
+
+
+def summarize_metrics(records: List[Dict]) -> Dict[str, Optional[float]]:
+    """Reduce a metrics stream to the numbers worth comparing across runs."""
+    train = [r for r in records if r.get("event") == "train"]
+    evals = [r for r in records if r.get("event") == "eval"]
+    agreement = [r for r in records if r.get("event") == "agreement"]
+
+    def mean(key: str) -> Optional[float]:
+        values = [r[key] for r in train if r.get(key) is not None]
+        return round(sum(values) / len(values), 3) if values else None
+
+    def peak(key: str) -> Optional[float]:
+        values = [r[key] for r in records if r.get(key) is not None]
+        return round(max(values), 1) if values else None
+
+    return {
+        "steps": train[-1]["step"] if train else 0,
+        "final_loss": train[-1].get("loss") if train else None,
+        "final_eval_loss": evals[-1].get("eval_loss") if evals else None,
+        "final_agreement": agreement[-1].get("weighted_agreement") if agreement else None,
+        "mean_step_time": mean("step_time"),
+        "mean_samples_per_sec": mean("samples_per_sec"),
+        "mean_padded_tokens_per_sec": mean("padded_tokens_per_sec"),
+        "peak_rss_mb": peak("peak_rss_mb"),
+        "peak_accelerator_mb": peak("peak_accelerator_mb"),
+    }
+
+
+def format_summary(summary: Dict[str, Optional[float]]) -> str:
+    lines = []
+    for key, value in summary.items():
+        label = key.replace("_", " ").capitalize()
+        lines.append(f"{label}: {value if value is not None else 'n/a'}")
+    return "\n".join(lines)
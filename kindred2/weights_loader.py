@@ -0,0 +1,309 @@
+#!/usr/bin/env python3
+"""
+Base-model loading for the Kindred2 stages, plus a page-cache warmup.
+
+load_mode="eager" is the plain from_pretrained load. load_mode="lazy" builds
+the model skeleton without allocating weights, then points every parameter
+at a zero-copy view of the memory-mapped safetensors shards, so pages are read
+from disk only when a layer is first used. On CUDA each decoder layer is
+moved to the GPU on its first forward call.
+
+Deferred placement only holds for inference. The HF Trainer moves the whole
+model to its device when it is constructed, so in training lazy mode saves
+startup time and nothing more. Without an explicit torch_dtype, lazy mode on
+CPU keeps the checkpoint dtype (usually bf16) because casting would copy
+every weight and lose the shared page-cache mapping that worker_pool.py relies
+on. Eager mode loads fp32 on CPU, so callers that need both modes to compute
+identically (training) pass torch_dtype.
+
+warmup reads the shards once so that the next job's load is served from the
+OS page cache. It imports nothing heavier than huggingface_hub.
+
+Usage: python weights_loader.py warmup (--model-folder PATH | --base-model NAME)
+"""
+import argparse
+import json
+import mmap
+import os
+import struct
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from model_store import resolve_base_model
+
+LOAD_MODES = ["eager", "lazy"]
+WARMUP_CHUNK_BYTES = 16 * 1024 * 1024
+
+# safetensors dtype tags -> torch dtype attribute names
+SAFETENSORS_DTYPES = {
+    "F64": "float64", "F32": "float32", "F16": "float16", "BF16": "bfloat16",
+    "I64": "int64", "I32": "int32", "I16": "int16", "I8": "int8",
+    "U8": "uint8", "BOOL": "bool",
+}
+
+
+def parse_args(argv: List[str]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Kindred2 base-model page-cache warmup")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    warmup = subparsers.add_parser("warmup", help="Read base-model shards into the OS page cache")
+    source = warmup.add_mutually_exclusive_group(required=True)
+    source.add_argument("--model-folder", help="Ethical model folder (uses its base_model.txt)")
+    source.add_argument("--base-model", help="HF base model or local path")
+    return parser.parse_args(argv)
+
+
+def resolve_model_dir(base_model: str) -> Path:
+    """Local directory holding the checkpoint, downloading it if it is not cached yet."""
+    path = Path(base_model).expanduser()
+    if path.is_dir():
+        return path
+    from huggingface_hub import snapshot_download
+    return Path(snapshot_download(base_model))
+
+
+def shard_files(model_dir: Path) -> List[Path]:
+    return sorted(Path(model_dir).glob("*.safetensors"))
+
+
+def available_memory_bytes() -> Optional[int]:
+    try:
+        return os.sysconf("SC_AVPHYS_PAGES") * os.sysconf("SC_PAGE_SIZE")
+    except (AttributeError, ValueError, OSError):
+        pass
+    try:
+        import psutil
+        return psutil.virtual_memory().available
+    except ImportError:
+        return None
+
+
+def warmup_shards(shards: List[Path], chunk_bytes: int = WARMUP_CHUNK_BYTES) -> Tuple[int, float]:
+    """Read every shard sequentially so it lands in the page cache; returns (bytes, seconds)."""
+    start = time.perf_counter()
+    total = 0
+    buffer = bytearray(chunk_bytes)
+    view = memoryview(buffer)
+    for shard in shards:
+        with open(shard, "rb", buffering=0) as f:
+            if hasattr(os, "posix_fadvise"):
+                os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_SEQUENTIAL)
+            while True:
+                read = f.readinto(view)
+                if not read:
+                    break
+                total += read
+    return total, time.perf_counter() - start
+
+
+def warmup(base_model: str) -> Tuple[int, float]:
+    model_dir = resolve_model_dir(base_model)
+    shards = shard_files(model_dir)
+    if not shards:
+        raise FileNotFoundError(f"No .safetensors shards in {model_dir}")
+    size = sum(shard.stat().st_size for shard in shards)
+    available = available_memory_bytes()
+    if available is not None and size > available:
+        print(f"Warning: shards ({size / 2**30:.1f} GiB) exceed available memory "
+              f"({available / 2**30:.1f} GiB); part of the cache will be evicted")
+    return warmup_shards(shards)
+
+
+def read_safetensors_header(path: Path) -> Tuple[int, Dict[str, Dict]]:
+    """Returns (offset of the data section, tensor entries)."""
+    with open(path, "rb") as f:
+        (header_size,) = struct.unpack("<Q", f.read(8))
+        header = json.loads(f.read(header_size))
+    header.pop("__metadata__", None)
+    return 8 + header_size, header
+
+
+def mmap_shard(path: Path):
+    """Map a shard and return (mmap, {name: tensor view}) without copying any data.
+
+    ACCESS_COPY makes the mapping private: in-place updates such as
+    merge_and_unload never write back to the checkpoint file.
+    """
+    import torch
+
+    data_start, header = read_safetensors_header(path)
+    with open(path, "rb") as f:
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY)
+    tensors = {}
+    for name, info in header.items():
+        dtype = getattr(torch, SAFETENSORS_DTYPES[info["dtype"]])
+        begin, end = info["data_offsets"]
+        if end == begin:
+            tensors[name] = torch.empty(info["shape"], dtype=dtype)
+            continue
+        count = (end - begin) // torch.empty((), dtype=dtype).element_size()
+        tensors[name] = torch.frombuffer(
+            mapped, dtype=dtype, count=count, offset=data_start + begin
+        ).view(info["shape"])
+    return mapped, tensors
+
+
+def find_decoder_layers(model, num_layers: Optional[int]):
+    import torch
+
+    for module in model.modules():
+        if isinstance(module, torch.nn.ModuleList) and len(module) == num_layers:
+            return module
+    return None
+
+
+def _set_tensor(model, name: str, tensor):
+    """Point name at tensor; returns the new Parameter, or None for buffers and unknown names."""
+    import torch
+
+    module_name, _, attr = name.rpartition(".")
+    try:
+        module = model.get_submodule(module_name)
+    except AttributeError:
+        return None
+    if attr in module._parameters:
+        old = module._parameters[attr]
+        param = torch.nn.Parameter(tensor, requires_grad=old.requires_grad)
+        module._parameters[attr] = param
+        return param
+    if attr in module._buffers:
+        module._buffers[attr] = tensor
+    return None
+
+
+def _move_on_first_forward(layer, device, dtype, base_ids) -> None:
+    """Copy one decoder layer to device the first time it runs.
+
+    Parameters keep their identity (only .data is swapped), so an optimizer
+    built before the first step still sees them. Only checkpoint weights are
+    cast to dtype; adapter weights keep their own precision. Buffers were
+    already moved by load_lazy.
+    """
+    handle = None
+
+    def hook(module, args):
+        for param in module.parameters():
+            target_dtype = dtype if id(param) in base_ids and param.is_floating_point() else param.dtype
+            if param.device != device or param.dtype != target_dtype:
+                param.data = param.data.to(device=device, dtype=target_dtype)
+        handle.remove()
+
+    handle = layer.register_forward_pre_hook(hook)
+
+
+def load_lazy(base_model: str, torch_dtype=None, trust_remote_code: bool = True):
+    """Skeleton + zero-copy mmap views; returns None if the checkpoint does not line up."""
+    import torch
+    from accelerate import init_empty_weights
+    from transformers import AutoConfig, AutoModelForCausalLM
+
+    model_dir = resolve_model_dir(base_model)
+    shards = shard_files(model_dir)
+    if not shards:
+        print(f"Lazy load: no .safetensors shards in {model_dir}")
+        return None
+
+    config = AutoConfig.from_pretrained(model_dir, trust_remote_code=trust_remote_code)
+    with init_empty_weights():
+        model = AutoModelForCausalLM.from_config(config, trust_remote_code=trust_remote_code)
+
+    mappings = []
+    base_ids = set()
+    for shard in shards:
+        mapped, tensors = mmap_shard(shard)
+        mappings.append(mapped)
+        for name, tensor in tensors.items():
+            param = _set_tensor(model, name, tensor)
+            if param is not None:
+                base_ids.add(id(param))
+    model.tie_weights()
+
+    missing = [name for name, param in model.named_parameters() if param.is_meta]
+    if missing:
+        print(f"Lazy load: {len(missing)} parameters have no matching checkpoint tensor "
+              f"(e.g. {missing[0]})")
+        return None
+    # The views borrow these mappings; keep them alive as long as the model
+    model._kindred_mmaps = mappings
+
+    if torch.cuda.is_available():
+        device = torch.device("cuda")
+        dtype = torch_dtype or torch.float16
+        text_config = getattr(config, "text_config", config)
+        layers = find_decoder_layers(model, getattr(text_config, "num_hidden_layers", None))
+        layer_ids = {id(p) for p in layers.parameters()} if layers is not None else set()
+        for param in model.parameters():
+            if id(param) not in layer_ids:
+                param.data = param.data.to(device=device, dtype=dtype if param.is_floating_point() else param.dtype)
+        # Buffers (rotary tables, masks) are small; move them all now
+        for submodule in model.modules():
+            for key, buffer in submodule._buffers.items():
+                if buffer is not None:
+                    submodule._buffers[key] = buffer.to(device)
+        if layers is not None:
+            for layer in layers:
+                _move_on_first_forward(layer, device, dtype, base_ids)
+    elif torch_dtype is not None:
+        # An explicit dtype on CPU costs a copy of every weight that differs
+        for param in model.parameters():
+            if param.is_floating_point() and param.dtype != torch_dtype:
+                param.data = param.data.to(torch_dtype)
+    model.eval()
+    return model
+
+
+def load_causal_lm(base_model: str, load_mode: str = "eager", torch_dtype=None,
+                   trust_remote_code: bool = True):
+    """Load a causal LM; lazy mode falls back to eager if the checkpoint cannot be mapped.
+
+    Lazy mode on CPU keeps the checkpoint dtype unless torch_dtype is given (a
+    cast copies every weight), and on CUDA places the whole model on one GPU,
+    so it needs the model to fit there; eager mode can offload with
+    device_map="auto". Under the HF Trainer the model is moved to the device
+    at Trainer init, so lazy mode only shortens startup there.
+    """
+    import torch
+    from transformers import AutoModelForCausalLM
+
+    if load_mode not in LOAD_MODES:
+        raise ValueError(f"Unknown load mode: {load_mode}")
+    start = time.perf_counter()
+    model = None
+    if load_mode == "lazy":
+        model = load_lazy(base_model, torch_dtype, trust_remote_code)
+        if model is None:
+            print("Lazy load unavailable for this checkpoint; loading eagerly")
+    if model is None:
+        model = AutoModelForCausalLM.from_pretrained(
+            base_model,
+            torch_dtype=torch_dtype or (torch.float16 if torch.cuda.is_available() else torch.float32),
+            device_map="auto",
+            trust_remote_code=trust_remote_code
+        )
+    print(f"Base model ready in {time.perf_counter() - start:.1f}s ({load_mode})")
+    return model
+
+
+def main() -> None:
+    args = parse_args(sys.argv[1:])
+    if args.model_folder:
+        model_folder = Path(args.model_folder)
+        if not model_folder.exists():
+            print(f"Model folder not found: {model_folder}")
+            sys.exit(1)
+        base_model = resolve_base_model(model_folder)
+    else:
+        base_model = args.base_model
+
+    try:
+        size, seconds = warmup(base_model)
+    except FileNotFoundError as exc:
+        print(exc)
+        sys.exit(1)
+    rate = size / 2**20 / seconds if seconds > 0 else 0.0
+    print(f"Warmed {size / 2**30:.2f} GiB of {base_model} in {seconds:.1f}s ({rate:.0f} MiB/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+Multi-process CPU generation for synthetic_generate.py.
+
+Each worker process loads the generation model with weights_loader's lazy
+mode: parameters are views of the memory-mapped safetensors shards, so all
+workers read the same page-cache pages and the weights sit in RAM once,
+however many workers run. Each worker gets its own block of cores with torch
+limited to that many threads, and is pinned to the block where the platform
+allows it (os.sched_setaffinity, else psutil; macOS has neither, so workers
+there only get the thread limit). The coordinator hands out prompts one at
+a time so faster workers take more of them.
+
+worker_dtype picks the weights' dtype in each worker:
+  checkpoint  keep the checkpoint dtype (usually bf16): one shared copy of the
+              weights in the page cache, whatever the worker count
+  float32     cast once per worker: each holds a private fp32 copy (twice a
+              bf16 checkpoint's size, times the workers) but decodes faster on
+              CPUs without native bf16 matmuls (no AVX512-BF16 or AMX)
+  bfloat16    cast to bf16 (copies only if the checkpoint is not bf16 already)
+Compare with the "Pool throughput" line synthetic_generate prints.
+"""
+import multiprocessing
+import os
+import time
+from typing import Dict, List, Optional, Tuple
+
+WORKER_DTYPES = ["checkpoint", "float32", "bfloat16"]
+
+# Per-process state, set by _init_worker
+_worker: Dict = {}
+
+
+def available_cores() -> List[int]:
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+def core_groups(workers: int, cores: Optional[List[int]] = None) -> List[List[int]]:
+    """Split cores into workers contiguous, near-equal blocks (at least one core each)."""
+    cores = cores if cores is not None else available_cores()
+    workers = max(1, min(workers, len(cores)))
+    size, extra = divmod(len(cores), workers)
+    groups = []
+    start = 0
+    for index in range(workers):
+        end = start + size + (1 if index < extra else 0)
+        groups.append(cores[start:end])
+        start = end
+    return groups
+
+
+def pin_to_cores(cores: List[int]) -> bool:
+    """Restrict this process to cores; False where the platform cannot."""
+    if hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, cores)
+        return True
+    try:
+        import psutil
+        psutil.Process().cpu_affinity(cores)
+        return True
+    except (ImportError, AttributeError, NotImplementedError):
+        return False
+
+
+def _init_worker(model_name: str, draft_model_name: Optional[str], worker_dtype: str, groups) -> None:
+    cores = groups.get()
+    if not pin_to_cores(cores):
+        print(f"[worker {os.getpid()}] core pinning unavailable here; limiting to {len(cores)} thread(s) only",
+              flush=True)
+    # Set before torch starts its thread pools
+    os.environ["OMP_NUM_THREADS"] = str(len(cores))
+
+    import torch
+    from transformers import AutoTokenizer
+    from speculative import maybe_load_draft_model
+    from weights_loader import load_causal_lm
+
+    torch.set_num_threads(len(cores))
+    tokenizer = AutoTokenizer.from_pretrained(model_name, trust_remote_code=True)
+    torch_dtype = None if worker_dtype == "checkpoint" else getattr(torch, worker_dtype)
+    model = load_causal_lm(model_name, load_mode="lazy", torch_dtype=torch_dtype)
+    _worker.update(
+        cores=cores,
+        tokenizer=tokenizer,
+        model=model,
+        draft=maybe_load_draft_model(draft_model_name, model, tokenizer),
+        measured=False,
+    )
+
+
+def _run_job(job: Tuple[int, str]):
+    from speculative import SpeculativeGenerator
+    from synthetic_generate import generate_items
+
+    index, prompt = job
+    # The speedup baseline is measured on each worker's first prompt only
+    generator = SpeculativeGenerator(_worker["model"], _worker["draft"], measure_baseline=not _worker["measured"])
+    _worker["measured"] = True
+    items, counts = generate_items(generator, _worker["tokenizer"], prompt)
+    return index, items, counts, generator.stats, os.getpid()
+
+
+class GenerationPool:
+    """Worker processes that stay up across batches of prompts.
+
+    with GenerationPool(model_name, workers) as pool:
+        outputs = pool.run(prompts)
+    """
+
+    def __init__(self, model_name: str, workers: int, draft_model_name: Optional[str] = None,
+                 worker_dtype: str = "checkpoint"):
+        from speculative import DecodeStats
+
+        if worker_dtype not in WORKER_DTYPES:
+            raise ValueError(f"Unknown worker dtype: {worker_dtype}")
+        self.groups = core_groups(workers)
+        context = multiprocessing.get_context("spawn")
+        group_queue = context.Queue()
+        for group in self.groups:
+            group_queue.put(group)
+        print(f"Starting {len(self.groups)} workers on cores "
+              + ", ".join(f"{g[0]}-{g[-1]}" for g in self.groups), flush=True)
+        self.pool = context.Pool(len(self.groups), initializer=_init_worker,
+                                 initargs=(model_name, draft_model_name, worker_dtype, group_queue))
+        self.stats = DecodeStats()
+        self.seconds = 0.0
+
+    def __enter__(self) -> "GenerationPool":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.pool.terminate()
+        self.pool.join()
+
+    def run(self, prompts: List[str]) -> List[Tuple[List[Dict[str, str]], Dict[str, int]]]:
+        """generate_items over prompts in the workers; results come back in prompt order."""
+        results: List = [None] * len(prompts)
+        start = time.perf_counter()
+        for index, items, counts, job_stats, pid in self.pool.imap_unordered(_run_job, list(enumerate(prompts))):
+            results[index] = (items, counts)
+            self.stats.merge(job_stats)
+            print(f"[worker {pid}] prompt {index + 1}/{len(prompts)}: {len(items)} item(s)", flush=True)
+        self.seconds += time.perf_counter() - start
+        return results
+
+    @property
+    def tokens_per_second(self) -> float:
+        """Aggregate throughput of all workers together."""
+        return self.stats.new_tokens / self.seconds if self.seconds > 0 else 0.0
@@ -3,29 +3,39 @@ Auto-run test of Nigel values LoRA adapter (no interactive prompts).
 Usage: conda activate train_for_nigel && python test_nigel_adapter_auto.py
 """
 
-import torch
-from transformers import AutoModelForCausalLM, AutoTokenizer
-from peft import PeftModel
+import argparse
 import os
+import sys
 
 # Configuration
 BASE_MODEL = "Qwen/Qwen2.5-7B-Instruct"
 ADAPTER_PATH = "./nigel_lora_adapter"
 
-def load_model():
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--base-model", default=BASE_MODEL, help="HF base model or local path")
+    parser.add_argument("--adapter", default=ADAPTER_PATH, help="LoRA adapter directory")
+    return parser.parse_args(argv)
+
+def load_model(base_model_name=BASE_MODEL, adapter_path=ADAPTER_PATH):
     """Load base model and apply LoRA adapter"""
+    # Heavy imports are deferred so --help and missing-adapter errors are instant
+    import torch
+    from transformers import AutoModelForCausalLM, AutoTokenizer
+    from peft import PeftModel
+    
     print("Loading base model...")
-    tokenizer = AutoTokenizer.from_pretrained(BASE_MODEL)
+    tokenizer = AutoTokenizer.from_pretrained(base_model_name)
     
     base_model = AutoModelForCausalLM.from_pretrained(
-        BASE_MODEL,
+        base_model_name,
         torch_dtype=torch.float16,
         device_map="auto",
         trust_remote_code=True
     )
     
     print("Loading LoRA adapter...")
-    model = PeftModel.from_pretrained(base_model, ADAPTER_PATH)
+    model = PeftModel.from_pretrained(base_model, adapter_path)
     model = model.merge_and_unload()
     
     print("Model loaded successfully!\n")
@@ -33,6 +43,8 @@ def load_model():
 
 def generate_response(model, tokenizer, prompt, max_length=512):
     """Generate response from the model"""
+    import torch
+    
     messages = [{"role": "user", "content": prompt}]
     text = tokenizer.apply_chat_template(
         messages,
@@ -114,13 +126,14 @@ def run_tests(model, tokenizer):
     print("="*80)
 
 if __name__ == "__main__":
-    if not os.path.exists(ADAPTER_PATH):
-        print(f"ERROR: Adapter not found at {ADAPTER_PATH}")
+    args = parse_args(sys.argv[1:])
+    if not os.path.exists(args.adapter):
+        print(f"ERROR: Adapter not found at {args.adapter}")
         print("Make sure training completed successfully.")
         exit(1)
     
     # Load model
-    model, tokenizer = load_model()
+    model, tokenizer = load_model(args.base_model, args.adapter)
     
     # Run all tests automatically
     run_tests(model, tokenizer)